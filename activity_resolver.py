@@ -0,0 +1,135 @@
+from typing import Dict, Optional, Tuple
+
+RESOLVE_CACHE_SIZE = 4096
+
+DEFAULT_ACTIVITY_INFO = {
+    "id": "electricity",
+    "unit_type": "energy",
+    "default_unit": "kWh",
+    "algorithm_factor": 1.0
+}
+
+
+class ActivityResolver:
+    """Resolves activity types and ids against the activity mappings.
+
+    Partial matches follow the mapping order: the first key that is contained in the
+    normalized type, or that contains it, wins. An Aho-Corasick automaton finds the keys
+    contained in the type and a substring index finds the keys containing it.
+    """
+
+    __slots__ = ("mappings", "_ranks", "_by_id", "_substrings", "_goto", "_fail", "_best", "_cache", "_log")
+
+    def __init__(self, mappings: Dict, log=None):
+        self.mappings = mappings
+        keys = list(mappings)
+        self._ranks = keys
+        self._log = log
+
+        self._by_id = {}
+        for key, info in mappings.items():
+            self._by_id.setdefault(info.get("id"), (key, info))
+
+        self._substrings = {}
+        for rank, key in enumerate(keys):
+            for start in range(len(key) + 1):
+                for end in range(start, len(key) + 1):
+                    self._substrings.setdefault(key[start:end], rank)
+
+        self._goto, self._fail, self._best = self._build_automaton(keys)
+        self._cache = {}
+
+    @staticmethod
+    def _build_automaton(keys: list) -> Tuple[list, list, list]:
+        goto = [{}]
+        best = [None]
+        for rank, key in enumerate(keys):
+            node = 0
+            for char in key:
+                child = goto[node].get(char)
+                if child is None:
+                    child = len(goto)
+                    goto[node][char] = child
+                    goto.append({})
+                    best.append(None)
+                node = child
+            if best[node] is None:
+                best[node] = rank
+
+        # Breadth-first pass: each node also reports the best key reachable through its failure link.
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for node in queue:
+            for char, child in goto[node].items():
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(char, 0)
+
+                inherited = best[fail[child]]
+                if inherited is not None and (best[child] is None or inherited < best[child]):
+                    best[child] = inherited
+                queue.append(child)
+
+        return goto, fail, best
+
+    def _contained_rank(self, text: str) -> Optional[int]:
+        goto = self._goto
+        fail = self._fail
+        best = self._best
+        found = best[0]
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            rank = best[node]
+            if rank is not None and (found is None or rank < found):
+                found = rank
+        return found
+
+    def partial_match(self, normalized_type: str) -> Optional[str]:
+        contained = self._contained_rank(normalized_type)
+        containing = self._substrings.get(normalized_type)
+
+        ranks = [rank for rank in (contained, containing) if rank is not None]
+        return self._ranks[min(ranks)] if ranks else None
+
+    def resolve(self, activity_type: str) -> Dict:
+        if not activity_type:
+            return DEFAULT_ACTIVITY_INFO
+
+        if type(activity_type) is str:
+            info = self._cache.get(activity_type)
+            if info is not None:
+                return info
+
+        info = self._resolve(activity_type)
+
+        if type(activity_type) is str and len(self._cache) < RESOLVE_CACHE_SIZE:
+            self._cache[activity_type] = info
+        return info
+
+    def _resolve(self, activity_type: str) -> Dict:
+        normalized_type = activity_type.lower().strip()
+
+        info = self.mappings.get(normalized_type)
+        if info is not None:
+            return info
+
+        key = self.partial_match(normalized_type)
+        if key is not None:
+            if self._log is not None:
+                self._log("Partial match: %s -> %s", normalized_type, key)
+            return self.mappings[key]
+
+        return {
+            "id": normalized_type,
+            "unit_type": "energy",
+            "default_unit": "kWh",
+            "algorithm_factor": 1.0
+        }
+
+    def type_for_id(self, activity_id: str) -> Optional[Tuple[str, Dict]]:
+        return self._by_id.get(activity_id)
@@ -1,52 +1,401 @@
-from flask import Flask, jsonify, request
-from flask_cors import CORS
-import subprocess
+import cProfile
+import functools
+import io
 import json
+import pstats
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import Flask, Response, g, jsonify, request, stream_with_context
+from flask_cors import CORS
 import os
 from dotenv import load_dotenv
 
+# Load .env before the calculator modules read their settings from the environment.
 load_dotenv()
 
+from calculator_service import create_service  # noqa: E402
+from jobs import FINISHED_STATES, JOB_PAGE_SIZE, JobManager, JobQueueFull  # noqa: E402
+from logging_config import configure_logging  # noqa: E402
+from metrics import DEADLINES_EXCEEDED, HTTP_REQUEST_SECONDS, HTTP_REQUESTS, REGISTRY  # noqa: E402
+from resilience import Deadline, DeadlineExceeded  # noqa: E402
+from result_format import (FORMAT_ROWS, MSGPACK_MIMETYPE, RESULT_FORMATS, msgpack,  # noqa: E402
+                           negotiate_content_type)
+from rollups import DIMENSIONS, RollupError, RollupManager  # noqa: E402
+from scenarios import ScenarioError, expand_grid  # noqa: E402
+from serving import REQUEST_DEADLINE, AdmissionController, Overloaded, serve  # noqa: E402
+from sessions import SessionError, SessionManager  # noqa: E402
+
+configure_logging()
+
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["X-Profile-Id"])
+
+calculator_service = create_service()
+job_manager = JobManager(calculator_service)
+session_manager = SessionManager(calculator_service)
+rollup_manager = RollupManager(calculator_service)
+admission = AdmissionController()
+
+JOB_STREAM_POLL_INTERVAL = 0.5
+JOB_EVICTED_ERROR = "Job expired before its results were streamed"
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_HEADER = "X-Profile"
+MAX_PROFILES = 20
+PROFILE_LINES = 40
+DEADLINE_HEADER = "X-Request-Deadline"
+
+profiles = OrderedDict()
+
+
+def cache_stats_by_name():
+    calculator = calculator_service.calculator
+    caches = {"response": calculator.api.cache.get_stats()}
+    if calculator.memo is not None:
+        memo = calculator.memo.get_stats()
+        caches["memo_activities"] = memo["activities"]
+        caches["memo_submissions"] = memo["submissions"]
+    return caches
+
+
+def cache_lookups():
+    samples = {}
+    for name, stats in cache_stats_by_name().items():
+        samples[(name, "hit")] = stats["hits"]
+        samples[(name, "miss")] = stats["misses"]
+    return samples
+
+
+def cache_entries():
+    return {(name,): stats["entries"] for name, stats in cache_stats_by_name().items()}
+
+
+REGISTRY.counter("carbon_cache_lookups_total", "Cache lookups, by cache and result", ["cache", "result"],
+                 callback=cache_lookups)
+REGISTRY.gauge("carbon_cache_entries", "Entries currently held, by cache", ["cache"], callback=cache_entries)
+REGISTRY.gauge("carbon_admission_requests", "Calculations running and queued for a slot", ["state"],
+               callback=lambda: {("active",): admission.active, ("waiting",): admission.waiting})
+
+
+def name_activities(activities):
+    for idx, activity in enumerate(activities):
+        if 'name' not in activity:
+            activity['name'] = f"Activity {idx + 1}"
+    return activities
+
+def request_deadline():
+    # Clients may ask for a shorter deadline than the server's, never a longer one.
+    seconds = REQUEST_DEADLINE
+    requested = request.headers.get(DEADLINE_HEADER, type=float)
+    if requested and requested > 0:
+        seconds = min(seconds, requested)
+    return Deadline(seconds)
+
+def admitted(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.deadline = request_deadline()
+        try:
+            with admission.admit(g.deadline):
+                return view(*args, **kwargs)
+        except Overloaded as e:
+            return jsonify({"error": str(e)}), e.status, {"Retry-After": str(e.retry_after)}
+        except DeadlineExceeded as e:
+            DEADLINES_EXCEEDED.inc(route=request.url_rule.rule)
+            return jsonify({"error": str(e)}), 503, {"Retry-After": str(admission.retry_after())}
+
+    return wrapper
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+    if PROFILING_ENABLED and request.headers.get(PROFILE_HEADER) == "1":
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already running in this process (e.g. a concurrent profiled request).
+            return
+        g.profiler = profiler
+
+@app.after_request
+def record_request(response):
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+    if "request_started" in g:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - g.request_started, route=route)
+
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(PROFILE_LINES)
+
+        profile_id = uuid.uuid4().hex
+        profiles[profile_id] = output.getvalue()
+        while len(profiles) > MAX_PROFILES:
+            profiles.popitem(last=False)
+        response.headers["X-Profile-Id"] = profile_id
+
+    return response
+
+@app.teardown_request
+def stop_profiler(error=None):
+    # after_request is skipped when a response could not be produced, so never leave a profiler running.
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
 
 @app.route('/')
 def health_check():
-    return jsonify({"status": "ready", "version": "1.0.0"})
+    return jsonify({"status": "ready", "version": "1.0.0", "mode": calculator_service.mode,
+                    "admission": admission.snapshot()})
+
+@app.route('/cache/stats')
+def cache_stats():
+    calculator = calculator_service.calculator
+    stats = calculator.api.cache_stats()
+    if calculator.memo is not None:
+        stats["memo"] = calculator.memo.get_stats()
+    return jsonify(stats)
+
+@app.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/profiles/<profile_id>')
+def profile(profile_id):
+    report = profiles.get(profile_id)
+    if report is None:
+        return jsonify({"error": "Profile not found"}), 404
+
+    return Response(report, mimetype='text/plain')
+
+@app.route('/climatiq/status')
+def climatiq_status():
+    return jsonify(calculator_service.calculator.api.resilience_stats())
 
 @app.route('/calculate', methods=['POST'])
+@admitted
 def calculate():
     try:
         data = request.json
-        activities = data.get('activities', [])
+        activities = name_activities(data.get('activities', []))
 
-        for idx, activity in enumerate(activities):
-            if 'name' not in activity:
-                activity['name'] = f"Activity {idx + 1}"
+        result_format = request.args.get('format', FORMAT_ROWS)
+        if result_format not in RESULT_FORMATS:
+            return jsonify({"error": f"Unknown result format: {result_format}"}), 400
 
-        input_data = {
-            "activities": activities,
-            "api_key": os.getenv("CLIMATIQ_API_KEY")
-        }
+        content_type = negotiate_content_type(request.headers.get('Accept'))
+        if content_type == MSGPACK_MIMETYPE and msgpack is None:
+            return jsonify({"error": "MessagePack responses require the msgpack package"}), 406
 
-        result = subprocess.run(
-            ['python', 'check_api.py'],
-            input=json.dumps(input_data),
-            text=True,
-            capture_output=True,
-            timeout=30
-        )
+        body = calculator_service.calculate_encoded(activities, result_format, content_type, g.deadline)
+        return Response(body, mimetype=content_type)
 
-        if result.returncode != 0:
-            return jsonify({"error": result.stderr}), 500
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        return jsonify(json.loads(result.stdout))
+@app.route('/sessions', methods=['POST'])
+@admitted
+def create_session():
+    try:
+        data = request.get_json(silent=True) or {}
+
+        if not calculator_service.api_key:
+            return jsonify({"error": "API key required"}), 400
+
+        session = session_manager.create(data.get('activities', []), g.deadline)
+        return jsonify(session), 201, {"Location": f"/sessions/{session['session_id']}"}
 
+    except SessionError as e:
+        return jsonify({"error": str(e)}), 400
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    session = session_manager.get(session_id)
+    if session is None:
+        return jsonify({"error": "Session not found"}), 404
+
+    return jsonify(session)
+
+@app.route('/sessions/<session_id>', methods=['PATCH'])
+@admitted
+def update_session(session_id):
+    try:
+        data = request.json
+        session = session_manager.apply(session_id, data.get('changes', []), g.deadline)
+        if session is None:
+            return jsonify({"error": "Session not found"}), 404
+
+        return jsonify(session)
+
+    except SessionError as e:
+        return jsonify({"error": str(e)}), 400
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    if not session_manager.delete(session_id):
+        return jsonify({"error": "Session not found"}), 404
+
+    return '', 204
+
+@app.route('/rollups', methods=['POST'])
+@admitted
+def create_rollup():
+    try:
+        data = request.json
+
+        if not calculator_service.api_key:
+            return jsonify({"error": "API key required"}), 400
+
+        rollup = rollup_manager.create(data.get('activities', []), data.get('materialize', []), g.deadline)
+        return jsonify(rollup), 201, {"Location": f"/rollups/{rollup['rollup_id']}"}
+
+    except RollupError as e:
+        return jsonify({"error": str(e)}), 400
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/rollups/<rollup_id>', methods=['GET'])
+def query_rollup(rollup_id):
+    try:
+        group_by = request.args.get('group_by', ",".join(DIMENSIONS))
+        filters = {name: request.args.get(name) for name in DIMENSIONS}
+        rollup = rollup_manager.query(rollup_id, group_by, filters)
+        if rollup is None:
+            return jsonify({"error": "Rollup not found"}), 404
+
+        return jsonify(rollup)
+
+    except RollupError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/rollups/<rollup_id>', methods=['DELETE'])
+def delete_rollup(rollup_id):
+    if not rollup_manager.delete(rollup_id):
+        return jsonify({"error": "Rollup not found"}), 404
+
+    return '', 204
+
+@app.route('/scenarios', methods=['POST'])
+@admitted
+def run_scenarios():
+    try:
+        data = request.json
+
+        if not calculator_service.api_key:
+            return jsonify({"error": "API key required"}), 400
+
+        scenarios = list(data.get('scenarios', []))
+        if data.get('grid'):
+            scenarios.extend(expand_grid(data['grid']))
+
+        result = calculator_service.calculator.process_scenarios(data.get('activities', []), scenarios, g.deadline)
+        return jsonify(result)
+
+    except ScenarioError as e:
+        return jsonify({"error": str(e)}), 400
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Not admitted: a submission only queues work and returns 202, and the job outlives the
+# request, so a request deadline cannot apply. JobManager bounds the jobs pending instead.
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    try:
+        data = request.json
+        activities = name_activities(data.get('activities', []))
+
+        if not calculator_service.api_key:
+            return jsonify({"error": "API key required"}), 400
+
+        job = job_manager.submit(activities)
+        return jsonify(job), 202, {"Location": f"/jobs/{job['job_id']}"}
+
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": str(e.retry_after)}
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/results')
+def job_results(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', JOB_PAGE_SIZE, type=int), 1), JOB_PAGE_SIZE)
+    results = job_manager.results(job_id, offset, limit)
+    next_offset = offset + len(results)
+
+    return jsonify({
+        "job_id": job_id,
+        "status": job["status"],
+        "offset": offset,
+        "results": results,
+        "next_offset": next_offset if next_offset < job["total"] else None
+    })
+
+@app.route('/jobs/<job_id>/stream')
+def stream_job(job_id):
+    if job_manager.get(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    def generate():
+        offset = 0
+        while True:
+            job = job_manager.get(job_id)
+            if job is None:
+                # Evicted while streaming; end with an error record instead of breaking the response.
+                yield json.dumps({"summary": None, "status": None, "error": JOB_EVICTED_ERROR}) + "\n"
+                return
+
+            results = job_manager.results(job_id, offset, JOB_PAGE_SIZE)
+            offset += len(results)
+            if results:
+                yield "".join(json.dumps(result) + "\n" for result in results)
+                continue
+
+            if job["status"] in FINISHED_STATES:
+                yield json.dumps({"summary": job["summary"], "status": job["status"], "error": job["error"]}) + "\n"
+                return
+
+            time.sleep(JOB_STREAM_POLL_INTERVAL)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 if __name__ == '__main__':
     if not os.getenv("CLIMATIQ_API_KEY"):
         print("Warning: CLIMATIQ_API_KEY not set in environment variables")
 
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    port = int(os.getenv("PORT", 5000))
+    if os.getenv("SERVER_MODE", "pooled").lower() == "development":
+        # The reloader and debugger are for local development only, so they never listen publicly.
+        app.run(host='127.0.0.1', port=port, debug=True)
+    else:
+        serve(app, host='0.0.0.0', port=port)
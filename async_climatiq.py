@@ -0,0 +1,252 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from check_api import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+    CIRCUIT_OPEN_ERROR,
+    DEFAULT_BASE_URL,
+    FALLBACK_DATA_VERSION,
+    MAX_RETRIES,
+    RATE_LIMIT,
+    RETRY_DELAY,
+    CarbonEmissionCalculator,
+    EmissionTotals,
+    estimate_cache_key,
+    logger,
+    record_outcomes,
+)
+from emission_cache import CacheBackend, create_cache
+from metrics import (
+    CLIMATIQ_REJECTED,
+    CLIMATIQ_REQUEST_SECONDS,
+    CLIMATIQ_REQUESTS,
+    CLIMATIQ_RETRIES,
+    CLIMATIQ_THROTTLED,
+    CLIMATIQ_WAIT_SECONDS,
+)
+from resilience import AdaptiveRateLimiter, CircuitBreaker, retry_after_seconds
+
+DEFAULT_MAX_CONCURRENCY = 10
+REQUEST_TIMEOUT = 30
+NO_API_REQUEST_ERROR = "No API request for activity"
+
+
+class AsyncClimatiqAPI:
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, cache: Optional[CacheBackend] = None,
+                 data_version: Optional[str] = None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for the async Climatiq client")
+
+        self.api_key = api_key
+        self.base_url = (base_url or os.getenv("CLIMATIQ_BASE_URL", DEFAULT_BASE_URL)).rstrip("/")
+        self.headers = {"Authorization": f"Bearer {self.api_key}"}
+        self.cache = cache if cache is not None else create_cache()
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(rate=RATE_LIMIT)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+        self.data_version = data_version
+        self._session = None
+        self._semaphore = None
+        self._data_version_lock = None
+
+    async def __aenter__(self) -> "AsyncClimatiqAPI":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _ensure_session(self) -> "aiohttp.ClientSession":
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.max_concurrency)
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._data_version_lock = asyncio.Lock()
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def get_data_version(self) -> str:
+        if self.data_version is not None:
+            return self.data_version
+
+        session = self._ensure_session()
+        async with self._data_version_lock:
+            if self.data_version is None:
+                try:
+                    async with session.get(f"{self.base_url}/data/v1/data-versions") as response:
+                        response.raise_for_status()
+                        latest = (await response.json()).get("latest_release")
+                except Exception as e:
+                    logger.warning("Failed to get data version: %s", e)
+                    latest = None
+                self.data_version = latest or FALLBACK_DATA_VERSION
+
+        return self.data_version
+
+    async def make_request(self, endpoint: str, method: str = "GET", data: Optional[Dict] = None,
+                           params: Optional[Dict] = None) -> Dict:
+        session = self._ensure_session()
+        url = f"{self.base_url}/{endpoint}"
+
+        for retry in range(MAX_RETRIES):
+            if not self.circuit_breaker.allow_request():
+                CLIMATIQ_REJECTED.inc(endpoint=endpoint)
+                return {"error": CIRCUIT_OPEN_ERROR}
+
+            if retry:
+                CLIMATIQ_RETRIES.inc(endpoint=endpoint)
+
+            wait = self.rate_limiter.reserve()
+            if wait > 0:
+                CLIMATIQ_WAIT_SECONDS.observe(wait)
+                await asyncio.sleep(wait)
+
+            status = "error"
+            started = time.perf_counter()
+            try:
+                async with self._semaphore:
+                    started = time.perf_counter()
+                    async with session.request(method.upper(), url, params=params, json=data) as response:
+                        status = response.status
+                        CLIMATIQ_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+                        CLIMATIQ_REQUESTS.inc(endpoint=endpoint, status=status)
+                        self.rate_limiter.observe_headers(response.headers)
+
+                        if response.status == 429:
+                            CLIMATIQ_THROTTLED.inc(endpoint=endpoint)
+                            retry_after = retry_after_seconds(response.headers, RETRY_DELAY)
+                            self.rate_limiter.on_throttle(retry_after)
+                            self.circuit_breaker.record_success()
+                            continue
+
+                        if 400 <= response.status < 500:
+                            self.circuit_breaker.record_success()
+                            if response.status == 400 and data and logger.isEnabledFor(logging.DEBUG):
+                                logger.debug("Request payload: %s", json.dumps(data))
+                                logger.debug("Response: %s", await response.text())
+                            error = f"{response.status} Client Error: {response.reason} for url: {response.url}"
+                            logger.warning("API request rejected: %s", error)
+                            return {"error": error}
+
+                        response.raise_for_status()
+                        self.rate_limiter.on_success()
+                        self.circuit_breaker.record_success()
+                        return await response.json()
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if status == "error":
+                    CLIMATIQ_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+                    CLIMATIQ_REQUESTS.inc(endpoint=endpoint, status=status)
+                self.circuit_breaker.record_failure()
+                logger.warning("API request failed (attempt %d/%d): %s", retry + 1, MAX_RETRIES, e)
+                if retry < MAX_RETRIES - 1:
+                    await asyncio.sleep(RETRY_DELAY)
+                else:
+                    return {"error": str(e) or type(e).__name__}
+
+        return {"error": "API request failed"}
+
+    async def estimate(self, payload: Dict) -> Dict:
+        data_version = await self.get_data_version()
+        cache_key = estimate_cache_key(payload)
+        cached = self.cache.get(cache_key, data_version)
+        if cached is not None:
+            return cached
+
+        result = await self.make_request("data/v1/estimate", method="POST", data=payload)
+
+        if "error" not in result:
+            self.cache.set(cache_key, result, data_version)
+
+        return result
+
+
+class AsyncCarbonEmissionCalculator(CarbonEmissionCalculator):
+
+    def __init__(self, api_key: str, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 async_api: Optional[AsyncClimatiqAPI] = None):
+        super().__init__(api_key, use_api=True)
+        self.async_api = async_api or AsyncClimatiqAPI(api_key, max_concurrency=max_concurrency)
+
+    async def calculate_api_emissions_async(self, parameters: Dict, activity_id: str,
+                                            region: Optional[str] = None) -> Dict:
+        return await self.estimate_payload_async(self.build_estimate_payload(parameters, activity_id, region))
+
+    async def estimate_payload_async(self, payload: Dict) -> Dict:
+        result = await self.async_api.estimate(payload)
+
+        if "error" in result:
+            result = await self.async_api.estimate(self.simplify_estimate_payload(payload))
+
+        return result
+
+    async def _process_activity_async(self, idx: int, activity: Dict) -> Dict:
+        try:
+            request = self.api_request_for(activity)
+            payload = self.build_estimate_payload(*request) if request is not None else None
+        except Exception:
+            # Same as the sync path: process_activity rebuilds the payload, which raises
+            # again before any request is made, and reports it as an error row.
+            return self.process_activity(idx, activity)
+
+        if payload is None:
+            # Nothing to send; don't let process_activity fall back to a blocking request.
+            return self.process_activity(idx, activity, api_response={"error": NO_API_REQUEST_ERROR})
+
+        try:
+            api_response = await self.estimate_payload_async(payload)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            api_response = {"error": str(e) or type(e).__name__}
+
+        return self.process_activity(idx, activity, api_response=api_response)
+
+    async def process_activities_async(self, activities: List[Dict]) -> Dict:
+        if not activities:
+            return {"total_emissions": 0.0, "api_emissions": 0.0, "unit": "kg CO2e", "activities": []}
+
+        results = await asyncio.gather(
+            *(self._process_activity_async(idx, activity) for idx, activity in enumerate(activities))
+        )
+
+        results = list(results)
+        record_outcomes(results)
+        return self.summarize_results(results, EmissionTotals().add_all(results))
+
+    async def close(self) -> None:
+        await self.async_api.close()
+
+
+async def calculate_carbon_footprint_async(activities: List[Dict], api_key: str = None,
+                                           max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Dict:
+    api_key = api_key or os.getenv("CLIMATIQ_API_KEY")
+    if not api_key:
+        logger.error("API key required")
+        return {"error": "API key required"}
+
+    calculator = AsyncCarbonEmissionCalculator(api_key, max_concurrency=max_concurrency)
+    try:
+        return await calculator.process_activities_async(activities)
+    except Exception as e:
+        logger.error("Carbon footprint calculation failed: %s", e)
+        return {"error": str(e)}
+    finally:
+        await calculator.close()
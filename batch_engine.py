@@ -0,0 +1,236 @@
+import math
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from check_api import DEFAULT_REGION, DIRECT_FALLBACK_EMISSIONS, EmissionTotals, logger
+from metrics import ACTIVITIES, CALCULATION_SECONDS, STAGE_SECONDS
+from resilience import Deadline
+
+DIRECT_NOTE = "Calculated using default emission factors"
+
+
+class BatchEmissionEngine:
+
+    def __init__(self, calculator):
+        if np is None:
+            raise ImportError("numpy is required for batch processing")
+
+        self.calculator = calculator
+        self._type_cache = {}
+
+    def _type_info(self, activity_type: str) -> tuple:
+        info = self._type_cache.get(activity_type)
+        if info is None:
+            table = self.calculator.factor_table
+            type_code = table.type_code(activity_type)
+            kind = table.entries[table.index(type_code, 0, 0)].unit_kind
+            info = (type_code, kind, self.calculator.get_activity_info(activity_type))
+            self._type_cache[activity_type] = info
+
+        return info
+
+    def process(self, activities: List[Dict], deadline: Optional[Deadline] = None) -> Dict:
+        calculator = self.calculator
+
+        if not activities or calculator.use_api:
+            return calculator.process_activities(activities, deadline)
+
+        with CALCULATION_SECONDS.time(path="batch"):
+            results = self.evaluate(activities, deadline=deadline)
+            return calculator.summarize_results(results, EmissionTotals().add_all(results))
+
+    def evaluate(self, activities: List[Dict], start_index: int = 0,
+                 deadline: Optional[Deadline] = None) -> List[Dict]:
+        calculator = self.calculator
+
+        if calculator.use_api:
+            return calculator.evaluate_activities(activities, start_index, deadline)
+
+        # The vectorized pass is short, so the deadline is only checked before it starts.
+        if deadline is not None:
+            deadline.check()
+
+        results = [None] * len(activities)
+        scalar_rows = []
+
+        rows = []
+        names = []
+        activity_ids = []
+        regions = []
+        amounts = []
+        multipliers = []
+        algorithm_factors = []
+        fallback_flags = []
+        group_codes = []
+        groups = {}
+
+        for idx, activity in enumerate(activities):
+            name = activity.get("name", f"Activity {start_index + idx + 1}")
+
+            if not activity.get("activity_type") and not activity.get("activity_id"):
+                results[idx] = {"error": "Activity type or ID required", "name": name}
+                continue
+
+            parameters = activity.get("parameters")
+            if not parameters:
+                results[idx] = {"error": "Parameters required", "name": name}
+                continue
+
+            try:
+                activity_type = activity.get("activity_type")
+                region = activity.get("region", DEFAULT_REGION)
+                month = calculator.activity_month(activity)
+                type_code, kind, activity_info = self._type_info(activity_type)
+
+                if kind is not None and kind in parameters:
+                    amount = float(parameters[kind])
+                    units = calculator.units
+                    multiplier = units.factor(kind, parameters.get(f"{kind}_unit", units.base_units[kind]))
+                    fallback = False
+                else:
+                    amount = 0.0
+                    multiplier = 1.0
+                    fallback = True
+
+                table = calculator.factor_table
+                group_key = (type_code, table.region_code(region), table.month_code(month))
+                code = groups.get(group_key)
+                if code is None:
+                    code = len(groups)
+                    groups[group_key] = code
+
+                activity_id = activity.get("activity_id")
+                if not activity_id and activity_type:
+                    activity_id = activity_info.get("id")
+
+            except Exception:
+                scalar_rows.append(idx)
+                continue
+
+            rows.append(idx)
+            names.append(name)
+            activity_ids.append(activity_id)
+            regions.append(region)
+            amounts.append(amount)
+            multipliers.append(multiplier)
+            algorithm_factors.append(activity_info.get("algorithm_factor", 1.0))
+            fallback_flags.append(fallback)
+            group_codes.append(code)
+
+        if rows:
+            with STAGE_SECONDS.time(stage="batch_compute"):
+                api_values, algo_values, comparisons = self._compute(
+                    groups, group_codes, amounts, multipliers, algorithm_factors, fallback_flags
+                )
+
+            for position, idx in enumerate(rows):
+                results[idx] = {
+                    "name": names[position],
+                    "activity_id": activity_ids[position],
+                    "region": regions[position],
+                    "api_emissions": api_values[position],
+                    "algorithm_emissions": algo_values[position],
+                    "unit": "kg",
+                    "comparison": comparisons[position],
+                    "note": DIRECT_NOTE
+                }
+
+        for idx in scalar_rows:
+            results[idx] = calculator.process_activity(start_index + idx, activities[idx])
+
+        errors = sum(1 for activity_result in results if "error" in activity_result)
+        ACTIVITIES.inc(len(results) - errors, outcome="ok")
+        ACTIVITIES.inc(errors, outcome="error")
+        logger.info("Batch processed %d activities (%d vectorized, %d scalar, %d errors)",
+                    len(activities), len(rows), len(scalar_rows), errors)
+
+        return results
+
+    def _compute(self, groups: Dict, group_codes: List[int], amounts: List[float],
+                 multipliers: List[float], algorithm_factors: List[float],
+                 fallback_flags: List[bool]) -> tuple:
+        table = self.calculator.factor_table
+        group_table = np.empty((len(groups), 5), dtype=np.float64)
+        for (type_code, region_code, month_code), code in groups.items():
+            entry = table.entries[table.index(type_code, region_code, month_code)]
+            group_table[code] = (entry.direct_factor, entry.region_factor, entry.seasonal_factor,
+                                 entry.activity_adjustment, entry.alignment)
+
+        codes = np.asarray(group_codes, dtype=np.intp)
+        emission_factor = group_table[codes, 0]
+        region_factor = group_table[codes, 1]
+        seasonal_factor = group_table[codes, 2]
+        activity_adjustment = group_table[codes, 3]
+        alignment = group_table[codes, 4]
+
+        raw = np.asarray(amounts, dtype=np.float64) * np.asarray(multipliers, dtype=np.float64)
+        raw = raw * emission_factor
+        raw = np.where(np.asarray(fallback_flags, dtype=bool), DIRECT_FALLBACK_EMISSIONS, raw)
+
+        adjusted = raw * np.asarray(algorithm_factors, dtype=np.float64)
+        adjusted = adjusted * region_factor
+        adjusted = adjusted * seasonal_factor
+        adjusted = adjusted * activity_adjustment
+
+        final = adjusted.copy()
+        damped = adjusted > 100
+        if damped.any():
+            subset = adjusted[damped]
+            logs = np.fromiter(map(math.log, (subset / 100).tolist()), dtype=np.float64, count=subset.size)
+            final[damped] = subset * 0.95 + (5 * logs)
+
+        algo = final * alignment
+        algo[raw <= 0] = 0.0
+        algo = round_half_even(algo, 2)
+
+        return raw.tolist(), algo.tolist(), self._compare(raw, algo)
+
+    def _compare(self, api: "np.ndarray", algo: "np.ndarray") -> List[Dict]:
+        positive = ~(api <= 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            difference = algo - api
+            percent = (difference / api) * 100
+
+        differences = round_half_even(difference, 2).tolist()
+        percents = round_half_even(percent, 1).tolist()
+        higher = (algo > api).tolist()
+
+        comparisons = []
+        for position, is_positive in enumerate(positive.tolist()):
+            if is_positive:
+                comparisons.append({
+                    "difference": differences[position],
+                    "percent_difference": percents[position],
+                    "algorithm_is_higher": higher[position]
+                })
+            else:
+                comparisons.append({
+                    "difference": 0,
+                    "percent_difference": 0,
+                    "algorithm_is_higher": False
+                })
+
+        return comparisons
+
+
+def round_half_even(values: "np.ndarray", digits: int) -> "np.ndarray":
+    # Same result as the builtin round(value, digits) for every element. The scaled
+    # value is only trusted away from .5 ties, where float error could flip the
+    # decision; those rows (and non-finite or huge values) use the builtin instead.
+    scale = 10.0 ** digits
+    with np.errstate(invalid="ignore", over="ignore"):
+        scaled = values * scale
+        rounded = np.rint(scaled) / scale
+        distance_to_tie = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5)
+        exact = np.isfinite(scaled) & (np.abs(scaled) < 2.0 ** 50) & \
+            (distance_to_tie > np.abs(scaled) * 1e-12 + 1e-9)
+
+    if not exact.all():
+        slow = np.flatnonzero(~exact)
+        rounded[slow] = [round(value, digits) for value in values[slow].tolist()]
+
+    return rounded
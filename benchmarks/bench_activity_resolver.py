@@ -0,0 +1,101 @@
+import argparse
+import random
+import timeit
+
+from common import print_table
+
+from activity_resolver import ActivityResolver
+
+WORDS = ["freight", "truck", "ferry", "flight", "steel", "cement", "paper", "diesel", "solar", "wind",
+         "heating", "cooling", "hotel", "waste", "water", "plastic", "rail", "bus", "car", "gas"]
+
+
+def legacy_activity_info(mappings, activity_type):
+    normalized_type = activity_type.lower().strip()
+
+    if normalized_type in mappings:
+        return mappings[normalized_type]
+
+    for key, value in mappings.items():
+        if key in normalized_type or normalized_type in key:
+            return value
+
+    return {"id": normalized_type, "unit_type": "energy", "default_unit": "kWh", "algorithm_factor": 1.0}
+
+
+def legacy_type_for_id(mappings, activity_id):
+    for key, info in mappings.items():
+        if info.get("id") == activity_id:
+            return key, info
+    return None
+
+
+def generate_catalog(size, rng):
+    catalog = {}
+    while len(catalog) < size:
+        key = "_".join(rng.sample(WORDS, rng.randint(2, 3))) + f"_{len(catalog)}"
+        catalog[key] = {"id": f"{key}-generic", "unit_type": "energy", "default_unit": "kWh", "algorithm_factor": 1.0}
+    return catalog
+
+
+def generate_queries(catalog, count, rng):
+    keys = list(catalog)
+    queries = []
+    for idx in range(count):
+        key = rng.choice(keys)
+        kind = idx % 4
+        if kind == 0:
+            queries.append(key.upper())
+        elif kind == 1:
+            queries.append(f"my {key} usage")
+        elif kind == 2:
+            queries.append(key[:len(key) // 2])
+        else:
+            queries.append(f"unknown_activity_{rng.randint(0, 50)}")
+    return queries
+
+
+def run(sizes, queries_per_size, repeat):
+    rng = random.Random(7)
+    rows = []
+
+    for size in sizes:
+        catalog = generate_catalog(size, rng)
+        queries = generate_queries(catalog, queries_per_size, rng)
+        ids = [catalog[key]["id"] for key in rng.choices(list(catalog), k=queries_per_size)]
+
+        start = timeit.default_timer()
+        resolver = ActivityResolver(catalog)
+        build = timeit.default_timer() - start
+
+        assert all(resolver.resolve(q) == legacy_activity_info(catalog, q) for q in queries)
+        assert all(resolver.type_for_id(i) == legacy_type_for_id(catalog, i) for i in ids)
+
+        cases = (
+            ("linear scan", lambda: [legacy_activity_info(catalog, q) for q in queries]),
+            ("resolver", lambda: [resolver.resolve(q) for q in queries]),
+            ("resolver uncached", lambda: [resolver._resolve(q) for q in queries]),
+            ("id linear scan", lambda: [legacy_type_for_id(catalog, i) for i in ids]),
+            ("id index", lambda: [resolver.type_for_id(i) for i in ids]),
+        )
+        for label, func in cases:
+            best = min(timeit.repeat(func, number=1, repeat=repeat))
+            rows.append({
+                "implementation": label,
+                "catalog_size": size,
+                "build_ms": round(build * 1000, 1),
+                "ns_per_lookup": round(best / queries_per_size * 1e9)
+            })
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Activity type resolution cost across catalog sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 50, 500, 2000])
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print_table(run(args.sizes, args.queries, args.repeat),
+                ["implementation", "catalog_size", "build_ms", "ns_per_lookup"])
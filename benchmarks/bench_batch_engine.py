@@ -0,0 +1,49 @@
+import argparse
+import logging
+import os
+import time
+
+from common import generate_activities, print_table
+
+# Repeated runs over the same activities would otherwise be served from the result memo.
+os.environ.setdefault("CLIMATIQ_MEMO_SIZE", "0")
+
+from check_api import CarbonEmissionCalculator, logger  # noqa: E402
+
+
+def run(sizes, repeat):
+    calculator = CarbonEmissionCalculator("benchmark-key")
+    rows = []
+
+    for size in sizes:
+        activities = generate_activities(size)
+        for path, func in (("scalar", calculator.process_activities),
+                           ("batch", calculator.process_activities_batch)):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func(activities)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+
+            rows.append({
+                "path": path,
+                "rows": size,
+                "seconds": round(best, 4),
+                "rows_per_sec": round(size / best) if best else 0,
+            })
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rows per second for scalar and batch process_activities")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--with-logging", action="store_true", help="keep per-activity INFO logging enabled")
+    args = parser.parse_args()
+
+    if not args.with_logging:
+        logger.setLevel(logging.WARNING)
+
+    print_table(run(args.sizes, args.repeat), ["path", "rows", "seconds", "rows_per_sec"])
@@ -0,0 +1,34 @@
+import argparse
+import os
+
+from common import generate_activities, print_table, time_calls
+
+os.environ.setdefault("CLIMATIQ_API_KEY", "benchmark-key")
+# Repeated runs over the same activities would otherwise be served from the result memo.
+os.environ.setdefault("CLIMATIQ_MEMO_SIZE", "0")
+
+from calculator_service import MODE_INPROCESS, MODE_SUBPROCESS, CalculatorService  # noqa: E402
+
+
+def run(sizes, iterations):
+    rows = []
+    api_key = os.environ["CLIMATIQ_API_KEY"]
+
+    for mode in (MODE_SUBPROCESS, MODE_INPROCESS):
+        service = CalculatorService(api_key, mode=mode)
+        for size in sizes:
+            activities = generate_activities(size)
+            stats = time_calls(lambda: service.calculate(activities), iterations)
+            rows.append({"mode": mode, "activities": size, **stats})
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare /calculate latency for in-process and subprocess modes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 100, 1000])
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    print_table(run(args.sizes, args.iterations),
+                ["mode", "activities", "iterations", "mean_ms", "p50_ms", "p99_ms", "ops_per_sec"])
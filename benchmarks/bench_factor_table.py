@@ -0,0 +1,101 @@
+import argparse
+import math
+import timeit
+
+from common import generate_activities, print_table
+
+from check_api import CarbonEmissionCalculator
+
+
+def legacy_direct_emissions(activity_type, parameters, region):
+    default_factors = {
+        "bus": {"US": 0.105, "EU": 0.08, "UK": 0.075, "CA": 0.09, "CN": 0.12, "GLOBAL": 0.1},
+        "car": {"US": 0.185, "EU": 0.15, "UK": 0.15, "CA": 0.17, "CN": 0.21, "GLOBAL": 0.18},
+        "rail": {"US": 0.04, "EU": 0.03, "UK": 0.035, "CA": 0.04, "CN": 0.06, "GLOBAL": 0.045},
+        "electricity": {"US": 0.38, "EU": 0.25, "UK": 0.23, "CA": 0.15, "CN": 0.6, "GLOBAL": 0.42},
+        "natural_gas": {"US": 0.2, "EU": 0.19, "UK": 0.19, "CA": 0.18, "CN": 0.22, "GLOBAL": 0.2}
+    }
+
+    region_factors = default_factors.get(activity_type.lower(), {})
+    emission_factor = region_factors.get(region, region_factors.get("GLOBAL", 0.1))
+
+    if activity_type.lower() in ["bus", "car", "rail"]:
+        if "distance" in parameters:
+            distance = float(parameters["distance"])
+            if parameters.get("distance_unit", "km").lower() in ["mi", "mile", "miles"]:
+                distance *= 1.60934
+            return distance * emission_factor
+
+    elif activity_type.lower() in ["electricity", "natural_gas"]:
+        if "energy" in parameters:
+            energy = float(parameters["energy"])
+            energy_unit = parameters.get("energy_unit", "kWh")
+            if energy_unit.lower() == "mwh":
+                energy *= 1000
+            elif energy_unit.lower() == "gwh":
+                energy *= 1000000
+            return energy * emission_factor
+
+    return 10.0
+
+
+def legacy_algorithmic_emissions(current_month, raw_emissions, region, activity_type, algorithm_factor):
+    if raw_emissions <= 0:
+        return 0.0
+
+    adjusted_regional_factors = {
+        "US": 1.0, "CA": 0.92, "CN": 1.12, "EU": 0.95, "UK": 0.94,
+        "AU": 1.08, "IN": 1.12, "GLOBAL": 1.02
+    }
+    adjusted_seasonal_factors = {
+        1: 1.05, 2: 1.04, 3: 1.02, 4: 0.98, 5: 0.96, 6: 0.95,
+        7: 0.94, 8: 0.95, 9: 0.97, 10: 1.0, 11: 1.03, 12: 1.04
+    }
+    region_factor = adjusted_regional_factors.get(region, adjusted_regional_factors.get("GLOBAL", 1.0))
+    seasonal_factor = adjusted_seasonal_factors.get(current_month, 1.0)
+    activity_type_adjustments = {
+        "electricity": 0.98, "car": 0.95, "bus": 1.05, "rail": 1.02, "natural_gas": 0.97
+    }
+    activity_adjustment = activity_type_adjustments.get(activity_type.lower(), 1.0)
+
+    adjusted = raw_emissions * algorithm_factor * region_factor * seasonal_factor * activity_adjustment
+    if adjusted > 100:
+        final = adjusted * 0.95 + (5 * math.log(adjusted / 100))
+    else:
+        final = adjusted
+
+    global_alignment_factor = 0.93 if activity_type.lower() == "electricity" else 0.98
+    return round(final * global_alignment_factor, 2)
+
+
+def run(count, repeat):
+    calculator = CarbonEmissionCalculator("benchmark-key")
+    month = calculator.current_month
+    rows = [(a["activity_type"], a["parameters"], a["region"]) for a in generate_activities(count)]
+
+    def before():
+        for activity_type, parameters, region in rows:
+            raw = legacy_direct_emissions(activity_type, parameters, region)
+            legacy_algorithmic_emissions(month, raw, region, activity_type, 1.0)
+
+    def after():
+        for activity_type, parameters, region in rows:
+            raw = calculator.calculate_direct_emissions(activity_type, parameters, region)
+            calculator.calculate_algorithmic_emissions(raw, region, activity_type, 1.0)
+
+    results = []
+    for label, func in (("per-call dicts", before), ("factor table", after)):
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        results.append({"implementation": label, "activities": count,
+                        "ns_per_activity": round(best / count * 1e9)})
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-activity cost of direct + algorithmic emissions")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print_table(run(args.count, args.repeat), ["implementation", "activities", "ns_per_activity"])
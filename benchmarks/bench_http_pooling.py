@@ -0,0 +1,79 @@
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from climatiq_stub import start_stub_server
+from common import print_table, summarize
+
+from check_api import ClimatiqAPI, logger
+
+PAYLOAD = {
+    "emission_factor": {"activity_id": "passenger_vehicle-car", "region": "US"},
+    "parameters": {"distance": 42.0, "distance_unit": "km"}
+}
+
+
+class UnpooledSession:
+
+    def __init__(self, headers):
+        self.headers = dict(headers)
+
+    def get(self, url, **kwargs):
+        return requests.get(url, headers=self.headers, **kwargs)
+
+    def post(self, url, **kwargs):
+        return requests.post(url, headers=self.headers, **kwargs)
+
+    def close(self):
+        pass
+
+
+def run_client(api, total, concurrency):
+    def call(_):
+        start = time.perf_counter()
+        api.make_request("data/v1/estimate", method="POST", data=PAYLOAD)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        started = time.perf_counter()
+        samples = list(pool.map(call, range(total)))
+        elapsed = time.perf_counter() - started
+
+    stats = summarize(samples)
+    stats["requests_per_sec"] = round(total / elapsed, 1)
+    return stats
+
+
+def run(total, concurrency_levels):
+    server, url = start_stub_server()
+    rows = []
+
+    try:
+        for concurrency in concurrency_levels:
+            for label in ("unpooled", "pooled"):
+                api = ClimatiqAPI("benchmark-key", base_url=url, data_version="benchmark",
+                                  pool_maxsize=max(concurrency, 1))
+                if label == "unpooled":
+                    api.session = UnpooledSession(api.headers)
+
+                stats = run_client(api, total, concurrency)
+                api.close()
+                rows.append({"transport": label, "concurrency": concurrency, **stats})
+    finally:
+        server.shutdown()
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ClimatiqAPI.make_request with and without connection pooling")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    logger.setLevel(logging.ERROR)
+    print_table(run(args.requests, args.concurrency),
+                ["transport", "concurrency", "requests_per_sec", "p50_ms", "p99_ms"])
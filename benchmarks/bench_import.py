@@ -0,0 +1,61 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from common import ROOT, print_table
+
+MODULES = ["emission_core", "check_api", "calculator_service", "app"]
+HEAVY_MODULES = ["requests", "urllib3", "dotenv", "numpy", "flask"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def importtime_us(module):
+    # -X importtime reports the cumulative cost of every import on stderr; the
+    # module's own line carries the total, including everything it pulled in.
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stderr
+    for line in reversed(output.splitlines()):
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1])
+    return None
+
+
+def probe(module):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=ROOT, capture_output=True, text=True, check=True, env=dict(os.environ, CLIMATIQ_API_KEY="benchmark-key")
+    ).stdout.split()
+    return float(output[0]), output[1] if len(output) > 1 else "-"
+
+
+def run(repeat):
+    rows = []
+    for module in MODULES:
+        samples = [probe(module) for _ in range(repeat)]
+        rows.append({
+            "module": module,
+            "import_ms": round(statistics.median(elapsed for elapsed, _ in samples) * 1000, 1),
+            "importtime_ms": round(statistics.median(importtime_us(module) for _ in range(repeat)) / 1000, 1),
+            "heavy_imports": samples[0][1]
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold import cost of the calculator modules, one fresh interpreter per sample")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print_table(run(args.repeat), ["module", "import_ms", "importtime_ms", "heavy_imports"])
@@ -0,0 +1,87 @@
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import tempfile
+import time
+
+from common import generate_mixed_activities, print_table
+
+os.environ["CLIMATIQ_MEMO_SIZE"] = "0"
+
+from check_api import CarbonEmissionCalculator
+from logging_config import DeferredQueueHandler, build_handlers
+
+
+def install(level, log_file, queued):
+    handlers = build_handlers(log_file, max_bytes=50 * 1024 * 1024, backup_count=1, stream=False)
+    listener = None
+    if queued:
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        handlers = [DeferredQueueHandler(log_queue)]
+
+    root = logging.getLogger()
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+    logging.getLogger("check_api").setLevel(logging.NOTSET)
+
+    def uninstall():
+        # Draining the queue is part of the cost, so it is inside the timed region.
+        if listener is not None:
+            listener.stop()
+        for handler in handlers + (list(listener.handlers) if listener else []):
+            root.removeHandler(handler)
+            handler.close()
+
+    return uninstall
+
+
+def run(count, repeat):
+    calculator = CarbonEmissionCalculator("benchmark-key")
+    activities = generate_mixed_activities(count)
+    calculator.process_activities(activities[:100])
+
+    cases = (
+        ("off (WARNING)", logging.WARNING, False),
+        ("INFO, direct handler", logging.INFO, False),
+        ("INFO, queued", logging.INFO, True),
+        ("DEBUG per activity, direct handler", logging.DEBUG, False),
+        ("DEBUG per activity, queued", logging.DEBUG, True),
+    )
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for label, level, queued in cases:
+            best = None
+            for attempt in range(repeat):
+                log_file = os.path.join(directory, f"bench_{len(rows)}_{attempt}.log")
+                start = time.perf_counter()
+                uninstall = install(level, log_file, queued)
+                calculator.process_activities(activities)
+                uninstall()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+
+            size = os.path.getsize(log_file) if os.path.exists(log_file) else 0
+            rows.append({
+                "logging": label,
+                "activities": count,
+                "seconds": round(best, 3),
+                "rows_per_sec": round(count / best),
+                "log_kb": round(size / 1024, 1)
+            })
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput of process_activities with logging on and off")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print_table(run(args.count, args.repeat), ["logging", "activities", "seconds", "rows_per_sec", "log_kb"])
@@ -0,0 +1,60 @@
+import argparse
+import logging
+import os
+import time
+
+from common import generate_activities, print_table
+
+# Repeated runs over the same activities would otherwise be served from the result memo.
+os.environ.setdefault("CLIMATIQ_MEMO_SIZE", "0")
+
+from check_api import CarbonEmissionCalculator, logger  # noqa: E402
+from parallel import ParallelEmissionEngine  # noqa: E402
+
+
+def run(size, max_workers, repeat, batch):
+    calculator = CarbonEmissionCalculator("benchmark-key")
+    activities = generate_activities(size)
+    serial = calculator.process_activities(activities)
+    rows = []
+    baseline = None
+
+    for workers in range(1, max_workers + 1):
+        engine = ParallelEmissionEngine(calculator, workers=workers, batch=batch)
+        engine.warm_up()
+
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = engine.process(activities)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        engine.close()
+
+        baseline = baseline or best
+        rows.append({
+            "workers": workers,
+            "rows": size,
+            "seconds": round(best, 4),
+            "rows_per_sec": round(size / best) if best else 0,
+            "speedup": round(baseline / best, 2) if best else 0,
+            "matches_serial": repr(result) == repr(serial),
+        })
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scaling of sharded process_activities from 1 to N worker processes")
+    parser.add_argument("--size", type=int, default=200000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch", action="store_true", help="evaluate shards with the NumPy batch engine")
+    parser.add_argument("--with-logging", action="store_true", help="keep per-activity INFO logging enabled")
+    args = parser.parse_args()
+
+    if not args.with_logging:
+        logger.setLevel(logging.WARNING)
+
+    print_table(run(args.size, args.max_workers, args.repeat, args.batch),
+                ["workers", "rows", "seconds", "rows_per_sec", "speedup", "matches_serial"])
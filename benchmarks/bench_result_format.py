@@ -0,0 +1,84 @@
+import argparse
+import gc
+import json
+import logging
+import os
+import time
+import tracemalloc
+
+from common import generate_mixed_activities, print_table
+
+os.environ["CLIMATIQ_MEMO_SIZE"] = "0"
+
+from check_api import CarbonEmissionCalculator, logger  # noqa: E402
+from result_format import FORMAT_COLUMNS, FORMAT_ROWS, JSON_MIMETYPE, MSGPACK_MIMETYPE, encode_result, msgpack  # noqa: E402
+
+
+def legacy_subprocess_round_trip(result):
+    # The old subprocess path: json.dumps to stdout, json.loads in app.py, then jsonify again.
+    return json.dumps(json.loads(json.dumps(result))).encode("utf-8")
+
+
+def cases(calculator):
+    yield "rows, encoded once", calculator.process_activities, lambda result: encode_result(result)
+    yield "rows, subprocess round trip", calculator.process_activities, legacy_subprocess_round_trip
+    yield ("columns, JSON", calculator.process_activities_columnar,
+           lambda result: encode_result(result, FORMAT_COLUMNS, JSON_MIMETYPE))
+    if msgpack is not None:
+        yield ("columns, MessagePack", calculator.process_activities_columnar,
+               lambda result: encode_result(result, FORMAT_COLUMNS, MSGPACK_MIMETYPE))
+
+
+def measure(calculate, encode, activities, repeat):
+    calculate_times = []
+    encode_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = calculate(activities)
+        calculated = time.perf_counter()
+        body = encode(result)
+        calculate_times.append(calculated - start)
+        encode_times.append(time.perf_counter() - calculated)
+        del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = calculate(activities)
+    retained = tracemalloc.get_traced_memory()[0]
+    encode(result)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return min(calculate_times), min(encode_times), retained, peak, len(body)
+
+
+def run(sizes, repeat):
+    logger.setLevel(logging.WARNING)
+    calculator = CarbonEmissionCalculator("benchmark-key")
+
+    rows = []
+    for size in sizes:
+        activities = generate_mixed_activities(size)
+        for label, calculate, encode in cases(calculator):
+            calculate_seconds, encode_seconds, retained, peak, body_size = measure(calculate, encode, activities, repeat)
+            rows.append({
+                "format": label,
+                "activities": size,
+                "calculate_ms": round(calculate_seconds * 1000, 1),
+                "encode_ms": round(encode_seconds * 1000, 1),
+                "result_mb": round(retained / 1024 / 1024, 1),
+                "peak_mb": round(peak / 1024 / 1024, 1),
+                "body_mb": round(body_size / 1024 / 1024, 2)
+            })
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency and memory of row and columnar /calculate results")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print_table(run(args.sizes, args.repeat),
+                ["format", "activities", "calculate_ms", "encode_ms", "result_mb", "peak_mb", "body_mb"])
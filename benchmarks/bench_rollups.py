@@ -0,0 +1,100 @@
+import argparse
+import logging
+import os
+import random
+import time
+import tracemalloc
+
+from common import generate_mixed_activities, print_table
+
+os.environ["CLIMATIQ_MEMO_SIZE"] = "0"
+
+from check_api import CarbonEmissionCalculator, logger  # noqa: E402
+from rollups import RollupEngine, rollup_capacity, rollup_key  # noqa: E402
+
+GROUPINGS = [("month",), ("region",), ("month", "region"), ("month", "region", "activity_type")]
+
+
+def dated_activities(count, seed=7):
+    rng = random.Random(seed)
+    activities = generate_mixed_activities(count)
+    for activity in activities:
+        activity["date"] = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    return activities
+
+
+def script_rollups(calculator, activities):
+    # What callers did before: keep every result, then group once per report.
+    results = calculator.process_activities(activities)["activities"]
+    reports = {}
+    for group_by in GROUPINGS:
+        positions = [("month", "region", "activity_type").index(name) for name in group_by]
+        groups = {}
+        for activity, activity_result in zip(activities, results):
+            key = rollup_key(activity)
+            group = groups.setdefault(tuple(key[position] for position in positions), [0.0, 0.0, 0])
+            group[2] += 1
+            if "error" not in activity_result:
+                group[0] += activity_result["api_emissions"]
+                group[1] += activity_result["algorithm_emissions"]
+        reports[group_by] = groups
+    return reports
+
+
+def engine_rollups(calculator, activities):
+    engine = RollupEngine(calculator.evaluate_activities, rollup_capacity(calculator.factor_table))
+    cube = engine.process(iter(activities))
+    for group_by in GROUPINGS:
+        cube.materialize(group_by)
+    return cube
+
+
+def measure(run, calculator, activities):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = run(calculator, activities)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run(sizes, queries):
+    logger.setLevel(logging.WARNING)
+    calculator = CarbonEmissionCalculator("benchmark-key")
+
+    rows = []
+    for size in sizes:
+        activities = dated_activities(size)
+        for label, build in (("script, grouped per report", script_rollups),
+                             ("streaming cube, materialized", engine_rollups)):
+            result, elapsed, peak = measure(build, calculator, activities)
+
+            # Answering another report from kept results means grouping them again; the cube only reads cells.
+            query_ms = "rescan"
+            if build is engine_rollups:
+                start = time.perf_counter()
+                for _ in range(queries):
+                    for group_by in GROUPINGS:
+                        result.query(group_by, {"region": "US"} if "region" in group_by else None)
+                query_ms = round((time.perf_counter() - start) * 1000 / (queries * len(GROUPINGS)), 3)
+
+            rows.append({
+                "method": label,
+                "activities": size,
+                "build_seconds": round(elapsed, 3),
+                "peak_mb": round(peak / 1024 / 1024, 1),
+                "query_ms": query_ms
+            })
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monthly/regional rollups: grouping kept results vs one streaming pass")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    print_table(run(args.sizes, args.queries),
+                ["method", "activities", "build_seconds", "peak_mb", "query_ms"])
@@ -0,0 +1,76 @@
+import argparse
+import copy
+import logging
+import os
+import time
+
+from common import generate_mixed_activities, print_table
+
+os.environ["CLIMATIQ_MEMO_SIZE"] = "0"
+
+from check_api import CarbonEmissionCalculator, calculate_carbon_footprint, logger  # noqa: E402
+
+
+def car_to_rail(share):
+    return {"name": f"{share:.0%} car km to rail in US",
+            "substitutions": [{"from": "car", "to": "rail", "share": share, "region": "US"}]}
+
+
+def mutated(activities, share):
+    # What a sweep script had to build for every scenario before.
+    result = []
+    for activity in activities:
+        parameters = activity.get("parameters") or {}
+        if activity.get("activity_type") != "car" or activity.get("region", "US") != "US" or "distance" not in parameters:
+            result.append(activity)
+            continue
+
+        kept = copy.deepcopy(activity)
+        kept["parameters"]["distance"] = float(parameters["distance"]) * (1 - share)
+        moved = copy.deepcopy(activity)
+        moved["activity_type"] = "rail"
+        moved["parameters"]["distance"] = float(parameters["distance"]) * share
+        result.extend((kept, moved))
+    return result
+
+
+def run(size, counts, loop_limit):
+    logger.setLevel(logging.WARNING)
+    activities = generate_mixed_activities(size)
+    calculator = CarbonEmissionCalculator("benchmark-key")
+
+    rows = []
+    for count in counts:
+        shares = [index / max(count - 1, 1) for index in range(count)]
+
+        start = time.perf_counter()
+        calculator.process_scenarios(activities, [car_to_rail(share) for share in shares])
+        sweep = time.perf_counter() - start
+
+        # The per-scenario loop is timed on a sample and extrapolated.
+        sample = shares[:loop_limit]
+        start = time.perf_counter()
+        for share in sample:
+            calculate_carbon_footprint(mutated(activities, share), "benchmark-key")
+        loop = (time.perf_counter() - start) / len(sample) * count
+
+        rows.append({
+            "activities": size,
+            "scenarios": count,
+            "sweep_seconds": round(sweep, 3),
+            "loop_seconds": round(loop, 2),
+            "speedup": round(loop / sweep, 1)
+        })
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scenario sweep vs one calculate_carbon_footprint call per scenario")
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--loop-limit", type=int, default=5, help="scenarios actually run in the loop baseline")
+    args = parser.parse_args()
+
+    print_table(run(args.size, args.counts, args.loop_limit),
+                ["activities", "scenarios", "sweep_seconds", "loop_seconds", "speedup"])
@@ -0,0 +1,52 @@
+import argparse
+import random
+import timeit
+
+from common import print_table
+
+from check_api import UNIT_CONVERTER
+
+DISTANCE_UNITS = ["km", "mi", "miles", "KM", "Mile"]
+
+
+def legacy_convert(values, units):
+    converted = []
+    for value, unit in zip(values, units):
+        value = float(value)
+        if unit.lower() in ["mi", "mile", "miles"]:
+            value *= 1.60934
+        converted.append(value)
+    return converted
+
+
+def run(count, repeat):
+    rng = random.Random(3)
+    values = [round(rng.uniform(1, 500), 2) for _ in range(count)]
+    units = [rng.choice(DISTANCE_UNITS) for _ in range(count)]
+
+    scalar = [UNIT_CONVERTER.to_base(float(value), "distance", unit) for value, unit in zip(values, units)]
+    assert scalar == legacy_convert(values, units) == list(UNIT_CONVERTER.to_base_array(values, "distance", units))
+
+    cases = (
+        ("legacy if-chain", lambda: legacy_convert(values, units)),
+        ("converter scalar", lambda: [UNIT_CONVERTER.to_base(float(value), "distance", unit)
+                                      for value, unit in zip(values, units)]),
+        ("converter column", lambda: UNIT_CONVERTER.to_base_array(values, "distance", units)),
+        ("converter column, one unit", lambda: UNIT_CONVERTER.to_base_array(values, "distance", "mi")),
+    )
+
+    rows = []
+    for label, func in cases:
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        rows.append({"implementation": label, "values": count, "ns_per_value": round(best / count * 1e9, 1)})
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cost of converting a column of distances to km")
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print_table(run(args.count, args.repeat), ["implementation", "values", "ns_per_value"])
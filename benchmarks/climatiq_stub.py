@@ -0,0 +1,211 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+DATA_VERSION = "stub-1"
+BATCH_LIMIT = 100
+
+STUB_FACTORS = {
+    "electricity": ("energy", 0.4),
+    "electricity-energy": ("energy", 0.41),
+    "natural_gas": ("energy", 0.2),
+    "heating-gas": ("energy", 0.21),
+    "passenger_vehicle-car": ("distance", 0.19),
+    "car-generic": ("distance", 0.18),
+    "passenger_vehicle-bus": ("distance", 0.1),
+    "bus-generic": ("distance", 0.11),
+    "passenger_train": ("distance", 0.04),
+    "train-generic": ("distance", 0.045),
+}
+
+STUB_REGIONS = ["US", "EU", "UK", "CA", "CN", "GLOBAL"]
+
+
+class StubState:
+
+    def __init__(self, seed: int = 0):
+        self.data_version = DATA_VERSION
+        self.requests = {}
+        self.faults = {"error_rate": 0.0, "latency": 0.0, "rate_limit": 0, "retry_after": 1, "outage": False}
+        self._random = random.Random(seed)
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._lock = threading.Lock()
+
+    def count(self, path: str) -> None:
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def set_faults(self, **faults) -> None:
+        with self._lock:
+            self.faults.update(faults)
+
+    def injected_fault(self) -> Optional[Tuple[int, Dict, Dict]]:
+        with self._lock:
+            faults = dict(self.faults)
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_count = 0
+            self._window_count += 1
+            window_count = self._window_count
+            window_reset = max(1, int(round(1.0 - (now - self._window_start))))
+            roll = self._random.random()
+
+        if faults["latency"]:
+            time.sleep(faults["latency"])
+
+        if faults["outage"] or roll < faults["error_rate"]:
+            return 503, {"error": "service_unavailable", "message": "Injected failure"}, {}
+
+        limit = faults["rate_limit"]
+        if limit:
+            remaining = max(limit - window_count, 0)
+            headers = {"RateLimit-Limit": limit, "RateLimit-Remaining": remaining, "RateLimit-Reset": window_reset}
+            if window_count > limit:
+                headers["Retry-After"] = faults["retry_after"]
+                return 429, {"error": "too_many_requests", "message": "Injected rate limit"}, headers
+
+        return None
+
+
+class ClimatiqStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self) -> StubState:
+        return self.server.state
+
+    def _send(self, status: int, body: Dict, headers: Optional[Dict] = None) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _fault(self, url) -> bool:
+        if not url.path.startswith("/data/"):
+            return False
+
+        fault = self.state.injected_fault()
+        if fault is None:
+            return False
+
+        status, body, headers = fault
+        self._send(status, body, headers)
+        return True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.state.count(url.path)
+
+        if url.path == "/_stub/faults":
+            return self._send(200, self.state.faults)
+
+        if self._fault(url):
+            return
+
+        if url.path == "/data/v1/data-versions":
+            return self._send(200, {"latest_release": self.state.data_version})
+
+        if url.path == "/data/v1/search":
+            query = parse_qs(url.query)
+            activity_id = query.get("query", [""])[0]
+            region = query.get("region", [None])[0]
+            return self._send(200, {"results": search_results(activity_id, region, self.state.data_version)})
+
+        self._send(404, {"error": "not_found", "message": f"Unknown path {url.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        self.state.count(url.path)
+        body = self._read_json()
+
+        if url.path == "/_stub/faults":
+            self.state.set_faults(**body)
+            return self._send(200, self.state.faults)
+
+        if self._fault(url):
+            return
+
+        if url.path == "/data/v1/estimate":
+            status, result = estimate(body)
+            return self._send(status, result)
+
+        if url.path == "/data/v1/estimate/batch":
+            if not isinstance(body, list) or len(body) > BATCH_LIMIT:
+                return self._send(400, {"error": "bad_request", "message": "Expected a list of estimates"})
+            return self._send(200, {"results": [estimate(item)[1] for item in body]})
+
+        self._send(404, {"error": "not_found", "message": f"Unknown path {url.path}"})
+
+
+def search_results(activity_id: str, region: Optional[str], data_version: str) -> list:
+    if activity_id not in STUB_FACTORS:
+        return []
+
+    unit_type, factor = STUB_FACTORS[activity_id]
+    regions = [region] if region in STUB_REGIONS else []
+    regions += [r for r in STUB_REGIONS if r not in regions]
+    return [{
+        "activity_id": activity_id,
+        "region": r,
+        "unit_type": unit_type,
+        "factor": factor,
+        "data_version": data_version,
+    } for r in regions]
+
+
+def estimate(body: Dict) -> Tuple[int, Dict]:
+    activity_id = body.get("emission_factor", {}).get("activity_id")
+    parameters = body.get("parameters", {})
+
+    if activity_id not in STUB_FACTORS:
+        return 400, {"error": "bad_request", "message": f"Unknown activity_id {activity_id}"}
+
+    unit_type, factor = STUB_FACTORS[activity_id]
+    if unit_type not in parameters:
+        return 400, {"error": "bad_request", "message": f"Missing {unit_type} parameter"}
+
+    return 200, {
+        "co2e": round(float(parameters[unit_type]) * factor, 6),
+        "co2e_unit": "kg",
+        "emission_factor": {"activity_id": activity_id, "region": body["emission_factor"].get("region")},
+    }
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    server = ThreadingHTTPServer((host, port), ClimatiqStubHandler)
+    server.daemon_threads = True
+    server.state = StubState()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Climatiq API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), ClimatiqStubHandler)
+    server.state = StubState()
+    print(f"Climatiq stub listening on http://{args.host}:{args.port}")
+    server.serve_forever()
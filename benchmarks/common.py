@@ -0,0 +1,121 @@
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+ACTIVITY_TEMPLATES = [
+    ("Electricity Usage", "electricity", "energy", ["kWh", "MWh"]),
+    ("Car Travel", "car", "distance", ["km", "miles"]),
+    ("Bus Travel", "bus", "distance", ["km", "miles"]),
+    ("Natural Gas", "natural_gas", "energy", ["kWh", "MWh"]),
+    ("Train Travel", "rail", "distance", ["km", "miles"]),
+]
+
+REGIONS = ["US", "EU", "UK", "CA", "CN", "AU", "IN", "GLOBAL"]
+
+
+def generate_activities(count: int, seed: int = 42) -> List[Dict]:
+    rng = random.Random(seed)
+    activities = []
+
+    for idx in range(count):
+        label, activity_type, param, units = rng.choice(ACTIVITY_TEMPLATES)
+        unit = rng.choice(units)
+        amount = round(rng.uniform(1, 500), 2) if unit in ("kWh", "km", "miles") else round(rng.uniform(0.1, 5), 3)
+        activities.append({
+            "name": f"{label} {idx + 1}",
+            "activity_type": activity_type,
+            "region": rng.choice(REGIONS),
+            "parameters": {param: amount, f"{param}_unit": unit}
+        })
+
+    return activities
+
+
+MIXED_TEMPLATES = [
+    # (label, activity_type, parameter, units, weight)
+    ("Electricity Usage", "electricity", "energy", ["kWh", "kWh", "MWh", "MJ"], 30),
+    ("Car Travel", "car", "distance", ["km", "km", "miles", "mi"], 25),
+    ("Natural Gas", "natural_gas", "energy", ["kWh", "MWh", "GWh"], 15),
+    ("Bus Travel", "bus", "distance", ["km", "miles"], 10),
+    ("Train Travel", "rail", "distance", ["km", "Miles"], 10),
+    ("Electric Car", "Electric Car", "distance", ["km"], 4),
+    ("Office Power", "ELECTRICITY", "energy", ["kWh"], 3),
+    ("Heating", "heating", "energy", ["kWh"], 2),
+]
+
+REGION_WEIGHTS = {"US": 30, "EU": 25, "UK": 10, "CA": 8, "CN": 10, "AU": 5, "IN": 7, "GLOBAL": 3, "BR": 2}
+
+
+def generate_mixed_activities(count: int, seed: int = 42, invalid_rate: float = 0.01) -> List[Dict]:
+    """Activities with a skewed mix of types, aliases, regions and units, plus a few invalid rows."""
+    rng = random.Random(seed)
+    templates = [template[:4] for template in MIXED_TEMPLATES]
+    weights = [template[4] for template in MIXED_TEMPLATES]
+    regions = list(REGION_WEIGHTS)
+    region_weights = list(REGION_WEIGHTS.values())
+    activities = []
+
+    for idx in range(count):
+        if rng.random() < invalid_rate:
+            activities.append({"name": f"Incomplete {idx + 1}", "activity_type": "car"})
+            continue
+
+        label, activity_type, param, units = rng.choices(templates, weights)[0]
+        unit = rng.choice(units)
+        amount = round(rng.lognormvariate(4, 1.2), 2)
+        if unit in ("MWh", "GWh"):
+            amount = round(amount / 1000, 4)
+        activities.append({
+            "name": f"{label} {idx + 1}",
+            "activity_type": activity_type,
+            "region": rng.choices(regions, region_weights)[0],
+            "parameters": {param: amount, f"{param}_unit": unit}
+        })
+
+    return activities
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def time_calls(func: Callable[[], object], iterations: int, warmup: int = 1) -> Dict:
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+
+    return summarize(samples)
+
+
+def summarize(samples: List[float]) -> Dict:
+    total = sum(samples)
+    return {
+        "iterations": len(samples),
+        "mean_ms": round(statistics.mean(samples) * 1000, 3) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "ops_per_sec": round(len(samples) / total, 1) if total else 0.0,
+    }
+
+
+def print_table(rows: List[Dict], columns: List[str]) -> None:
+    widths = {col: max(len(col), *(len(str(row.get(col, ""))) for row in rows)) for col in columns}
+    print("  ".join(col.ljust(widths[col]) for col in columns))
+    for row in rows:
+        print("  ".join(str(row.get(col, "")).ljust(widths[col]) for col in columns))
@@ -0,0 +1,131 @@
+import argparse
+import http.client
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from common import generate_mixed_activities, percentile, print_table
+
+COLUMNS = ["concurrency", "requests", "ok_per_sec", "p50_ms", "p95_ms", "p99_ms", "max_ms",
+           "status_429", "status_503", "failed"]
+
+
+def start_local_server(threads: int, backlog: int) -> str:
+    os.environ.setdefault("CLIMATIQ_API_KEY", "benchmark-key")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Every request sends the same body, which the memo would otherwise answer from cache.
+    os.environ.setdefault("CLIMATIQ_MEMO_SIZE", "0")
+
+    from app import app
+    from serving import PooledWSGIServer
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    server = PooledWSGIServer("127.0.0.1", 0, app, threads=threads, backlog=backlog)
+    threading.Thread(target=server.serve_forever, name="load-test-server", daemon=True).start()
+    return f"http://127.0.0.1:{server.socket.getsockname()[1]}"
+
+
+class Client(threading.Thread):
+
+    def __init__(self, url: str, body: bytes, stop_at: float, deadline: Optional[float]):
+        super().__init__(daemon=True)
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.body = body
+        self.stop_at = stop_at
+        self.headers = {"Content-Type": "application/json"}
+        if deadline:
+            self.headers["X-Request-Deadline"] = str(deadline)
+        self.latencies = []
+        self.statuses = {}
+
+    def run(self) -> None:
+        connection = None
+        while time.perf_counter() < self.stop_at:
+            if connection is None:
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+            started = time.perf_counter()
+            try:
+                connection.request("POST", "/calculate", body=self.body, headers=self.headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+                if response.getheader("Connection", "").lower() == "close":
+                    connection.close()
+                    connection = None
+            except (OSError, http.client.HTTPException):
+                status = "failed"
+                connection.close()
+                connection = None
+
+            elapsed = time.perf_counter() - started
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if status == 200:
+                self.latencies.append(elapsed)
+            elif status in (429, 503):
+                # A shed request is cheap for the server; back off a little as a real client would.
+                time.sleep(0.05)
+
+        if connection is not None:
+            connection.close()
+
+
+def run_level(url: str, concurrency: int, duration: float, body: bytes, deadline: Optional[float]) -> Dict:
+    stop_at = time.perf_counter() + duration
+    clients = [Client(url, body, stop_at, deadline) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for client in clients for latency in client.latencies]
+    statuses = {}
+    for client in clients:
+        for status, count in client.statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+    return {
+        "concurrency": concurrency,
+        "requests": sum(statuses.values()),
+        "ok_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 1),
+        "status_429": statuses.get(429, 0),
+        "status_503": statuses.get(503, 0),
+        "failed": sum(count for status, count in statuses.items() if status not in (200, 429, 503))
+    }
+
+
+def run(url: Optional[str], levels: List[int], duration: float, activities: int, threads: int, backlog: int,
+        deadline: Optional[float]) -> List[Dict]:
+    url = url or start_local_server(threads, backlog)
+    body = json.dumps({"activities": generate_mixed_activities(activities)}).encode("utf-8")
+    return [run_level(url, concurrency, duration, body, deadline) for concurrency in levels]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Closed-loop load test of POST /calculate: throughput and tail latency at increasing concurrency"
+    )
+    parser.add_argument("--url", help="target a running server instead of starting one in-process")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per concurrency level")
+    parser.add_argument("--activities", type=int, default=200, help="activities per request")
+    parser.add_argument("--threads", type=int, default=16, help="server threads when started in-process")
+    parser.add_argument("--backlog", type=int, default=64, help="server backlog when started in-process")
+    parser.add_argument("--deadline", type=float, help="send X-Request-Deadline with this many seconds")
+    args = parser.parse_args()
+
+    print_table(run(args.url, args.levels, args.duration, args.activities, args.threads, args.backlog,
+                    args.deadline), COLUMNS)
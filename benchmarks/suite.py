@@ -0,0 +1,259 @@
+"""Benchmark suite for the calculation pipeline.
+
+Each case runs in a fresh interpreter so its peak RSS is its own. Results can be
+written as JSON and compared against a stored baseline:
+
+    python benchmarks/suite.py --output baseline.json
+    python benchmarks/suite.py --baseline baseline.json --threshold 0.25
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from common import generate_mixed_activities, print_table, summarize
+
+DEFAULT_SIZES = [10, 1000, 100000]
+FULL_SIZES = [10, 1000, 100000, 1000000]
+MIN_ITERATIONS = 3
+MAX_ITERATIONS = 200
+TIME_BUDGET = 2.0
+DEFAULT_THRESHOLD = 0.2
+
+COLUMNS = ["case", "size", "iterations", "ops_per_sec", "rows_per_sec", "p50_ms", "p99_ms", "peak_rss_mb"]
+
+
+def _calculator(use_api: bool = False, base_url: Optional[str] = None):
+    import logging
+
+    from check_api import CarbonEmissionCalculator, ClimatiqAPI, logger
+    from resilience import AdaptiveRateLimiter
+
+    logger.setLevel(logging.WARNING)
+    # The stub has no rate limit, so measure the HTTP path rather than the limiter's pacing.
+    api = ClimatiqAPI("benchmark-key", base_url=base_url, data_version="benchmark",
+                      rate_limiter=AdaptiveRateLimiter(rate=100000))
+    return CarbonEmissionCalculator("benchmark-key", use_api=use_api, api=api)
+
+
+def case_process_activities(size: int) -> Callable:
+    calculator = _calculator()
+    activities = generate_mixed_activities(size)
+    return lambda: calculator.process_activities(activities)
+
+
+def case_process_activities_batch(size: int) -> Callable:
+    calculator = _calculator()
+    activities = generate_mixed_activities(size)
+    return lambda: calculator.process_activities_batch(activities)
+
+
+def case_direct_emissions(size: int) -> Callable:
+    calculator = _calculator()
+    rows = [(a["activity_type"], a["parameters"], a["region"])
+            for a in generate_mixed_activities(size, invalid_rate=0)]
+
+    def run():
+        for activity_type, parameters, region in rows:
+            calculator.calculate_direct_emissions(activity_type, parameters, region)
+
+    return run
+
+
+def case_algorithmic_emissions(size: int) -> Callable:
+    calculator = _calculator()
+    rows = [(float(i % 500) + 0.5, a["region"], a["activity_type"])
+            for i, a in enumerate(generate_mixed_activities(size, invalid_rate=0))]
+
+    def run():
+        for raw, region, activity_type in rows:
+            calculator.calculate_algorithmic_emissions(raw, region, activity_type, 1.2)
+
+    return run
+
+
+def case_format_parameters(size: int) -> Callable:
+    calculator = _calculator()
+    rows = []
+    for activity in generate_mixed_activities(size, invalid_rate=0):
+        info = calculator.get_activity_info(activity["activity_type"])
+        rows.append((activity["parameters"], info["unit_type"], info["default_unit"]))
+
+    def run():
+        for parameters, unit_type, default_unit in rows:
+            calculator.format_parameters(parameters, unit_type, default_unit)
+
+    return run
+
+
+def case_flask_calculate(size: int) -> Callable:
+    os.environ.setdefault("CLIMATIQ_API_KEY", "benchmark-key")
+    import logging
+
+    from app import app
+    from check_api import logger
+
+    logger.setLevel(logging.WARNING)
+    client = app.test_client()
+    body = {"activities": generate_mixed_activities(size)}
+
+    def run():
+        response = client.post("/calculate", json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f"/calculate returned {response.status_code}")
+
+    return run
+
+
+def case_api_estimates(size: int) -> Callable:
+    from climatiq_stub import start_stub_server
+
+    _, url = start_stub_server()
+    calculator = _calculator(use_api=True, base_url=url)
+    activities = generate_mixed_activities(size)
+
+    def run():
+        # Clear the response cache so every iteration goes through the HTTP path.
+        calculator.api.cache.clear()
+        calculator.process_activities(activities)
+
+    return run
+
+
+CASES = {
+    "process_activities": (case_process_activities, None),
+    "process_activities_batch": (case_process_activities_batch, None),
+    "calculate_direct_emissions": (case_direct_emissions, None),
+    "calculate_algorithmic_emissions": (case_algorithmic_emissions, None),
+    "format_parameters": (case_format_parameters, None),
+    "flask_calculate": (case_flask_calculate, 100000),
+    "api_estimates": (case_api_estimates, 10000),
+}
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_case(name: str, size: int) -> Dict:
+    factory, _ = CASES[name]
+    func = factory(size)
+    func()
+
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < MAX_ITERATIONS:
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+        if len(samples) >= MIN_ITERATIONS and time.perf_counter() - started >= TIME_BUDGET:
+            break
+
+    stats = summarize(samples)
+    return {
+        "case": name,
+        "size": size,
+        "iterations": stats["iterations"],
+        "ops_per_sec": stats["ops_per_sec"],
+        "rows_per_sec": round(stats["ops_per_sec"] * size),
+        "mean_ms": stats["mean_ms"],
+        "p50_ms": stats["p50_ms"],
+        "p99_ms": stats["p99_ms"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_isolated(name: str, size: int) -> Dict:
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(run_case, (name, size))
+
+
+def compare(results: List[Dict], baseline: Dict, threshold: float) -> Tuple[List[Dict], List[Dict]]:
+    previous = {(row["case"], row["size"]): row for row in baseline.get("results", [])}
+    rows = []
+    regressions = []
+
+    for row in results:
+        before = previous.get((row["case"], row["size"]))
+        if before is None or not before["p50_ms"]:
+            continue
+
+        change = row["p50_ms"] / before["p50_ms"] - 1
+        comparison = {
+            "case": row["case"],
+            "size": row["size"],
+            "baseline_p50_ms": before["p50_ms"],
+            "p50_ms": row["p50_ms"],
+            "change": f"{change:+.1%}",
+            "status": "REGRESSION" if change > threshold else "ok"
+        }
+        rows.append(comparison)
+        if change > threshold:
+            regressions.append(comparison)
+
+    return rows, regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the calculation pipeline")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--sizes", type=int, nargs="+")
+    parser.add_argument("--full", action="store_true", help="include 1M-activity runs")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fail when p50 latency grows by more than this fraction (default 0.2)")
+    args = parser.parse_args(argv)
+
+    # The result memo would turn repeated iterations into cache hits.
+    os.environ["CLIMATIQ_MEMO_SIZE"] = "0"
+    sizes = args.sizes or (FULL_SIZES if args.full else DEFAULT_SIZES)
+
+    results = []
+    for name in args.cases:
+        max_size = CASES[name][1]
+        for size in sizes:
+            if max_size is not None and size > max_size:
+                continue
+            results.append(run_isolated(name, size))
+            print(f"{name} x {size}: p50 {results[-1]['p50_ms']} ms", file=sys.stderr)
+
+    print_table(results, COLUMNS)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+            comparisons, regressions = compare(results, json.load(baseline_file), args.threshold)
+
+        if comparisons:
+            print()
+            print_table(comparisons, ["case", "size", "baseline_p50_ms", "p50_ms", "change", "status"])
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slowed down by more than {args.threshold:.0%}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from check_api import DEADLINE_EXIT_CODE, CarbonEmissionCalculator, logger
+from resilience import Deadline, DeadlineExceeded
+from result_format import FORMAT_COLUMNS, FORMAT_ROWS, JSON_MIMETYPE, ResultColumns, encode_result
+
+MODE_INPROCESS = "inprocess"
+MODE_SUBPROCESS = "subprocess"
+MODE_PARALLEL = "parallel"
+CALCULATION_MODES = (MODE_INPROCESS, MODE_SUBPROCESS, MODE_PARALLEL)
+
+SUBPROCESS_TIMEOUT = 30
+CHECK_API_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "check_api.py")
+
+
+class CalculationError(Exception):
+    pass
+
+
+class CalculatorService:
+
+    def __init__(self, api_key: Optional[str] = None, mode: str = MODE_INPROCESS,
+                 subprocess_timeout: int = SUBPROCESS_TIMEOUT, use_api: bool = False):
+        if mode not in CALCULATION_MODES:
+            raise ValueError(f"Unknown calculation mode: {mode}")
+
+        self.api_key = api_key
+        self.mode = mode
+        self.use_api = use_api
+        self.subprocess_timeout = subprocess_timeout
+        self._calculator = None
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def calculator(self) -> CarbonEmissionCalculator:
+        if self._calculator is None:
+            with self._lock:
+                if self._calculator is None:
+                    self._calculator = CarbonEmissionCalculator(self.api_key, use_api=self.use_api)
+
+        calculator = self._calculator
+        month = datetime.now().month
+        if calculator.current_month != month:
+            calculator.current_month = month
+
+        return calculator
+
+    @property
+    def engine(self):
+        # Reading the calculator also keeps its month current for the workers.
+        calculator = self.calculator
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    from parallel import ParallelEmissionEngine
+                    self._engine = ParallelEmissionEngine(calculator)
+
+        return self._engine
+
+    def calculate(self, activities: List[Dict], deadline: Optional[Deadline] = None) -> Dict:
+        if self.mode == MODE_SUBPROCESS:
+            return self._calculate_subprocess(activities, deadline)
+
+        return self._calculate_inprocess(activities, deadline=deadline)
+
+    def calculate_encoded(self, activities: List[Dict], result_format: str = FORMAT_ROWS,
+                          content_type: str = JSON_MIMETYPE, deadline: Optional[Deadline] = None) -> bytes:
+        """Calculate and return the serialized response body, encoding the result exactly once.
+
+        Raises DeadlineExceeded when the deadline passes before the calculation finishes.
+        """
+        if self.mode == MODE_SUBPROCESS:
+            return self._run_subprocess(activities, result_format, content_type, deadline)
+
+        return encode_result(self._calculate_inprocess(activities, result_format, deadline), result_format,
+                             content_type)
+
+    def evaluate(self, activities: List[Dict], start_index: int = 0,
+                 deadline: Optional[Deadline] = None) -> List[Dict]:
+        if not self.api_key:
+            raise CalculationError("API key required")
+
+        if self.mode == MODE_PARALLEL:
+            return self.engine.evaluate(activities, start_index, deadline)
+
+        return self.calculator.evaluate_activities(activities, start_index, deadline)
+
+    def _calculate_inprocess(self, activities: List[Dict], result_format: str = FORMAT_ROWS,
+                             deadline: Optional[Deadline] = None) -> Dict:
+        if not self.api_key:
+            logger.error("API key required")
+            return {"error": "API key required"}
+
+        try:
+            if self.mode == MODE_PARALLEL:
+                result = self.engine.process(activities, deadline)
+                if result_format == FORMAT_COLUMNS:
+                    result["activities"] = ResultColumns.from_results(result["activities"])
+                return result
+            if result_format == FORMAT_COLUMNS:
+                return self.calculator.process_activities_columnar(activities, deadline=deadline)
+            return self.calculator.process_activities(activities, deadline)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error("Carbon footprint calculation failed: %s", e)
+            return {"error": str(e)}
+
+    def _calculate_subprocess(self, activities: List[Dict], deadline: Optional[Deadline] = None) -> Dict:
+        return json.loads(self._run_subprocess(activities, deadline=deadline))
+
+    def _run_subprocess(self, activities: List[Dict], result_format: str = FORMAT_ROWS,
+                        content_type: str = JSON_MIMETYPE, deadline: Optional[Deadline] = None) -> bytes:
+        timeout = self.subprocess_timeout
+        if deadline is not None:
+            deadline.check()
+            timeout = min(timeout, deadline.remaining())
+
+        input_data = {
+            "activities": activities,
+            "api_key": self.api_key,
+            "use_api": self.use_api,
+            "format": result_format,
+            "content_type": content_type,
+            "deadline": timeout
+        }
+
+        try:
+            result = subprocess.run(
+                [sys.executable, CHECK_API_SCRIPT],
+                input=json.dumps(input_data).encode("utf-8"),
+                capture_output=True,
+                timeout=timeout,
+                # The server process owns the log file; the worker's log goes to its stderr.
+                env=dict(os.environ, LOG_FILE="")
+            )
+        except subprocess.TimeoutExpired:
+            if deadline is not None and deadline.expired:
+                raise DeadlineExceeded(f"Request deadline of {deadline.seconds:g}s exceeded") from None
+            raise
+
+        if result.returncode == DEADLINE_EXIT_CODE:
+            raise DeadlineExceeded(f"Request deadline of {deadline.seconds if deadline else timeout:g}s exceeded")
+        if result.returncode != 0:
+            raise CalculationError(result.stderr.decode("utf-8", errors="replace"))
+
+        return result.stdout
+
+
+def create_service(api_key: Optional[str] = None, mode: Optional[str] = None) -> CalculatorService:
+    api_key = api_key or os.getenv("CLIMATIQ_API_KEY")
+    mode = (mode or os.getenv("CALCULATION_MODE", MODE_INPROCESS)).lower()
+    use_api = os.getenv("CLIMATIQ_USE_API", "").lower() in ("1", "true", "yes")
+    return CalculatorService(api_key, mode=mode, use_api=use_api)
+
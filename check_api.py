@@ -1,146 +1,220 @@
-import requests
 import logging
 import os
 import time
 import json
-import math
 import sys
-from typing import Dict, List, Optional
-from datetime import datetime
-from dotenv import load_dotenv
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from emission_cache import CacheBackend, create_cache
+from emission_core import (ACTIVITY_MAPPINGS, DEFAULT_REGION, DIRECT_FALLBACK_EMISSIONS, UNIT_CONVERTER,  # noqa: F401
+                           EmissionCore, EmissionTotals)
+from factor_store import FactorStore, create_factor_store
+from memoization import ResultMemo, default_memo
+from metrics import (ACTIVITIES, CALCULATION_SECONDS, CLIMATIQ_REJECTED, CLIMATIQ_REQUEST_SECONDS, CLIMATIQ_REQUESTS,
+                     CLIMATIQ_RETRIES, CLIMATIQ_THROTTLED, CLIMATIQ_WAIT_SECONDS, STAGE_SECONDS)
+from resilience import AdaptiveRateLimiter, CircuitBreaker, Deadline, DeadlineExceeded, retry_after_seconds
+from result_format import FORMAT_COLUMNS, FORMAT_ROWS, JSON_MIMETYPE, ResultColumns, encode_result
+
+if TYPE_CHECKING:
+    import requests
 
 def main_wrapper():
     data = json.loads(sys.stdin.read())
     results = calculate_carbon_footprint(data["activities"], data["api_key"])
     print(json.dumps(results))
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(f"carbon_calc_{datetime.now().strftime('%Y%m%d_%H%M')}.log")
-    ]
-)
+# Handlers are installed by entry points through logging_config.configure_logging(),
+# and .env is loaded by entry points too, so importing this module does no I/O.
 logger = logging.getLogger(__name__)
 
-load_dotenv()
-climatiq_api_key = os.getenv("CLIMATIQ_API_KEY")
-
 
 MAX_RETRIES = 3
 RETRY_DELAY = 2
-DEFAULT_REGION = "US"
-
-UNIT_CONVERSIONS = {
-    "energy": {"kWh": 1.0, "MWh": 1000.0, "GWh": 1000000.0, "J": 0.000278, "MJ": 0.278},
-    "distance": {"km": 1.0, "mi": 1.60934, "mile": 1.60934, "miles": 1.60934},
-    "weight": {"kg": 1.0, "t": 1000.0, "lb": 0.453592, "g": 0.001},
-    "volume": {"L": 1.0, "l": 1.0, "gal": 3.78541, "m3": 1000.0},
-}
-
-ACTIVITY_MAPPINGS = {
-    "electricity": {
-        "id": "electricity",
-        "unit_type": "energy",
-        "default_unit": "kWh",
-        "fallbacks": ["electricity-energy"],
-        "algorithm_factor": 1.05
-    },
-    "car": {
-        "id": "passenger_vehicle-car",
-        "unit_type": "distance",
-        "default_unit": "km",
-        "fallbacks": ["car-generic"],
-        "algorithm_factor": 1.2
-    },
-    "bus": {
-        "id": "passenger_vehicle-bus",
-        "unit_type": "distance",
-        "default_unit": "km",
-        "fallbacks": ["bus-generic"],
-        "algorithm_factor": 0.9
-    },
-    "natural_gas": {
-        "id": "natural_gas",
-        "unit_type": "energy",
-        "default_unit": "kWh",
-        "fallbacks": ["heating-gas"],
-        "algorithm_factor": 1.15
-    },
-    "rail": {
-        "id": "passenger_train",
-        "unit_type": "distance",
-        "default_unit": "km",
-        "fallbacks": ["train-generic"],
-        "algorithm_factor": 0.85
-    }
-}
-
-REGIONAL_FACTORS = {
-    "US": 1.0, "CA": 0.75, "CN": 1.35, "EU": 0.85, "UK": 0.82,
-    "AU": 1.25, "IN": 1.4, "GLOBAL": 1.05
-}
-
-SEASONAL_FACTORS = {
-    1: 1.2, 2: 1.15, 3: 1.05, 4: 0.95, 5: 0.9, 6: 0.85,
-    7: 0.8, 8: 0.85, 9: 0.9, 10: 1.0, 11: 1.1, 12: 1.15
-}
+DEFAULT_BASE_URL = "https://api.climatiq.io"
+FALLBACK_DATA_VERSION = "2023-04-01"
+DATA_VERSION_REFRESH_INTERVAL = 6 * 60 * 60
+DATA_VERSION_RETRY_INTERVAL = 60
+HTTP_POOL_CONNECTIONS = int(os.getenv("CLIMATIQ_POOL_CONNECTIONS", 4))
+HTTP_POOL_MAXSIZE = int(os.getenv("CLIMATIQ_POOL_MAXSIZE", 16))
+ESTIMATE_BATCH_SIZE = int(os.getenv("CLIMATIQ_BATCH_SIZE", 100))
+RATE_LIMIT = float(os.getenv("CLIMATIQ_RATE_LIMIT", 20))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("CLIMATIQ_BREAKER_THRESHOLD", 5))
+BREAKER_RESET_TIMEOUT = float(os.getenv("CLIMATIQ_BREAKER_RESET", 30))
+CIRCUIT_OPEN_ERROR = "Climatiq API unavailable (circuit breaker open)"
+COLUMNAR_CHUNK_SIZE = 10000
+DEADLINE_CHECK_INTERVAL = 500
+DEADLINE_EXIT_CODE = 124
+
+
+def create_session(headers: Dict, pool_connections: int = HTTP_POOL_CONNECTIONS,
+                   pool_maxsize: int = HTTP_POOL_MAXSIZE, pool_block: bool = False) -> "requests.Session":
+    # requests is only imported once a request is actually made.
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.headers.update(headers)
+
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                          max_retries=0, pool_block=pool_block)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 
 class ClimatiqAPI:
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, base_url: Optional[str] = None, cache: Optional[CacheBackend] = None,
+                 data_version: Optional[str] = None,
+                 data_version_refresh_interval: float = DATA_VERSION_REFRESH_INTERVAL,
+                 session: Optional["requests.Session"] = None, pool_connections: int = HTTP_POOL_CONNECTIONS,
+                 pool_maxsize: int = HTTP_POOL_MAXSIZE, pool_block: bool = False,
+                 batch_size: int = ESTIMATE_BATCH_SIZE, rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None, factor_store: Optional[FactorStore] = None):
         self.api_key = api_key
-        self.base_url = "https://api.climatiq.io"
+        self.batch_size = batch_size
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(rate=RATE_LIMIT)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+        self.factor_store = factor_store if factor_store is not None else create_factor_store()
+        self.base_url = (base_url or os.getenv("CLIMATIQ_BASE_URL", DEFAULT_BASE_URL)).rstrip("/")
         self.headers = {"Authorization": f"Bearer {self.api_key}"}
-        self.cache = {}
-        self.data_version = self._get_data_version()
+        self._session = session
+        self._session_options = (pool_connections, pool_maxsize, pool_block)
+        self._session_lock = threading.Lock()
+        self.cache = cache if cache is not None else create_cache()
+        self.data_version_refresh_interval = data_version_refresh_interval
+        self._data_version = data_version
+        self._data_version_expires_at = float("inf") if data_version else 0.0
+        self._data_version_lock = threading.Lock()
+        self._data_version_refreshing = False
+
+    @property
+    def session(self) -> "requests.Session":
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = create_session(self.headers, *self._session_options)
+        return self._session
+
+    @property
+    def data_version(self) -> str:
+        if self._data_version is None:
+            with self._data_version_lock:
+                if self._data_version is None:
+                    self._refresh_data_version()
+        elif time.monotonic() >= self._data_version_expires_at:
+            self._refresh_data_version_in_background()
+
+        return self._data_version
+
+    @data_version.setter
+    def data_version(self, value: str) -> None:
+        self._data_version = value
+        self._data_version_expires_at = float("inf")
+
+    def _refresh_data_version(self) -> None:
+        latest = self._get_data_version()
+        if latest:
+            self._data_version = latest
+            self._data_version_expires_at = time.monotonic() + self.data_version_refresh_interval
+        else:
+            if self._data_version is None:
+                self._data_version = FALLBACK_DATA_VERSION
+            self._data_version_expires_at = time.monotonic() + DATA_VERSION_RETRY_INTERVAL
+
+    def _refresh_data_version_in_background(self) -> None:
+        with self._data_version_lock:
+            if self._data_version_refreshing:
+                return
+            self._data_version_refreshing = True
+
+        def refresh():
+            try:
+                self._refresh_data_version()
+            finally:
+                self._data_version_refreshing = False
 
-    def _get_data_version(self) -> str:
+        threading.Thread(target=refresh, name="climatiq-data-version", daemon=True).start()
+
+    def _get_data_version(self) -> Optional[str]:
         try:
-            response = requests.get(
-                f"{self.base_url}/data/v1/data-versions",
-                headers=self.headers,
-                timeout=10
-            )
+            response = self.session.get(f"{self.base_url}/data/v1/data-versions", timeout=10)
             response.raise_for_status()
             latest = response.json().get("latest_release")
             if latest:
                 return latest
         except Exception as e:
-            logger.warning(f"Failed to get data version: {e}")
+            logger.warning("Failed to get data version: %s", e)
 
-        return "2023-04-01"
+        return None
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
 
     def make_request(self, endpoint: str, method: str = "GET", data: Optional[Dict] = None,
                      params: Optional[Dict] = None) -> Dict:
+        from requests import RequestException
+
         url = f"{self.base_url}/{endpoint}"
-        headers = self.headers.copy()
-        if data:
-            headers["Content-Type"] = "application/json"
+        is_get = method.upper() == "GET"
 
         for retry in range(MAX_RETRIES):
+            if not self.circuit_breaker.allow_request():
+                CLIMATIQ_REJECTED.inc(endpoint=endpoint)
+                return {"error": CIRCUIT_OPEN_ERROR}
+
+            if retry:
+                CLIMATIQ_RETRIES.inc(endpoint=endpoint)
+
+            waited = self.rate_limiter.acquire()
+            if waited:
+                CLIMATIQ_WAIT_SECONDS.observe(waited)
+
+            response = None
+            started = time.perf_counter()
             try:
-                if method.upper() == "GET":
-                    response = requests.get(url, headers=headers, params=params, timeout=30)
+                if is_get:
+                    response = self.session.get(url, params=params, timeout=30)
                 else:
-                    response = requests.post(url, headers=headers, json=data, timeout=30)
+                    response = self.session.post(url, json=data, timeout=30)
+
+                CLIMATIQ_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+                CLIMATIQ_REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+                self.rate_limiter.observe_headers(response.headers)
 
                 if response.status_code == 400 and data:
-                    logger.debug(f"Request payload: {json.dumps(data)}")
-                    logger.debug(f"Response: {response.text}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Request payload: %s", json.dumps(data))
+                        logger.debug("Response: %s", response.text)
 
+                # Throttling and client errors both prove the API is reachable, so they
+                # close the breaker; only transport errors and 5xx count as failures.
                 if response.status_code == 429:
-                    retry_after = int(response.headers.get('Retry-After', RETRY_DELAY))
-                    time.sleep(retry_after)
+                    CLIMATIQ_THROTTLED.inc(endpoint=endpoint)
+                    retry_after = retry_after_seconds(response.headers, RETRY_DELAY)
+                    self.rate_limiter.on_throttle(retry_after)
+                    self.circuit_breaker.record_success()
                     continue
 
+                if 400 <= response.status_code < 500:
+                    self.circuit_breaker.record_success()
+                    error = f"{response.status_code} Client Error: {response.reason} for url: {response.url}"
+                    logger.warning("API request rejected: %s", error)
+                    return {"error": error}
+
                 response.raise_for_status()
+                self.rate_limiter.on_success()
+                self.circuit_breaker.record_success()
                 return response.json()
 
-            except requests.RequestException as e:
-                logger.warning(f"API request failed (attempt {retry + 1}/{MAX_RETRIES}): {str(e)}")
+            except RequestException as e:
+                if response is None:
+                    CLIMATIQ_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+                    CLIMATIQ_REQUESTS.inc(endpoint=endpoint, status="error")
+                self.circuit_breaker.record_failure()
+                logger.warning("API request failed (attempt %d/%d): %s", retry + 1, MAX_RETRIES, e)
                 if retry < MAX_RETRIES - 1:
                     time.sleep(RETRY_DELAY)
                 else:
@@ -148,11 +222,23 @@ class ClimatiqAPI:
 
         return {"error": "API request failed"}
 
+    def resilience_stats(self) -> Dict:
+        return {
+            "circuit_breaker": self.circuit_breaker.snapshot(),
+            "rate_limiter": self.rate_limiter.snapshot()
+        }
+
     def search_emission_factors(self, query: str, region: Optional[str] = None,
                                 unit_type: Optional[str] = None) -> Dict:
-        cache_key = f"{query}:{region}:{unit_type}"
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+        if self.factor_store is not None:
+            results = self.factor_store.search(query, region)
+            if results:
+                return {"results": results, "data_version": self.factor_store.data_version}
+
+        cache_key = f"search:{query}:{region}:{unit_type}"
+        cached = self.cache.get(cache_key, self.data_version)
+        if cached is not None:
+            return cached
 
         params = {"query": query}
         if region:
@@ -161,49 +247,90 @@ class ClimatiqAPI:
         result = self.make_request("data/v1/search", params=params)
 
         if "error" not in result and result.get("results"):
-            self.cache[cache_key] = result
+            self.cache.set(cache_key, result, self.data_version)
 
         return result
 
+    def estimate(self, payload: Dict) -> Dict:
+        cache_key = estimate_cache_key(payload)
+        cached = self.cache.get(cache_key, self.data_version)
+        if cached is not None:
+            return cached
 
-class CarbonEmissionCalculator:
+        result = self.make_request("data/v1/estimate", method="POST", data=payload)
 
-    def __init__(self, api_key: str):
-        self.api = ClimatiqAPI(api_key)
-        self.activity_mappings = ACTIVITY_MAPPINGS
-        self.current_month = datetime.now().month
+        if "error" not in result:
+            self.cache.set(cache_key, result, self.data_version)
 
-    def get_activity_info(self, activity_type: str) -> Dict:
-        if not activity_type:
-            return {
-                "id": "electricity",
-                "unit_type": "energy",
-                "default_unit": "kWh",
-                "algorithm_factor": 1.0
-            }
+        return result
 
-        normalized_type = activity_type.lower().strip()
+    def estimate_batch(self, payloads: List[Dict]) -> List[Dict]:
+        data_version = self.data_version
+        results = [None] * len(payloads)
+        pending = []
 
-        if normalized_type in self.activity_mappings:
-            return self.activity_mappings[normalized_type]
+        for idx, payload in enumerate(payloads):
+            cached = self.cache.get(estimate_cache_key(payload), data_version)
+            if cached is not None:
+                results[idx] = cached
+            else:
+                pending.append(idx)
 
-        for key, value in self.activity_mappings.items():
-            if key in normalized_type or normalized_type in key:
-                logger.info(f"Partial match: {normalized_type} -> {key}")
-                return value
+        for start in range(0, len(pending), self.batch_size):
+            chunk = pending[start:start + self.batch_size]
+            response = self.make_request("data/v1/estimate/batch", method="POST",
+                                         data=[payloads[idx] for idx in chunk])
 
-        return {
-            "id": normalized_type,
-            "unit_type": "energy",
-            "default_unit": "kWh",
-            "algorithm_factor": 1.0
-        }
+            if "error" in response:
+                for idx in chunk:
+                    results[idx] = {"error": response["error"]}
+                continue
+
+            batch_results = response.get("results", [])
+            for position, idx in enumerate(chunk):
+                if position >= len(batch_results):
+                    results[idx] = {"error": "Missing result in batch response"}
+                    continue
+
+                result = batch_results[position]
+                results[idx] = result
+                if "error" not in result:
+                    self.cache.set(estimate_cache_key(payloads[idx]), result, data_version)
+
+        return results
+
+    def cache_stats(self) -> Dict:
+        return self.cache.get_stats()
+
+
+def estimate_cache_key(payload: Dict) -> str:
+    return "estimate:" + json.dumps(payload, sort_keys=True, separators=(",", ":"))
+
+
+# Distinguishes "no memo given" from memo=None, which turns memoization off.
+DEFAULT_MEMO = object()
+
+
+class CarbonEmissionCalculator(EmissionCore):
+
+    def __init__(self, api_key: str, use_api: bool = False, api: Optional[ClimatiqAPI] = None,
+                 memo: Optional[ResultMemo] = DEFAULT_MEMO):
+        super().__init__()
+        self.api = api or ClimatiqAPI(api_key)
+        self.use_api = use_api
+        self.memo = default_memo(use_api) if memo is DEFAULT_MEMO else memo
 
     def find_emission_factor(self, activity_type: str, region: Optional[str] = None) -> Dict:
         activity_info = self.get_activity_info(activity_type)
         primary_id = activity_info.get("id")
         unit_type = activity_info.get("unit_type")
 
+        factor_store = self.api.factor_store
+        if factor_store is not None:
+            factor = factor_store.find([primary_id] + activity_info.get("fallbacks", []), region)
+            if factor is not None:
+                return factor
+
         search_results = self.api.search_emission_factors(primary_id, region, unit_type)
 
         if "error" not in search_results and search_results.get("results"):
@@ -221,88 +348,17 @@ class CarbonEmissionCalculator:
 
         return {"activity_id": primary_id, "unit_type": unit_type, "region": region or "GLOBAL"}
 
-    def format_parameters(self, parameters: Dict, unit_type: str, default_unit: str) -> Dict:
-        simplified = {}
-
-        if unit_type == "distance" and "distance" in parameters:
-            value = float(parameters["distance"])
-            unit = parameters.get("distance_unit", default_unit)
-
-            if unit.lower() in ["mi", "mile", "miles"]:
-                value *= 1.60934
-
-            simplified["distance"] = value
-            simplified["distance_unit"] = "km"
-
-        elif unit_type == "energy" and "energy" in parameters:
-            value = float(parameters["energy"])
-            unit = parameters.get("energy_unit", default_unit)
-
-            if unit.lower() == "mwh":
-                value *= 1000
-            elif unit.lower() == "gwh":
-                value *= 1000000
-
-            simplified["energy"] = value
-            simplified["energy_unit"] = "kWh"
-
-        if not simplified:
-            for key, value in parameters.items():
-                if isinstance(value, (int, float)):
-                    simplified[key] = value
-                else:
-                    simplified[key] = value
-
-        return simplified
-
-    def calculate_direct_emissions(self, activity_type: str, parameters: Dict, region: str) -> float:
-        default_factors = {
-            "bus": {"US": 0.105, "EU": 0.08, "UK": 0.075, "CA": 0.09, "CN": 0.12, "GLOBAL": 0.1},
-            "car": {"US": 0.185, "EU": 0.15, "UK": 0.15, "CA": 0.17, "CN": 0.21, "GLOBAL": 0.18},
-            "rail": {"US": 0.04, "EU": 0.03, "UK": 0.035, "CA": 0.04, "CN": 0.06, "GLOBAL": 0.045},
-            "electricity": {"US": 0.38, "EU": 0.25, "UK": 0.23, "CA": 0.15, "CN": 0.6, "GLOBAL": 0.42},
-            "natural_gas": {"US": 0.2, "EU": 0.19, "UK": 0.19, "CA": 0.18, "CN": 0.22, "GLOBAL": 0.2}
-        }
-
-        region_factors = default_factors.get(activity_type.lower(), {})
-        emission_factor = region_factors.get(region, region_factors.get("GLOBAL", 0.1))
-
-        if activity_type.lower() in ["bus", "car", "rail"]:
-            if "distance" in parameters:
-                distance = float(parameters["distance"])
-                distance_unit = parameters.get("distance_unit", "km")
-
-                if distance_unit.lower() in ["mi", "mile", "miles"]:
-                    distance *= 1.60934
-
-                return distance * emission_factor
-
-        elif activity_type.lower() in ["electricity", "natural_gas"]:
-            if "energy" in parameters:
-                energy = float(parameters["energy"])
-                energy_unit = parameters.get("energy_unit", "kWh")
-
-                if energy_unit.lower() == "mwh":
-                    energy *= 1000
-                elif energy_unit.lower() == "gwh":
-                    energy *= 1000000
-
-                return energy * emission_factor
-
-        return 10.0
-
-    def calculate_api_emissions(self, parameters: Dict, activity_id: str,
-                                region: Optional[str] = None) -> Dict:
+    def build_estimate_payload(self, parameters: Dict, activity_id: str,
+                               region: Optional[str] = None) -> Dict:
         activity_type = None
         unit_type = None
         default_unit = None
 
-        for activity_type_key, info in self.activity_mappings.items():
-            if info.get("id") == activity_id:
-                activity_type = activity_type_key
-                unit_type = info.get("unit_type")
-                default_unit = info.get("default_unit")
-                break
+        match = self.activity_resolver.type_for_id(activity_id)
+        if match is not None:
+            activity_type, info = match
+            unit_type = info.get("unit_type")
+            default_unit = info.get("default_unit")
 
         if not unit_type:
             if "distance" in parameters:
@@ -322,202 +378,420 @@ class CarbonEmissionCalculator:
         if region:
             emission_factor["region"] = region
 
-        payload = {
+        return {
             "emission_factor": emission_factor,
             "parameters": adjusted_params
         }
 
-        result = self.api.make_request("data/v1/estimate", method="POST", data=payload)
-
-        if "error" in result:
-            simplified_payload = {
-                "emission_factor": {
-                    "activity_id": activity_id
-                },
-                "parameters": {
-                    list(adjusted_params.keys())[0]: list(adjusted_params.values())[0]
-                }
+    def simplify_estimate_payload(self, payload: Dict) -> Dict:
+        adjusted_params = payload["parameters"]
+        simplified_payload = {
+            "emission_factor": {
+                "activity_id": payload["emission_factor"]["activity_id"]
+            },
+            "parameters": {
+                list(adjusted_params.keys())[0]: list(adjusted_params.values())[0]
             }
+        }
 
-            if region:
-                simplified_payload["emission_factor"]["region"] = region
+        if "region" in payload["emission_factor"]:
+            simplified_payload["emission_factor"]["region"] = payload["emission_factor"]["region"]
+
+        return simplified_payload
 
-            result = self.api.make_request("data/v1/estimate", method="POST", data=simplified_payload)
+    def calculate_api_emissions(self, parameters: Dict, activity_id: str,
+                                region: Optional[str] = None) -> Dict:
+        payload = self.build_estimate_payload(parameters, activity_id, region)
+
+        result = self.api.estimate(payload)
+
+        if "error" in result:
+            result = self.api.estimate(self.simplify_estimate_payload(payload))
 
         return result
 
-    def calculate_algorithmic_emissions(self, raw_emissions: float, region: str,
-                                        activity_type: str, algorithm_factor: float) -> float:
-        if raw_emissions <= 0:
-            return 0.0
+    def calculate_api_emissions_batch(self, api_requests: List[tuple]) -> List[Dict]:
+        return self.estimate_payloads([self.build_estimate_payload(*request) for request in api_requests])
+
+    def estimate_payloads(self, payloads: List[Dict]) -> List[Dict]:
+        unique_payloads = []
+        unique_index = {}
+        row_to_unique = []
+        for payload in payloads:
+            key = estimate_cache_key(payload)
+            position = unique_index.get(key)
+            if position is None:
+                position = len(unique_payloads)
+                unique_index[key] = position
+                unique_payloads.append(payload)
+            row_to_unique.append(position)
+
+        responses = self.api.estimate_batch(unique_payloads)
+
+        failed = [position for position, response in enumerate(responses) if "error" in response]
+        if failed:
+            retried = self.api.estimate_batch(
+                [self.simplify_estimate_payload(unique_payloads[position]) for position in failed]
+            )
+            for position, response in zip(failed, retried):
+                responses[position] = response
 
-        adjusted_regional_factors = {
-            "US": 1.0, "CA": 0.92, "CN": 1.12, "EU": 0.95, "UK": 0.94,
-            "AU": 1.08, "IN": 1.12, "GLOBAL": 1.02
-        }
+        logger.info("Estimated %d activities with %d unique requests (%d retried in simplified form)",
+                    len(payloads), len(unique_payloads), len(failed))
 
-        adjusted_seasonal_factors = {
-            1: 1.05, 2: 1.04, 3: 1.02, 4: 0.98, 5: 0.96, 6: 0.95,
-            7: 0.94, 8: 0.95, 9: 0.97, 10: 1.0, 11: 1.03, 12: 1.04
-        }
+        return [responses[position] for position in row_to_unique]
+
+    def estimate_activities(self, activities: List[Dict]) -> Dict[int, Dict]:
+        rows = []
+        payloads = []
+        for idx, activity in enumerate(activities):
+            try:
+                request = self.api_request_for(activity)
+                if request is None:
+                    continue
+                payload = self.build_estimate_payload(*request)
+            except Exception:
+                continue
 
-        region_factor = adjusted_regional_factors.get(region, adjusted_regional_factors.get("GLOBAL", 1.0))
-        seasonal_factor = adjusted_seasonal_factors.get(self.current_month, 1.0)
+            rows.append(idx)
+            payloads.append(payload)
 
-        activity_type_adjustments = {
-            "electricity": 0.98,
-            "car": 0.95,
-            "bus": 1.05,
-            "rail": 1.02,
-            "natural_gas": 0.97
-        }
+        if not payloads:
+            return {}
+
+        return dict(zip(rows, self.estimate_payloads(payloads)))
+
+    def process_activities(self, activities: List[Dict], deadline: Optional[Deadline] = None) -> Dict:
+        if not activities:
+            return {"total_emissions": 0.0, "api_emissions": 0.0, "unit": "kg CO2e", "activities": []}
 
-        activity_adjustment = activity_type_adjustments.get(activity_type.lower(), 1.0)
+        with CALCULATION_SECONDS.time(path="scalar"):
+            return self._process_activities(activities, deadline)
 
-        adjusted = raw_emissions * algorithm_factor * region_factor * seasonal_factor * activity_adjustment
+    def _process_activities(self, activities: List[Dict], deadline: Optional[Deadline] = None) -> Dict:
+        memo = self.memo
+        submission_key = memo.submission_key(activities) if memo is not None else None
+        if submission_key is not None:
+            namespace = self.memo_namespace()
+            summary = memo.get_submission(submission_key, namespace)
+            if summary is not None:
+                return summary
 
-        if adjusted > 100:
-            final = adjusted * 0.95 + (5 * math.log(adjusted / 100))
+        results = self.evaluate_activities(activities, deadline=deadline)
+        with STAGE_SECONDS.time(stage="summarize"):
+            summary = self.summarize_results(results, EmissionTotals().add_all(results))
+
+        if submission_key is not None and all(self.is_memoizable(result) for result in results):
+            memo.set_submission(submission_key, namespace, summary)
+
+        return summary
+
+    def evaluate_activities(self, activities: List[Dict], start_index: int = 0,
+                            deadline: Optional[Deadline] = None) -> List[Dict]:
+        if deadline is None:
+            results = self._evaluate_activities(activities, start_index)
         else:
-            final = adjusted
+            # Checked between chunks, so a request overruns its deadline by at most one chunk.
+            step = ESTIMATE_BATCH_SIZE if self.use_api else DEADLINE_CHECK_INTERVAL
+            results = []
+            for start in range(0, len(activities), step):
+                deadline.check()
+                results.extend(self._evaluate_activities(activities[start:start + step], start_index + start))
+
+        record_outcomes(results)
+        return results
 
-        global_alignment_factor = 0.93 if activity_type.lower() == "electricity" else 0.98
+    def _evaluate_activities(self, activities: List[Dict], start_index: int = 0) -> List[Dict]:
+        if self.memo is None:
+            api_responses = {}
+            if self.use_api:
+                with STAGE_SECONDS.time(stage="api_estimate"):
+                    api_responses = self.estimate_activities(activities)
+
+            with STAGE_SECONDS.time(stage="evaluate"):
+                return [
+                    self.process_activity(start_index + idx, activity, api_response=api_responses.get(idx))
+                    for idx, activity in enumerate(activities)
+                ]
+
+        return self.evaluate_activities_memoized(activities, start_index)
+
+    def evaluate_activities_memoized(self, activities: List[Dict], start_index: int = 0) -> List[Dict]:
+        memo = self.memo
+        namespace = self.memo_namespace()
+        results = [None] * len(activities)
+        keys = {}
+
+        with STAGE_SECONDS.time(stage="memo_lookup"):
+            for idx, activity in enumerate(activities):
+                normalized = self.memo_key(activity)
+                key = memo.activity_key(normalized) if normalized is not None else None
+                if key is None:
+                    continue
 
-        return round(final * global_alignment_factor, 2)
+                cached = memo.get_activity(key, namespace, activity.get("name", f"Activity {start_index + idx + 1}"))
+                if cached is None:
+                    keys[idx] = key
+                else:
+                    results[idx] = cached
+
+        pending = [idx for idx, result in enumerate(results) if result is None]
+        api_responses = {}
+        if self.use_api and pending:
+            with STAGE_SECONDS.time(stage="api_estimate"):
+                responses = self.estimate_activities([activities[idx] for idx in pending])
+            api_responses = {pending[position]: response for position, response in responses.items()}
+
+        with STAGE_SECONDS.time(stage="evaluate"):
+            for idx in pending:
+                result = self.process_activity(start_index + idx, activities[idx], api_response=api_responses.get(idx))
+                results[idx] = result
+                if idx in keys and self.is_memoizable(result):
+                    memo.set_activity(keys[idx], namespace, result)
 
-    def compare_calculations(self, api_value: float, algo_value: float) -> Dict:
-        if api_value <= 0:
-            return {
-                "difference": 0,
-                "percent_difference": 0,
-                "algorithm_is_higher": False
-            }
+        return results
+
+    def memo_key(self, activity: Dict) -> Optional[List]:
+        # The inputs a result depends on, after resolution: "Car" with 1 mi and "car" with
+        # 1.60934 km evaluate identically, so they share an entry.
+        if not isinstance(activity, dict):
+            return None
+
+        activity_type = activity.get("activity_type")
+        parameters = activity.get("parameters")
+        if not isinstance(parameters, dict) or not parameters:
+            return None
+
+        try:
+            activity_info = self.get_activity_info(activity_type)
+            activity_id = activity.get("activity_id") or activity_info.get("id")
+            unit_type = activity_info.get("unit_type")
+
+            # An explicit ID of another unit type builds its API payload from the raw parameters.
+            match = self.activity_resolver.type_for_id(activity_id)
+            if match is not None and match[1].get("unit_type") != unit_type:
+                unit_type = None
+
+            if unit_type in self.units.base_units and unit_type in parameters:
+                unit = parameters.get(f"{unit_type}_unit", activity_info.get("default_unit"))
+                parameters = dict(parameters)
+                parameters[unit_type] = self.units.to_base(float(parameters[unit_type]), unit_type, unit)
+                parameters[f"{unit_type}_unit"] = self.units.base_units[unit_type]
+
+            return [
+                self.factor_table.type_code(activity_type) if activity_type else None,
+                activity_info.get("id"),
+                activity_id,
+                activity.get("region", DEFAULT_REGION),
+                self.activity_month(activity),
+                parameters
+            ]
+        except (AttributeError, TypeError, ValueError):
+            # Left to process_activity, which reports the problem as an error row.
+            return None
+
+    def memo_namespace(self) -> str:
+        # Everything besides the activity itself that a result depends on.
+        data_version = self.api.data_version if self.use_api else "-"
+        return f"{self.factor_table.version}:{self.current_month}:{int(self.use_api)}:{data_version}"
+
+    def is_memoizable(self, result: Dict) -> bool:
+        if "error" in result:
+            return False
+
+        # A default-factor fallback in API mode reflects a failed call, not the activity.
+        return not (self.use_api and "note" in result)
+
+    def process_activities_columnar(self, activities: List[Dict], chunk_size: int = COLUMNAR_CHUNK_SIZE,
+                                    deadline: Optional[Deadline] = None) -> Dict:
+        # Rows are evaluated a chunk at a time and packed into columns, so only one
+        # chunk of per-activity dicts is alive at once.
+        columns = ResultColumns()
+        totals = EmissionTotals()
+        with CALCULATION_SECONDS.time(path="columnar"):
+            for start in range(0, len(activities), chunk_size):
+                results = self.evaluate_activities(activities[start:start + chunk_size], start, deadline)
+                totals.add_all(results)
+                columns.extend(results)
+
+            return self.summarize_results(columns, totals)
 
-        difference = algo_value - api_value
-        percent = round((difference / api_value) * 100, 1)
+    def process_activities_batch(self, activities: List[Dict]) -> Dict:
+        from batch_engine import BatchEmissionEngine
+
+        return BatchEmissionEngine(self).process(activities)
+
+    def process_scenarios(self, activities: List[Dict], scenarios: List[Dict],
+                          deadline: Optional[Deadline] = None) -> Dict:
+        from scenarios import ScenarioSweep
+
+        return ScenarioSweep(self).run(activities, scenarios, deadline)
+
+    def api_request_for(self, activity: Dict) -> Optional[tuple]:
+        if not activity.get("parameters"):
+            return None
+
+        activity_type = activity.get("activity_type")
+        activity_id = activity.get("activity_id")
+        if not activity_id and activity_type:
+            activity_id = self.get_activity_info(activity_type).get("id")
+
+        if not activity_id:
+            return None
+
+        return activity.get("parameters"), activity_id, activity.get("region", DEFAULT_REGION)
+
+    def direct_result(self, name: str, activity_type: str, parameters: Dict, region: str,
+                      month: Optional[int] = None) -> Dict:
+        api_emissions = self.calculate_direct_emissions(activity_type, parameters, region, month)
+        logger.debug("Direct calculation for %s: %s kg CO2e", name, api_emissions)
 
         return {
-            "difference": round(difference, 2),
-            "percent_difference": percent,
-            "algorithm_is_higher": algo_value > api_value
+            "co2e": api_emissions,
+            "co2e_unit": "kg",
+            "note": "Calculated using default emission factors"
         }
 
-    def process_activities(self, activities: List[Dict]) -> Dict:
-        if not activities:
-            return {"total_emissions": 0.0, "api_emissions": 0.0, "unit": "kg CO2e", "activities": []}
-
-        results = []
-        total_api_emissions = 0.0
-        total_algo_emissions = 0.0
-        errors = 0
+    def process_activity(self, idx: int, activity: Dict, api_response: Optional[Dict] = None) -> Dict:
+        name = activity.get("name", f"Activity {idx + 1}")
+        logger.debug("Processing: %s", name)
 
-        for idx, activity in enumerate(activities):
-            name = activity.get("name", f"Activity {idx + 1}")
-            logger.info(f"Processing: {name}")
-
-            if not activity.get("activity_type") and not activity.get("activity_id"):
-                results.append({
-                    "error": "Activity type or ID required",
-                    "name": name
-                })
-                errors += 1
-                continue
+        if not activity.get("activity_type") and not activity.get("activity_id"):
+            return {
+                "error": "Activity type or ID required",
+                "name": name
+            }
 
-            if not activity.get("parameters"):
-                results.append({
-                    "error": "Parameters required",
-                    "name": name
-                })
-                errors += 1
-                continue
+        if not activity.get("parameters"):
+            return {
+                "error": "Parameters required",
+                "name": name
+            }
 
-            try:
-                activity_type = activity.get("activity_type")
-                activity_id = activity.get("activity_id")
-                region = activity.get("region", DEFAULT_REGION)
-                parameters = activity.get("parameters", {})
+        try:
+            activity_type = activity.get("activity_type")
+            activity_id = activity.get("activity_id")
+            region = activity.get("region", DEFAULT_REGION)
+            parameters = activity.get("parameters", {})
+            month = self.activity_month(activity)
 
-                activity_info = self.get_activity_info(activity_type)
-                algorithm_factor = activity_info.get("algorithm_factor", 1.0)
+            activity_info = self.get_activity_info(activity_type)
+            algorithm_factor = activity_info.get("algorithm_factor", 1.0)
 
-                if not activity_id and activity_type:
-                    activity_id = activity_info.get("id")
+            if not activity_id and activity_type:
+                activity_id = activity_info.get("id")
 
-                logger.info(f"Using direct calculation for {name}.")
-                api_emissions = self.calculate_direct_emissions(activity_type, parameters, region)
-                logger.info(f"Direct calculation result: {api_emissions} kg CO2e")
+            api_result = None
+            if self.use_api:
+                if api_response is None:
+                    api_response = self.calculate_api_emissions(parameters, activity_id, region)
 
-                api_result = {
-                    "co2e": api_emissions,
-                    "co2e_unit": "kg",
-                    "note": "Calculated using default emission factors"
-                }
+                if "error" in api_response or api_response.get("co2e") is None:
+                    logger.debug("API estimate failed for %s: %s", name, api_response.get("error"))
+                else:
+                    api_result = api_response
 
-                algo_emissions = self.calculate_algorithmic_emissions(
-                    float(api_result.get("co2e", 0.0)), region, activity_type, algorithm_factor
-                )
+            if api_result is None:
+                api_result = self.direct_result(name, activity_type, parameters, region, month)
 
-                comparison = self.compare_calculations(float(api_result.get("co2e", 0.0)), algo_emissions)
+            api_emissions = float(api_result.get("co2e", 0.0))
+            algo_emissions = self.calculate_algorithmic_emissions(
+                api_emissions, region, activity_type, algorithm_factor, month
+            )
 
-                activity_result = {
-                    "name": name,
-                    "activity_id": activity_id,
-                    "region": region,
-                    "api_emissions": float(api_result.get("co2e", 0.0)),
-                    "algorithm_emissions": algo_emissions,
-                    "unit": api_result.get("co2e_unit", "kg CO2e"),
-                    "comparison": comparison
-                }
+            comparison = self.compare_calculations(api_emissions, algo_emissions)
 
-                if "note" in api_result:
-                    activity_result["note"] = api_result["note"]
+            activity_result = {
+                "name": name,
+                "activity_id": activity_id,
+                "region": region,
+                "api_emissions": api_emissions,
+                "algorithm_emissions": algo_emissions,
+                "unit": api_result.get("co2e_unit", "kg CO2e"),
+                "comparison": comparison
+            }
 
-                results.append(activity_result)
+            if "note" in api_result:
+                activity_result["note"] = api_result["note"]
 
-                total_api_emissions += float(api_result.get("co2e", 0.0))
-                total_algo_emissions += algo_emissions
+            return activity_result
 
-            except Exception as e:
-                logger.error(f"Error processing activity {idx + 1}: {str(e)}")
-                results.append({
-                    "error": str(e),
-                    "name": name
-                })
-                errors += 1
+        except Exception as e:
+            logger.debug("Error processing activity %d: %s", idx + 1, e)
+            return {
+                "error": str(e),
+                "name": name
+            }
 
-        total_comparison = self.compare_calculations(total_api_emissions, total_algo_emissions)
+    def summarize_totals(self, totals: EmissionTotals) -> Dict:
+        total_comparison = self.compare_calculations(totals.api_emissions, totals.algorithm_emissions)
 
         return {
-            "api_emissions": round(total_api_emissions, 2),
-            "algorithm_emissions": round(total_algo_emissions, 2),
+            "api_emissions": round(totals.api_emissions, 2),
+            "algorithm_emissions": round(totals.algorithm_emissions, 2),
             "unit": "kg CO2e",
             "comparison": total_comparison,
-            "errors": errors,
-            "activities": results
+            "errors": totals.errors
         }
 
+    def summarize_results(self, results: List[Dict], totals: EmissionTotals) -> Dict:
+        summary = self.summarize_totals(totals)
+        summary["activities"] = results
+        return summary
 
-def calculate_carbon_footprint(activities: List[Dict], api_key: str = None) -> Dict:
-    api_key = api_key or climatiq_api_key
+
+def record_outcomes(results: List[Dict]) -> None:
+    # One summary line per batch replaces the per-activity INFO lines; those are DEBUG now.
+    errors = 0
+    fallbacks = 0
+    for activity_result in results:
+        if "error" in activity_result:
+            errors += 1
+        elif "note" in activity_result:
+            fallbacks += 1
+
+    ACTIVITIES.inc(len(results) - errors, outcome="ok")
+    ACTIVITIES.inc(errors, outcome="error")
+    logger.info("Evaluated %d activities: %d errors, %d on default factors", len(results), errors, fallbacks)
+
+
+def calculate_carbon_footprint(activities: List[Dict], api_key: str = None, use_api: bool = False,
+                               result_format: str = FORMAT_ROWS, deadline: Optional[Deadline] = None) -> Dict:
+    api_key = api_key or os.getenv("CLIMATIQ_API_KEY")
     if not api_key:
         logger.error("API key required")
         return {"error": "API key required"}
 
     try:
-        calculator = CarbonEmissionCalculator(api_key)
-        results = calculator.process_activities(activities)
+        calculator = CarbonEmissionCalculator(api_key, use_api=use_api)
+        if result_format == FORMAT_COLUMNS:
+            results = calculator.process_activities_columnar(activities, deadline=deadline)
+        else:
+            results = calculator.process_activities(activities, deadline)
 
-        logger.info(f"API emissions: {results['api_emissions']} {results['unit']}")
-        logger.info(f"Algorithm emissions: {results['algorithm_emissions']} {results['unit']}")
-        logger.info(f"Difference: {results['comparison']['percent_difference']}%")
+        logger.info("API emissions: %s %s", results['api_emissions'], results['unit'])
+        logger.info("Algorithm emissions: %s %s", results['algorithm_emissions'], results['unit'])
+        logger.info("Difference: %s%%", results['comparison']['percent_difference'])
 
         return results
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        logger.error(f"Carbon footprint calculation failed: {str(e)}")
+        logger.error("Carbon footprint calculation failed: %s", e)
         return {"error": str(e)}
 
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    from logging_config import configure_logging
+
+    load_dotenv()
+    configure_logging()
+    if "--ndjson" in sys.argv[1:]:
+        from streaming import main as stream_main
+        sys.exit(stream_main(sys.argv[1:]))
+
     if not sys.stdin.isatty():
         try:
             input_data = json.loads(sys.stdin.read())
@@ -532,8 +806,16 @@ if __name__ == "__main__":
                 print(json.dumps({"error": "API key required"}))
                 sys.exit(1)
 
-            results = calculate_carbon_footprint(activities, api_key)
-            print(json.dumps(results))
+            result_format = input_data.get("format", FORMAT_ROWS)
+            deadline = Deadline(input_data["deadline"]) if input_data.get("deadline") else None
+            results = calculate_carbon_footprint(activities, api_key, use_api=bool(input_data.get("use_api")),
+                                                 result_format=result_format, deadline=deadline)
+            # Written as the final response body, so the caller can pass it through without decoding it.
+            sys.stdout.buffer.write(encode_result(results, result_format,
+                                                  input_data.get("content_type", JSON_MIMETYPE)))
+        except DeadlineExceeded as e:
+            print(json.dumps({"error": str(e)}))
+            sys.exit(DEADLINE_EXIT_CODE)
         except Exception as e:
             print(json.dumps({"error": f"Error processing input: {str(e)}"}))
             sys.exit(1)
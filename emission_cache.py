@@ -0,0 +1,313 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 10000
+TRIM_INTERVAL = 100
+ACCESS_FLUSH_SIZE = 100
+
+
+class CacheStats:
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def record(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def to_dict(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "writes": self.writes,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class CacheBackend(ABC):
+
+    def __init__(self, ttl: float = DEFAULT_TTL, version_ttls: Optional[Dict[str, float]] = None):
+        self.ttl = ttl
+        self.version_ttls = dict(version_ttls or {})
+        self.stats = CacheStats()
+
+    def ttl_for(self, data_version: str) -> float:
+        return self.version_ttls.get(data_version, self.ttl)
+
+    @abstractmethod
+    def get(self, key: str, data_version: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any, data_version: str, ttl: Optional[float] = None) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def get_stats(self) -> Dict:
+        stats = self.stats.to_dict()
+        stats["backend"] = type(self).__name__
+        stats["entries"] = len(self)
+        return stats
+
+
+class MemoryCache(CacheBackend):
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL,
+                 version_ttls: Optional[Dict[str, float]] = None):
+        super().__init__(ttl, version_ttls)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, data_version: str) -> Optional[Any]:
+        cache_key = (data_version, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                self.stats.record("misses")
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[cache_key]
+                self.stats.record("expirations")
+                self.stats.record("misses")
+                return None
+
+            self._entries.move_to_end(cache_key)
+            self.stats.record("hits")
+            return value
+
+    def set(self, key: str, value: Any, data_version: str, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl_for(data_version) if ttl is None else ttl
+        cache_key = (data_version, key)
+        with self._lock:
+            self._entries[cache_key] = (value, time.time() + ttl)
+            self._entries.move_to_end(cache_key)
+            self.stats.record("writes")
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.record("evictions")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(CacheBackend):
+    """Emission factors in a SQLite file, evicted least-recently-accessed first.
+
+    Hits only note their access time in memory; the times are written in batches of
+    ``ACCESS_FLUSH_SIZE`` and before every trim. A trim runs every ``TRIM_INTERVAL``
+    writes and evicts against the row count in the file, so ``max_entries`` holds
+    however many processes share it. Between trims ``len()`` is this process's estimate.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES * 10, ttl: float = DEFAULT_TTL,
+                 version_ttls: Optional[Dict[str, float]] = None):
+        super().__init__(ttl, version_ttls)
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes_since_trim = 0
+        self._accessed = {}
+        self._lock = threading.Lock()
+
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS emission_cache ("
+            " data_version TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (data_version, key))"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS emission_cache_accessed ON emission_cache (accessed_at)"
+        )
+        connection.commit()
+        self._count = connection.execute("SELECT COUNT(*) FROM emission_cache").fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str, data_version: str) -> Optional[Any]:
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT value, expires_at FROM emission_cache WHERE data_version = ? AND key = ?",
+            (data_version, key)
+        ).fetchone()
+
+        if row is None:
+            self.stats.record("misses")
+            return None
+
+        now = time.time()
+        value, expires_at = row
+        if expires_at <= now:
+            deleted = connection.execute(
+                "DELETE FROM emission_cache WHERE data_version = ? AND key = ?", (data_version, key)
+            ).rowcount
+            connection.commit()
+            self._adjust_count(-deleted)
+            self.stats.record("expirations")
+            self.stats.record("misses")
+            return None
+
+        with self._lock:
+            self._accessed[(data_version, key)] = now
+            flush = len(self._accessed) >= ACCESS_FLUSH_SIZE
+        if flush:
+            self._flush_accesses(connection)
+            connection.commit()
+
+        self.stats.record("hits")
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, data_version: str, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl_for(data_version) if ttl is None else ttl
+        now = time.time()
+        row = (json.dumps(value), now + ttl, now, data_version, key)
+        connection = self._connection()
+        inserted = connection.execute(
+            "INSERT OR IGNORE INTO emission_cache (value, expires_at, accessed_at, data_version, key)"
+            " VALUES (?, ?, ?, ?, ?)", row
+        ).rowcount
+        if inserted:
+            self._adjust_count(inserted)
+        else:
+            connection.execute(
+                "UPDATE emission_cache SET value = ?, expires_at = ?, accessed_at = ?"
+                " WHERE data_version = ? AND key = ?", row
+            )
+        self.stats.record("writes")
+
+        self._writes_since_trim += 1
+        if self._writes_since_trim >= TRIM_INTERVAL:
+            self._writes_since_trim = 0
+            self._trim(connection)
+        connection.commit()
+
+    def _adjust_count(self, delta: int) -> None:
+        with self._lock:
+            self._count = max(0, self._count + delta)
+
+    def _flush_accesses(self, connection: sqlite3.Connection) -> None:
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+        if accessed:
+            connection.executemany(
+                "UPDATE emission_cache SET accessed_at = MAX(accessed_at, ?) WHERE data_version = ? AND key = ?",
+                ((accessed_at, data_version, key) for (data_version, key), accessed_at in accessed.items())
+            )
+
+    def _trim(self, connection: sqlite3.Connection) -> None:
+        # Access times go in first so that recent hits are not evicted as cold.
+        self._flush_accesses(connection)
+        connection.execute("DELETE FROM emission_cache WHERE expires_at <= ?", (time.time(),))
+        count = connection.execute("SELECT COUNT(*) FROM emission_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            evicted = connection.execute(
+                "DELETE FROM emission_cache WHERE rowid IN"
+                " (SELECT rowid FROM emission_cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,)
+            ).rowcount
+            count -= evicted
+            self.stats.record("evictions", evicted)
+
+        with self._lock:
+            self._count = count
+
+    def clear(self) -> None:
+        connection = self._connection()
+        connection.execute("DELETE FROM emission_cache")
+        connection.commit()
+        with self._lock:
+            self._accessed = {}
+            self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class TieredCache(CacheBackend):
+
+    def __init__(self, memory: MemoryCache, persistent: CacheBackend):
+        super().__init__(memory.ttl, memory.version_ttls)
+        self.memory = memory
+        self.persistent = persistent
+
+    def get(self, key: str, data_version: str) -> Optional[Any]:
+        value = self.memory.get(key, data_version)
+        if value is None:
+            value = self.persistent.get(key, data_version)
+            if value is not None:
+                self.memory.set(key, value, data_version)
+
+        self.stats.record("hits" if value is not None else "misses")
+        return value
+
+    def set(self, key: str, value: Any, data_version: str, ttl: Optional[float] = None) -> None:
+        self.memory.set(key, value, data_version, ttl)
+        self.persistent.set(key, value, data_version, ttl)
+        self.stats.record("writes")
+
+    def clear(self) -> None:
+        self.memory.clear()
+        self.persistent.clear()
+
+    def __len__(self) -> int:
+        return len(self.persistent)
+
+    def get_stats(self) -> Dict:
+        stats = super().get_stats()
+        stats["memory"] = self.memory.get_stats()
+        stats["persistent"] = self.persistent.get_stats()
+        return stats
+
+
+def create_cache(path: Optional[str] = None, max_entries: Optional[int] = None,
+                 ttl: Optional[float] = None) -> CacheBackend:
+    path = path or os.getenv("CLIMATIQ_CACHE_PATH")
+    max_entries = max_entries or int(os.getenv("CLIMATIQ_CACHE_SIZE", DEFAULT_MAX_ENTRIES))
+    ttl = ttl or float(os.getenv("CLIMATIQ_CACHE_TTL", DEFAULT_TTL))
+
+    memory = MemoryCache(max_entries=max_entries, ttl=ttl)
+    if not path:
+        return memory
+
+    return TieredCache(memory, SQLiteCache(path, ttl=ttl))
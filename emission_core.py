@@ -0,0 +1,249 @@
+import logging
+import math
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from activity_resolver import ActivityResolver
+from factor_tables import FactorTable
+from unit_conversion import UnitConverter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGION = "US"
+
+UNIT_CONVERSIONS = {
+    "energy": {"kWh": 1.0, "MWh": 1000.0, "GWh": 1000000.0, "J": 0.000000278, "MJ": 0.278},
+    "distance": {"km": 1.0, "mi": 1.60934, "mile": 1.60934, "miles": 1.60934},
+    "weight": {"kg": 1.0, "t": 1000.0, "lb": 0.453592, "g": 0.001},
+    "volume": {"L": 1.0, "l": 1.0, "gal": 3.78541, "m3": 1000.0},
+}
+
+ACTIVITY_MAPPINGS = {
+    "electricity": {
+        "id": "electricity",
+        "unit_type": "energy",
+        "default_unit": "kWh",
+        "fallbacks": ["electricity-energy"],
+        "algorithm_factor": 1.05
+    },
+    "car": {
+        "id": "passenger_vehicle-car",
+        "unit_type": "distance",
+        "default_unit": "km",
+        "fallbacks": ["car-generic"],
+        "algorithm_factor": 1.2
+    },
+    "bus": {
+        "id": "passenger_vehicle-bus",
+        "unit_type": "distance",
+        "default_unit": "km",
+        "fallbacks": ["bus-generic"],
+        "algorithm_factor": 0.9
+    },
+    "natural_gas": {
+        "id": "natural_gas",
+        "unit_type": "energy",
+        "default_unit": "kWh",
+        "fallbacks": ["heating-gas"],
+        "algorithm_factor": 1.15
+    },
+    "rail": {
+        "id": "passenger_train",
+        "unit_type": "distance",
+        "default_unit": "km",
+        "fallbacks": ["train-generic"],
+        "algorithm_factor": 0.85
+    }
+}
+
+REGIONAL_FACTORS = {
+    "US": 1.0, "CA": 0.75, "CN": 1.35, "EU": 0.85, "UK": 0.82,
+    "AU": 1.25, "IN": 1.4, "GLOBAL": 1.05
+}
+
+SEASONAL_FACTORS = {
+    1: 1.2, 2: 1.15, 3: 1.05, 4: 0.95, 5: 0.9, 6: 0.85,
+    7: 0.8, 8: 0.85, 9: 0.9, 10: 1.0, 11: 1.1, 12: 1.15
+}
+
+DIRECT_EMISSION_FACTORS = {
+    "bus": {"US": 0.105, "EU": 0.08, "UK": 0.075, "CA": 0.09, "CN": 0.12, "GLOBAL": 0.1},
+    "car": {"US": 0.185, "EU": 0.15, "UK": 0.15, "CA": 0.17, "CN": 0.21, "GLOBAL": 0.18},
+    "rail": {"US": 0.04, "EU": 0.03, "UK": 0.035, "CA": 0.04, "CN": 0.06, "GLOBAL": 0.045},
+    "electricity": {"US": 0.38, "EU": 0.25, "UK": 0.23, "CA": 0.15, "CN": 0.6, "GLOBAL": 0.42},
+    "natural_gas": {"US": 0.2, "EU": 0.19, "UK": 0.19, "CA": 0.18, "CN": 0.22, "GLOBAL": 0.2}
+}
+
+DISTANCE_ACTIVITY_TYPES = ("bus", "car", "rail")
+ENERGY_ACTIVITY_TYPES = ("electricity", "natural_gas")
+DIRECT_FALLBACK_EMISSIONS = 10.0
+
+ALGORITHM_REGIONAL_FACTORS = {
+    "US": 1.0, "CA": 0.92, "CN": 1.12, "EU": 0.95, "UK": 0.94,
+    "AU": 1.08, "IN": 1.12, "GLOBAL": 1.02
+}
+
+ALGORITHM_SEASONAL_FACTORS = {
+    1: 1.05, 2: 1.04, 3: 1.02, 4: 0.98, 5: 0.96, 6: 0.95,
+    7: 0.94, 8: 0.95, 9: 0.97, 10: 1.0, 11: 1.03, 12: 1.04
+}
+
+ACTIVITY_TYPE_ADJUSTMENTS = {
+    "electricity": 0.98,
+    "car": 0.95,
+    "bus": 1.05,
+    "rail": 1.02,
+    "natural_gas": 0.97
+}
+
+FACTOR_TABLE = FactorTable.compile(
+    DIRECT_EMISSION_FACTORS,
+    DISTANCE_ACTIVITY_TYPES,
+    ENERGY_ACTIVITY_TYPES,
+    ALGORITHM_REGIONAL_FACTORS,
+    ALGORITHM_SEASONAL_FACTORS,
+    ACTIVITY_TYPE_ADJUSTMENTS,
+    ACTIVITY_MAPPINGS
+)
+
+ACTIVITY_RESOLVER = ActivityResolver(ACTIVITY_MAPPINGS, log=logger.debug)
+UNIT_CONVERTER = UnitConverter(UNIT_CONVERSIONS)
+
+
+@lru_cache(maxsize=4096)
+def parse_period(value: str) -> Tuple[int, int]:
+    """(year, month) of an ISO date, datetime or "YYYY-MM" string."""
+    try:
+        if len(value) == 7:
+            parsed = date.fromisoformat(value + "-01")
+        elif len(value) == 10:
+            parsed = date.fromisoformat(value)
+        else:
+            parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}") from None
+
+    return parsed.year, parsed.month
+
+
+def activity_period(activity: Dict) -> Optional[Tuple[int, int]]:
+    value = activity.get("date")
+    if value is None or value == "":
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid date: {value}")
+
+    return parse_period(value)
+
+
+class EmissionTotals:
+
+    def __init__(self):
+        self.api_emissions = 0.0
+        self.algorithm_emissions = 0.0
+        self.errors = 0
+        self.count = 0
+
+    def add(self, activity_result: Dict) -> None:
+        self.count += 1
+        if "error" in activity_result:
+            self.errors += 1
+            return
+
+        self.api_emissions += activity_result["api_emissions"]
+        self.algorithm_emissions += activity_result["algorithm_emissions"]
+
+    def add_all(self, results: List[Dict]) -> "EmissionTotals":
+        for activity_result in results:
+            self.add(activity_result)
+        return self
+
+
+class EmissionCore:
+    """The local calculation model: factor tables, unit conversion and the algorithmic adjustment.
+
+    Importing or constructing it does no I/O and pulls in no HTTP client, so it is
+    cheap to load where only the default factors are needed.
+    """
+
+    def __init__(self, current_month: Optional[int] = None):
+        self.activity_mappings = ACTIVITY_MAPPINGS
+        self.activity_resolver = ACTIVITY_RESOLVER
+        self.factor_table = FACTOR_TABLE
+        self.units = UNIT_CONVERTER
+        self.current_month = current_month or datetime.now().month
+
+    def activity_month(self, activity: Dict) -> int:
+        # Seasonality follows the activity's own date; undated activities use the current month.
+        period = activity_period(activity)
+        return self.current_month if period is None else period[1]
+
+    def get_activity_info(self, activity_type: str) -> Dict:
+        return self.activity_resolver.resolve(activity_type)
+
+    def format_parameters(self, parameters: Dict, unit_type: str, default_unit: str) -> Dict:
+        simplified = {}
+
+        if unit_type in self.units.base_units and unit_type in parameters:
+            unit = parameters.get(f"{unit_type}_unit", default_unit)
+
+            simplified[unit_type] = self.units.to_base(float(parameters[unit_type]), unit_type, unit)
+            simplified[f"{unit_type}_unit"] = self.units.base_units[unit_type]
+
+        if not simplified:
+            for key, value in parameters.items():
+                if isinstance(value, (int, float)):
+                    simplified[key] = value
+                else:
+                    simplified[key] = value
+
+        return simplified
+
+    def calculate_direct_emissions(self, activity_type: str, parameters: Dict, region: str,
+                                   month: Optional[int] = None) -> float:
+        entry = self.factor_table.lookup(activity_type, region, month or self.current_month)
+        unit_kind = entry.unit_kind
+
+        if unit_kind is not None and unit_kind in parameters:
+            unit = parameters.get(f"{unit_kind}_unit", self.units.base_units[unit_kind])
+            amount = self.units.to_base(float(parameters[unit_kind]), unit_kind, unit)
+            return amount * entry.direct_factor
+
+        return DIRECT_FALLBACK_EMISSIONS
+
+    def calculate_algorithmic_emissions(self, raw_emissions: float, region: str,
+                                        activity_type: str, algorithm_factor: float,
+                                        month: Optional[int] = None) -> float:
+        if raw_emissions <= 0:
+            return 0.0
+
+        entry = self.factor_table.lookup(activity_type, region, month or self.current_month)
+
+        adjusted = (raw_emissions * algorithm_factor * entry.region_factor * entry.seasonal_factor
+                    * entry.activity_adjustment)
+
+        if adjusted > 100:
+            final = adjusted * 0.95 + (5 * math.log(adjusted / 100))
+        else:
+            final = adjusted
+
+        return round(final * entry.alignment, 2)
+
+    def compare_calculations(self, api_value: float, algo_value: float) -> Dict:
+        if api_value <= 0:
+            return {
+                "difference": 0,
+                "percent_difference": 0,
+                "algorithm_is_higher": False
+            }
+
+        difference = algo_value - api_value
+        percent = round((difference / api_value) * 100, 1)
+
+        return {
+            "difference": round(difference, 2),
+            "percent_difference": percent,
+            "algorithm_is_higher": algo_value > api_value
+        }
+
@@ -0,0 +1,312 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class FactorStore:
+    """Emission factors from downloaded Climatiq search snapshots, indexed in SQLite.
+
+    The factors of the active data version are also held in an in-memory index so
+    lookups never touch the database or the network.
+    """
+
+    def __init__(self, path: str, data_version: Optional[str] = None):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._index = {}
+        self._by_activity = {}
+
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS factors ("
+            " data_version TEXT NOT NULL,"
+            " activity_id TEXT NOT NULL,"
+            " region TEXT NOT NULL,"
+            " position INTEGER NOT NULL,"
+            " factor TEXT NOT NULL,"
+            " PRIMARY KEY (data_version, activity_id, region))"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " data_version TEXT PRIMARY KEY,"
+            " source TEXT,"
+            " factor_count INTEGER NOT NULL,"
+            " loaded_at REAL NOT NULL)"
+        )
+        connection.commit()
+
+        self.data_version = None
+        self.use_version(data_version or self.latest_version())
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def versions(self) -> List[Dict]:
+        rows = self._connection().execute(
+            "SELECT data_version, source, factor_count, loaded_at FROM snapshots ORDER BY loaded_at"
+        ).fetchall()
+        return [
+            {"data_version": version, "source": source, "factor_count": count, "loaded_at": loaded_at}
+            for version, source, count, loaded_at in rows
+        ]
+
+    def latest_version(self) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT data_version FROM snapshots ORDER BY loaded_at DESC LIMIT 1"
+        ).fetchone()
+        return row[0] if row else None
+
+    def use_version(self, data_version: Optional[str]) -> None:
+        index = {}
+        by_activity = {}
+        if data_version is not None:
+            for factor in self.factors(data_version):
+                index.setdefault((factor["activity_id"], factor.get("region")), factor)
+                by_activity.setdefault(factor["activity_id"], []).append(factor)
+
+        with self._lock:
+            self.data_version = data_version
+            self._index = index
+            self._by_activity = by_activity
+
+    def factors(self, data_version: str) -> List[Dict]:
+        rows = self._connection().execute(
+            "SELECT factor FROM factors WHERE data_version = ? ORDER BY activity_id, position",
+            (data_version,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def load_snapshot(self, path: str, activate: bool = True) -> str:
+        data_version, factors = read_snapshot(path)
+        return self.load_factors(data_version, factors, source=path, activate=activate)
+
+    def load_factors(self, data_version: str, factors: Iterable[Dict], source: Optional[str] = None,
+                     activate: bool = True) -> str:
+        # The first factor for an (activity_id, region) wins, as it does in a live search.
+        factors = list(factors)
+        conflicts = conflicting_factors(factors)
+        if conflicts:
+            logger.warning("Snapshot %s has %d conflicting duplicate factors; keeping the first of each: %s",
+                           data_version, len(conflicts), conflicts[:5])
+
+        positions = {}
+        seen = set()
+        rows = []
+        for factor in factors:
+            activity_id = factor["activity_id"]
+            key = (activity_id, factor.get("region") or "")
+            if key in seen:
+                continue
+            seen.add(key)
+            position = positions.get(activity_id, 0)
+            positions[activity_id] = position + 1
+            rows.append((data_version, activity_id, key[1], position, json.dumps(factor)))
+
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM factors WHERE data_version = ?", (data_version,))
+            connection.executemany(
+                "INSERT INTO factors (data_version, activity_id, region, position, factor)"
+                " VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO snapshots (data_version, source, factor_count, loaded_at)"
+                " VALUES (?, ?, ?, ?)",
+                (data_version, source, len(rows), time.time())
+            )
+
+        if activate:
+            self.use_version(data_version)
+        return data_version
+
+    def lookup(self, activity_id: str, region: Optional[str] = None) -> Optional[Dict]:
+        if region:
+            factor = self._index.get((activity_id, region))
+            if factor is not None:
+                return factor
+
+        factors = self._by_activity.get(activity_id)
+        return factors[0] if factors else None
+
+    def search(self, activity_id: str, region: Optional[str] = None) -> List[Dict]:
+        factors = self._by_activity.get(activity_id, [])
+        if not region:
+            return list(factors)
+        return sorted(factors, key=lambda factor: factor.get("region") != region)
+
+    def find(self, activity_ids: Iterable[str], region: Optional[str] = None) -> Optional[Dict]:
+        # Same order as find_emission_factor's live search: the primary id prefers a factor
+        # for the region, and a fallback id takes its first factor whatever the region.
+        for position, activity_id in enumerate(activity_ids):
+            factor = self.lookup(activity_id, region if position == 0 else None)
+            if factor is not None:
+                return factor
+        return None
+
+    def diff(self, old_version: str, new_version: str) -> Dict:
+        old = {(f["activity_id"], f.get("region")): f for f in self.factors(old_version)}
+        new = {(f["activity_id"], f.get("region")): f for f in self.factors(new_version)}
+
+        def describe(key: Tuple) -> Dict:
+            return {"activity_id": key[0], "region": key[1]}
+
+        return {
+            "old_version": old_version,
+            "new_version": new_version,
+            "added": [describe(key) for key in new if key not in old],
+            "removed": [describe(key) for key in old if key not in new],
+            "changed": [
+                dict(describe(key), old=old[key].get("factor"), new=new[key].get("factor"))
+                for key in new if key in old and comparable(old[key]) != comparable(new[key])
+            ]
+        }
+
+
+def comparable(factor: Dict) -> Dict:
+    # Every factor names the release it came from, which is not a change in itself.
+    return {key: value for key, value in factor.items() if key != "data_version"}
+
+
+def conflicting_factors(factors: Iterable[Dict]) -> List[Dict]:
+    """Later factors for an (activity_id, region) already seen that differ from the first one."""
+    first = {}
+    conflicts = []
+    for factor in factors:
+        key = (factor["activity_id"], factor.get("region") or "")
+        kept = first.setdefault(key, factor)
+        if kept is not factor and comparable(kept) != comparable(factor):
+            conflicts.append({"activity_id": key[0], "region": factor.get("region"),
+                              "kept": kept.get("factor"), "dropped": factor.get("factor")})
+    return conflicts
+
+
+def read_snapshot(path: str) -> Tuple[str, List[Dict]]:
+    with open(path, "r", encoding="utf-8") as snapshot_file:
+        snapshot = json.load(snapshot_file)
+
+    if isinstance(snapshot, list):
+        factors = snapshot
+        data_version = None
+    else:
+        factors = snapshot.get("results", [])
+        data_version = snapshot.get("data_version")
+
+    data_version = data_version or next((f["data_version"] for f in factors if f.get("data_version")), None)
+    if not data_version:
+        raise ValueError(f"Snapshot {path} does not name a data_version")
+
+    return data_version, factors
+
+
+def download_snapshot(api, activity_ids: Iterable[str], path: str) -> Dict:
+    factors = []
+    missing = []
+    for activity_id in dict.fromkeys(activity_ids):
+        result = api.search_emission_factors(activity_id)
+        if "error" in result or not result.get("results"):
+            missing.append(activity_id)
+            continue
+        factors.extend(factor for factor in result["results"] if factor.get("activity_id") == activity_id)
+
+    snapshot = {"data_version": api.data_version, "downloaded_at": time.time(), "results": factors}
+    with open(path, "w", encoding="utf-8") as snapshot_file:
+        json.dump(snapshot, snapshot_file)
+
+    return {"data_version": snapshot["data_version"], "factors": len(factors), "missing": missing}
+
+
+def create_factor_store(path: Optional[str] = None) -> Optional[FactorStore]:
+    path = path or os.getenv("CLIMATIQ_FACTOR_STORE")
+    if not path:
+        return None
+
+    return FactorStore(path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Manage the offline emission factor store")
+    parser.add_argument("--store", default=os.getenv("CLIMATIQ_FACTOR_STORE", "emission_factors.db"))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    refresh = commands.add_parser("refresh", help="download a snapshot from Climatiq and load it")
+    refresh.add_argument("--output", help="snapshot file to write (default: snapshot-<data_version>.json)")
+    refresh.add_argument("--api-key", default=os.getenv("CLIMATIQ_API_KEY"))
+
+    load = commands.add_parser("load", help="load a snapshot file")
+    load.add_argument("snapshot")
+
+    commands.add_parser("versions", help="list loaded data versions")
+
+    diff = commands.add_parser("diff", help="report factors added, removed or changed between two versions")
+    diff.add_argument("old_version")
+    diff.add_argument("new_version", nargs="?")
+
+    args = parser.parse_args(argv)
+
+    from logging_config import configure_logging
+    configure_logging()
+    store = FactorStore(args.store)
+
+    if args.command == "refresh":
+        from check_api import ACTIVITY_MAPPINGS, ClimatiqAPI
+
+        if not args.api_key:
+            print(json.dumps({"error": "API key required"}))
+            return 1
+
+        api = ClimatiqAPI(args.api_key)
+        api.factor_store = None
+        activity_ids = [
+            activity_id
+            for info in ACTIVITY_MAPPINGS.values()
+            for activity_id in [info["id"]] + info.get("fallbacks", [])
+        ]
+        output = args.output or f"snapshot-{api.data_version}.json"
+        previous = store.data_version
+
+        report = download_snapshot(api, activity_ids, output)
+        report["conflicts"] = conflicting_factors(read_snapshot(output)[1])
+        store.load_snapshot(output)
+        report["snapshot"] = output
+        if previous and previous != store.data_version:
+            report["diff"] = store.diff(previous, store.data_version)
+        print(json.dumps(report, indent=2))
+
+    elif args.command == "load":
+        previous = store.data_version
+        data_version, factors = read_snapshot(args.snapshot)
+        store.load_factors(data_version, factors, source=args.snapshot)
+        report = {"data_version": data_version, "factors": len(store.factors(data_version)),
+                  "conflicts": conflicting_factors(factors)}
+        if previous and previous != data_version:
+            report["diff"] = store.diff(previous, data_version)
+        print(json.dumps(report, indent=2))
+
+    elif args.command == "versions":
+        print(json.dumps(store.versions(), indent=2))
+
+    elif args.command == "diff":
+        print(json.dumps(store.diff(args.old_version, args.new_version or store.data_version), indent=2))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
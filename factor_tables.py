@@ -0,0 +1,102 @@
+import hashlib
+import sys
+from typing import Dict, NamedTuple, Optional
+
+UNKNOWN = "__unknown__"
+TYPE_CODE_CACHE_SIZE = 4096
+
+
+class FactorEntry(NamedTuple):
+    direct_factor: float
+    unit_kind: Optional[str]
+    region_factor: float
+    seasonal_factor: float
+    activity_adjustment: float
+    alignment: float
+
+
+class FactorTable:
+    __slots__ = ("type_names", "region_names", "entries", "version",
+                 "_type_codes", "_region_codes", "_month_codes", "_region_count")
+
+    def __init__(self, type_names: tuple, region_names: tuple, entries: tuple, version: str):
+        self.type_names = type_names
+        self.region_names = region_names
+        self.entries = entries
+        self.version = version
+        self._type_codes = {name: code for code, name in enumerate(type_names)}
+        self._region_codes = {name: code for code, name in enumerate(region_names)}
+        self._month_codes = {month: month for month in range(1, 13)}
+        self._region_count = len(region_names) + 1
+
+    @classmethod
+    def compile(cls, direct_factors: Dict, distance_types: tuple, energy_types: tuple,
+                regional_factors: Dict, seasonal_factors: Dict, activity_adjustments: Dict,
+                activity_mappings: Dict) -> "FactorTable":
+        type_names = tuple(sys.intern(name) for name in dict.fromkeys(
+            list(direct_factors) + list(activity_adjustments) + list(activity_mappings)
+        ))
+        region_names = tuple(sys.intern(name) for name in dict.fromkeys(
+            [region for factors in direct_factors.values() for region in factors] + list(regional_factors)
+        ))
+
+        entries = []
+        for activity_type in type_names + (UNKNOWN,):
+            region_direct = direct_factors.get(activity_type, {})
+
+            if activity_type in distance_types:
+                unit_kind = "distance"
+            elif activity_type in energy_types:
+                unit_kind = "energy"
+            else:
+                unit_kind = None
+
+            activity_adjustment = activity_adjustments.get(activity_type, 1.0)
+            alignment = 0.93 if activity_type == "electricity" else 0.98
+
+            for region in region_names + (UNKNOWN,):
+                direct_factor = region_direct.get(region, region_direct.get("GLOBAL", 0.1))
+                region_factor = regional_factors.get(region, regional_factors.get("GLOBAL", 1.0))
+
+                for month in (UNKNOWN,) + tuple(range(1, 13)):
+                    entries.append(FactorEntry(
+                        direct_factor,
+                        unit_kind,
+                        region_factor,
+                        seasonal_factors.get(month, 1.0),
+                        activity_adjustment,
+                        alignment
+                    ))
+
+        version = hashlib.sha1(repr((type_names, region_names, entries)).encode("utf-8")).hexdigest()[:16]
+        return cls(type_names, region_names, tuple(entries), version)
+
+    @property
+    def unknown_type_code(self) -> int:
+        return len(self.type_names)
+
+    @property
+    def unknown_region_code(self) -> int:
+        return len(self.region_names)
+
+    def type_code(self, activity_type: str) -> int:
+        code = self._type_codes.get(activity_type) if isinstance(activity_type, str) else None
+        if code is None:
+            code = self._type_codes.get(activity_type.lower(), self.unknown_type_code)
+            if len(self._type_codes) < TYPE_CODE_CACHE_SIZE:
+                self._type_codes[activity_type] = code
+
+        return code
+
+    def region_code(self, region: str) -> int:
+        return self._region_codes.get(region, self.unknown_region_code)
+
+    def month_code(self, month: int) -> int:
+        return self._month_codes.get(month, 0)
+
+    def index(self, type_code: int, region_code: int, month_code: int) -> int:
+        return (type_code * self._region_count + region_code) * 13 + month_code
+
+    def lookup(self, activity_type: str, region: str, month: int) -> FactorEntry:
+        return self.entries[self.index(self.type_code(activity_type), self.region_code(region),
+                                       self.month_code(month))]
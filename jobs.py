@@ -0,0 +1,370 @@
+import json
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from check_api import EmissionTotals, logger
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+FINISHED_STATES = (COMPLETED, FAILED)
+
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", 1000))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_PAGE_SIZE = 1000
+JOB_MAX_STORED = int(os.getenv("JOB_MAX_STORED", 1000))
+JOB_TTL = float(os.getenv("JOB_TTL", 24 * 60 * 60))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", 100))
+JOB_TIME_SMOOTHING = 0.2
+INTERRUPTED_ERROR = "Interrupted by a server restart"
+
+
+class JobStore(ABC):
+    """Job state and results. Finished jobs are kept for ``ttl`` seconds, and at most ``max_stored`` of them."""
+
+    @abstractmethod
+    def create(self, job_id: str, total: int) -> Dict:
+        pass
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        pass
+
+    @abstractmethod
+    def update(self, job_id: str, **fields) -> None:
+        pass
+
+    @abstractmethod
+    def append_results(self, job_id: str, offset: int, results: List[Dict]) -> None:
+        pass
+
+    @abstractmethod
+    def results(self, job_id: str, offset: int = 0, limit: int = JOB_PAGE_SIZE) -> List[Dict]:
+        pass
+
+
+def new_job(job_id: str, total: int) -> Dict:
+    now = time.time()
+    return {
+        "job_id": job_id,
+        "status": QUEUED,
+        "total": total,
+        "done": 0,
+        "errors": 0,
+        "summary": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+class MemoryJobStore(JobStore):
+
+    def __init__(self, max_stored: int = JOB_MAX_STORED, ttl: float = JOB_TTL):
+        self.max_stored = max_stored
+        self.ttl = ttl
+        self._jobs = {}
+        self._results = {}
+        # Finished job ids, oldest first.
+        self._finished = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        while self._finished:
+            job_id = next(iter(self._finished))
+            if len(self._finished) <= self.max_stored and now - self._jobs[job_id]["updated_at"] < self.ttl:
+                break
+            del self._finished[job_id]
+            del self._jobs[job_id]
+            del self._results[job_id]
+            logger.info("Evicted job %s", job_id)
+
+    def create(self, job_id: str, total: int) -> Dict:
+        job = new_job(job_id, total)
+        with self._lock:
+            self._evict(job["created_at"])
+            self._jobs[job_id] = job
+            self._results[job_id] = []
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._evict(time.time())
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields, updated_at=time.time())
+            if job["status"] in FINISHED_STATES:
+                self._finished[job_id] = None
+
+    def append_results(self, job_id: str, offset: int, results: List[Dict]) -> None:
+        with self._lock:
+            self._results[job_id][offset:offset + len(results)] = results
+
+    def results(self, job_id: str, offset: int = 0, limit: int = JOB_PAGE_SIZE) -> List[Dict]:
+        with self._lock:
+            return self._results.get(job_id, [])[offset:offset + limit]
+
+
+def process_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def pid_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SQLiteJobStore(JobStore):
+    """Jobs in a SQLite file, which several server processes may share.
+
+    Each job records the process that runs it, so a restart only fails the unfinished
+    jobs of processes on this host that are gone, never those of live neighbours.
+    """
+
+    def __init__(self, path: str, max_stored: int = JOB_MAX_STORED, ttl: float = JOB_TTL):
+        self.path = path
+        self.max_stored = max_stored
+        self.ttl = ttl
+        self.owner = process_owner()
+        self._local = threading.local()
+
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " total INTEGER NOT NULL,"
+            " done INTEGER NOT NULL,"
+            " errors INTEGER NOT NULL,"
+            " summary TEXT,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " owner TEXT)"
+        )
+        columns = {row["name"] for row in connection.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            connection.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        connection.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (status, updated_at)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS job_results ("
+            " job_id TEXT NOT NULL,"
+            " position INTEGER NOT NULL,"
+            " value TEXT NOT NULL,"
+            " PRIMARY KEY (job_id, position))"
+        )
+        connection.commit()
+        self.fail_interrupted()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def fail_interrupted(self) -> int:
+        # Jobs only run inside the process that accepted them, so an unfinished job whose
+        # process has exited was interrupted. Jobs from before owners were recorded count too.
+        host = self.owner.rsplit(":", 1)[0]
+        connection = self._connection()
+        rows = connection.execute(
+            "SELECT job_id, owner FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+        ).fetchall()
+        interrupted = []
+        for row in rows:
+            owner_host, _, pid = (row["owner"] or "").rpartition(":")
+            if row["owner"] is None or (owner_host == host and not pid_running(int(pid))):
+                interrupted.append(row["job_id"])
+
+        connection.executemany(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+            ((FAILED, INTERRUPTED_ERROR, time.time(), job_id) for job_id in interrupted)
+        )
+        connection.commit()
+        if interrupted:
+            logger.warning("Marked %d interrupted jobs as failed", len(interrupted))
+        return len(interrupted)
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        expired = connection.execute(
+            "SELECT job_id FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (*FINISHED_STATES, now - self.ttl)
+        ).fetchall()
+        expired += connection.execute(
+            "SELECT job_id FROM jobs WHERE status IN (?, ?) AND updated_at >= ?"
+            " ORDER BY updated_at DESC LIMIT -1 OFFSET ?",
+            (*FINISHED_STATES, now - self.ttl, self.max_stored)
+        ).fetchall()
+        if not expired:
+            return
+
+        job_ids = [(row[0],) for row in expired]
+        connection.executemany("DELETE FROM job_results WHERE job_id = ?", job_ids)
+        connection.executemany("DELETE FROM jobs WHERE job_id = ?", job_ids)
+        logger.info("Evicted %d jobs", len(job_ids))
+
+    def create(self, job_id: str, total: int) -> Dict:
+        job = new_job(job_id, total)
+        connection = self._connection()
+        self._evict(connection, job["created_at"])
+        connection.execute(
+            "INSERT INTO jobs (job_id, status, total, done, errors, summary, error, created_at, updated_at, owner)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, job["status"], total, 0, 0, None, None, job["created_at"], job["updated_at"], self.owner)
+        )
+        connection.commit()
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self._connection().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None or (row["status"] in FINISHED_STATES and row["updated_at"] < time.time() - self.ttl):
+            return None
+
+        job = dict(row)
+        del job["owner"]
+        job["summary"] = json.loads(job["summary"]) if job["summary"] else None
+        return job
+
+    def update(self, job_id: str, **fields) -> None:
+        if "summary" in fields:
+            fields["summary"] = json.dumps(fields["summary"])
+        fields["updated_at"] = time.time()
+
+        columns = ", ".join(f"{column} = ?" for column in fields)
+        connection = self._connection()
+        connection.execute(f"UPDATE jobs SET {columns} WHERE job_id = ?", (*fields.values(), job_id))
+        connection.commit()
+
+    def append_results(self, job_id: str, offset: int, results: List[Dict]) -> None:
+        # The runner passes the offset it has reached, so appending never counts the rows already stored.
+        connection = self._connection()
+        connection.executemany(
+            "INSERT INTO job_results (job_id, position, value) VALUES (?, ?, ?)",
+            ((job_id, offset + position, json.dumps(result)) for position, result in enumerate(results))
+        )
+        connection.commit()
+
+    def results(self, job_id: str, offset: int = 0, limit: int = JOB_PAGE_SIZE) -> List[Dict]:
+        rows = self._connection().execute(
+            "SELECT value FROM job_results WHERE job_id = ? AND position >= ? ORDER BY position LIMIT ?",
+            (job_id, offset, limit)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+def create_job_store(path: Optional[str] = None) -> JobStore:
+    path = path or os.getenv("JOB_STORE_PATH")
+    if not path:
+        return MemoryJobStore()
+
+    return SQLiteJobStore(path)
+
+
+class JobQueueFull(Exception):
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class JobManager:
+    """Runs jobs on a fixed pool of threads, holding at most ``max_pending`` queued or running at once.
+
+    A submission beyond that is refused with :class:`JobQueueFull`, whose Retry-After is
+    estimated from the recent job duration, rather than growing the executor's queue.
+    """
+
+    def __init__(self, service, store: Optional[JobStore] = None, workers: int = JOB_WORKERS,
+                 chunk_size: int = JOB_CHUNK_SIZE, max_pending: int = JOB_MAX_PENDING):
+        self.service = service
+        self.store = store or create_job_store()
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.job_time = 1.0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="calculation-job")
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.pending * self.job_time / self.workers))
+
+    def submit(self, activities: List[Dict]) -> Dict:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise JobQueueFull("Too many jobs queued, retry later", self.retry_after())
+            self.pending += 1
+
+        try:
+            job = self.store.create(uuid.uuid4().hex, len(activities))
+            self._executor.submit(self._run, job["job_id"], activities)
+        except Exception:
+            self._finish(None)
+            raise
+
+        logger.info("Queued job %s with %d activities", job['job_id'], len(activities))
+        return job
+
+    def _finish(self, elapsed: Optional[float]) -> None:
+        with self._lock:
+            self.pending -= 1
+            if elapsed is not None:
+                self.job_time += JOB_TIME_SMOOTHING * (elapsed - self.job_time)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.store.get(job_id)
+
+    def results(self, job_id: str, offset: int = 0, limit: int = JOB_PAGE_SIZE) -> List[Dict]:
+        return self.store.results(job_id, offset, limit)
+
+    def _run(self, job_id: str, activities: List[Dict]) -> None:
+        started = time.monotonic()
+        try:
+            self._execute(job_id, activities)
+        finally:
+            self._finish(time.monotonic() - started)
+
+    def _execute(self, job_id: str, activities: List[Dict]) -> None:
+        self.store.update(job_id, status=RUNNING)
+        totals = EmissionTotals()
+
+        try:
+            for start in range(0, len(activities), self.chunk_size):
+                results = self.service.evaluate(activities[start:start + self.chunk_size], start)
+                totals.add_all(results)
+                self.store.append_results(job_id, start, results)
+                self.store.update(job_id, done=totals.count, errors=totals.errors)
+
+            summary = self.service.calculator.summarize_totals(totals)
+            self.store.update(job_id, status=COMPLETED, summary=summary)
+            logger.info("Job %s completed: %d activities, %d errors", job_id, totals.count, totals.errors)
+
+        except Exception as e:
+            logger.error("Job %s failed: %s", job_id, e)
+            self.store.update(job_id, status=FAILED, error=str(e))
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
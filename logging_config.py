@@ -0,0 +1,124 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from typing import List, Optional
+
+DEFAULT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+DEFAULT_LOG_FILE = "carbon_calc.log"
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+_listener = None
+_queue_handler = None
+_lock = threading.Lock()
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread unformatted.
+
+    The stock QueueHandler formats every record in the calling thread so it can be
+    pickled; an in-process queue does not need that, so all formatting happens in
+    the listener instead of on the calculation path.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def build_handlers(log_file: Optional[str], max_bytes: int, backup_count: int,
+                   stream: bool = True, fmt: str = DEFAULT_FORMAT) -> List[logging.Handler]:
+    handlers = []
+    if stream:
+        handlers.append(logging.StreamHandler())
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+        ))
+
+    formatter = logging.Formatter(fmt)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def parse_level(level) -> Optional[int]:
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level).strip().upper())
+    return value if isinstance(value, int) else None
+
+
+def configure_logging(level: Optional[str] = None, log_file: Optional[str] = None,
+                      max_bytes: Optional[int] = None, backup_count: Optional[int] = None,
+                      stream: bool = True) -> None:
+    """Route all logging through a queue to a stream and a single rotating file.
+
+    Safe to call more than once; only the first call configures anything. Entry
+    points call this, importing a module never does. Only the parent process writes
+    the file: subprocess-mode calculators are started with ``LOG_FILE`` empty, and
+    forked pool workers drop the file handler, so both log to stderr alone.
+    """
+    global _listener, _queue_handler
+
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    log_file = os.getenv("LOG_FILE", DEFAULT_LOG_FILE) if log_file is None else log_file
+    max_bytes = max_bytes or int(os.getenv("LOG_MAX_BYTES", DEFAULT_MAX_BYTES))
+    backup_count = int(os.getenv("LOG_BACKUP_COUNT", DEFAULT_BACKUP_COUNT)) if backup_count is None else backup_count
+
+    with _lock:
+        if _listener is not None:
+            return
+
+        handlers = build_handlers(log_file, max_bytes, backup_count, stream)
+        log_queue = queue.SimpleQueue()
+        _queue_handler = DeferredQueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+        root = logging.getLogger()
+        root.addHandler(_queue_handler)
+        parsed = parse_level(level)
+        root.setLevel(logging.INFO if parsed is None else parsed)
+
+    if parsed is None:
+        logging.getLogger(__name__).warning("Unknown log level %r, using INFO", level)
+    atexit.register(shutdown_logging)
+
+
+def _restart_after_fork() -> None:
+    # A forked child inherits the queue handler but not the listener thread, so
+    # its records would pile up unread. Give it a listener of its own, without the
+    # file handlers: rotating one file from several processes loses records.
+    global _listener
+
+    if _listener is None:
+        return
+
+    handlers = [handler for handler in _listener.handlers if not isinstance(handler, logging.FileHandler)]
+    log_queue = queue.SimpleQueue()
+    _queue_handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener, _queue_handler
+
+    with _lock:
+        if _listener is None:
+            return
+
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        _queue_handler = None
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from emission_cache import CacheBackend, MemoryCache, SQLiteCache, TieredCache
+
+DEFAULT_ACTIVITY_ENTRIES = 10000
+DEFAULT_SUBMISSION_ENTRIES = 64
+MAX_SUBMISSION_SIZE = 10000
+MEMO_TTL = 7 * 24 * 60 * 60
+MEMO_SIZE_VARIABLE = "CLIMATIQ_MEMO_SIZE"
+
+
+def content_hash(value: Any) -> Optional[str]:
+    try:
+        canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), default=repr)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def copy_result(result: Dict) -> Dict:
+    # Results are flat apart from "comparison", so copying both keeps a caller that
+    # edits a returned row from changing the memoized one.
+    copied = dict(result)
+    comparison = copied.get("comparison")
+    if comparison is not None:
+        copied["comparison"] = dict(comparison)
+    return copied
+
+
+def copy_summary(summary: Dict) -> Dict:
+    return dict(copy_result(summary), activities=[copy_result(result) for result in summary["activities"]])
+
+
+class ResultMemo:
+    """Memoized results, copied on the way in and out so cached entries are never shared with callers."""
+
+    def __init__(self, activities: CacheBackend, submissions: CacheBackend,
+                 max_submission_size: int = MAX_SUBMISSION_SIZE):
+        self.activities = activities
+        self.submissions = submissions
+        self.max_submission_size = max_submission_size
+
+    def activity_key(self, normalized: List) -> Optional[str]:
+        return content_hash(normalized)
+
+    def submission_key(self, activities: List[Dict]) -> Optional[str]:
+        if len(activities) > self.max_submission_size:
+            return None
+        return content_hash(activities)
+
+    def get_activity(self, key: str, namespace: str, name: str) -> Optional[Dict]:
+        result = self.activities.get("activity:" + key, namespace)
+        if result is None:
+            return None
+
+        result = copy_result(result)
+        result["name"] = name
+        return result
+
+    def set_activity(self, key: str, namespace: str, result: Dict) -> None:
+        self.activities.set("activity:" + key, copy_result(result), namespace)
+
+    def get_submission(self, key: str, namespace: str) -> Optional[Dict]:
+        summary = self.submissions.get("submission:" + key, namespace)
+        if summary is None:
+            return None
+        return copy_summary(summary)
+
+    def set_submission(self, key: str, namespace: str, summary: Dict) -> None:
+        self.submissions.set("submission:" + key, copy_summary(summary), namespace)
+
+    def get_stats(self) -> Dict:
+        return {
+            "activities": self.activities.get_stats(),
+            "submissions": self.submissions.get_stats()
+        }
+
+
+def create_memo(size: Optional[int] = None, path: Optional[str] = None) -> Optional[ResultMemo]:
+    size = int(os.getenv(MEMO_SIZE_VARIABLE, DEFAULT_ACTIVITY_ENTRIES)) if size is None else size
+    if size <= 0:
+        return None
+
+    path = path or os.getenv("CLIMATIQ_MEMO_PATH")
+    activities = MemoryCache(max_entries=size, ttl=MEMO_TTL)
+    submissions = MemoryCache(max_entries=DEFAULT_SUBMISSION_ENTRIES, ttl=MEMO_TTL)
+
+    if path:
+        shared = SQLiteCache(path, max_entries=size * 10, ttl=MEMO_TTL)
+        activities = TieredCache(activities, shared)
+        submissions = TieredCache(submissions, shared)
+
+    return ResultMemo(activities, submissions)
+
+
+def default_memo(use_api: bool) -> Optional[ResultMemo]:
+    # Without the API a row costs less to evaluate than to key and look up, so the
+    # memo only pays off locally for repetitive input and is built there on request.
+    if not use_api and MEMO_SIZE_VARIABLE not in os.environ:
+        return None
+    return create_memo()
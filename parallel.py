@@ -0,0 +1,135 @@
+import math
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from typing import Dict, List, Optional
+
+from check_api import RATE_LIMIT, CarbonEmissionCalculator, ClimatiqAPI, EmissionTotals, logger, record_outcomes
+from metrics import CALCULATION_SECONDS
+from resilience import AdaptiveRateLimiter, Deadline, DeadlineExceeded
+
+MIN_SHARD_SIZE = 2000
+SHARDS_PER_WORKER = 4
+PARALLEL_WORKERS = int(os.getenv("CALCULATION_WORKERS", 0)) or os.cpu_count() or 1
+
+_worker_calculator = None
+_worker_evaluate = None
+
+
+def _init_worker(api_key: Optional[str], use_api: bool, batch: bool, workers: int) -> None:
+    global _worker_calculator, _worker_evaluate
+
+    # Each worker gets its share of the Climatiq rate limit so the pool as a whole stays under it.
+    api = ClimatiqAPI(api_key, rate_limiter=AdaptiveRateLimiter(rate=max(RATE_LIMIT / workers, 1.0)))
+    _worker_calculator = CarbonEmissionCalculator(api_key, use_api=use_api, api=api)
+    _worker_evaluate = _worker_calculator.evaluate_activities
+
+    if batch:
+        try:
+            from batch_engine import BatchEmissionEngine
+            _worker_evaluate = BatchEmissionEngine(_worker_calculator).evaluate
+        except ImportError:
+            logger.warning("numpy not available in worker, using scalar evaluation")
+
+
+def _evaluate_shard(activities: List[Dict], start_index: int, current_month: int,
+                    expires_at: Optional[float] = None, seconds: Optional[float] = None) -> List[Dict]:
+    _worker_calculator.current_month = current_month
+    deadline = None
+    if expires_at is not None:
+        # The expiry is absolute, so time spent queued in the pool counts against it: a shard
+        # that starts late is dropped here, and one already running stops at its next check.
+        deadline = Deadline.from_wall_clock(expires_at, seconds)
+        deadline.check()
+    return _worker_evaluate(activities, start_index, deadline=deadline)
+
+
+class ParallelEmissionEngine:
+
+    def __init__(self, calculator: CarbonEmissionCalculator, workers: Optional[int] = None,
+                 shard_size: Optional[int] = None, batch: bool = False):
+        self.calculator = calculator
+        self.workers = workers or PARALLEL_WORKERS
+        self.shard_size = shard_size
+        self.batch = batch
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        initializer=_init_worker,
+                        initargs=(self.calculator.api.api_key, self.calculator.use_api, self.batch, self.workers)
+                    )
+
+        return self._executor
+
+    def warm_up(self) -> None:
+        # Submitting one empty shard per worker forces every process to start and build its calculator.
+        month = self.calculator.current_month
+        futures = [self.executor.submit(_evaluate_shard, [], 0, month) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def shards(self, count: int) -> List[tuple]:
+        size = self.shard_size or max(MIN_SHARD_SIZE, math.ceil(count / (self.workers * SHARDS_PER_WORKER)))
+        return [(start, min(start + size, count)) for start in range(0, count, size)]
+
+    def process(self, activities: List[Dict], deadline: Optional[Deadline] = None) -> Dict:
+        calculator = self.calculator
+
+        if not activities:
+            return calculator.process_activities(activities)
+
+        with CALCULATION_SECONDS.time(path="parallel"):
+            results = self.evaluate(activities, deadline=deadline)
+            # Totals are accumulated in input order in this process, so they match the serial path exactly.
+            return calculator.summarize_results(results, EmissionTotals().add_all(results))
+
+    def evaluate(self, activities: List[Dict], start_index: int = 0,
+                 deadline: Optional[Deadline] = None) -> List[Dict]:
+        shards = self.shards(len(activities))
+        if self.workers == 1 or len(shards) == 1:
+            return self._evaluate_locally(activities, start_index, deadline)
+
+        month = self.calculator.current_month
+        expires_at = deadline.wall_clock_expiry() if deadline is not None else None
+        seconds = deadline.seconds if deadline is not None else None
+        futures = [
+            self.executor.submit(_evaluate_shard, activities[start:end], start_index + start, month,
+                                 expires_at, seconds)
+            for start, end in shards
+        ]
+
+        results = []
+        try:
+            for future in futures:
+                results.extend(future.result(timeout=deadline.remaining() if deadline is not None else None))
+        except (TimeoutError, DeadlineExceeded):
+            # Queued shards are cancelled; running ones see the same expiry and stop on their own.
+            for future in futures:
+                future.cancel()
+            raise DeadlineExceeded(f"Request deadline of {deadline.seconds:g}s exceeded") from None
+
+        # Workers count into their own registries, so record the outcomes here as well.
+        record_outcomes(results)
+        logger.info("Evaluated %d activities in %d shards on %d workers", len(activities), len(shards), self.workers)
+        return results
+
+    def _evaluate_locally(self, activities: List[Dict], start_index: int,
+                          deadline: Optional[Deadline] = None) -> List[Dict]:
+        if self.batch:
+            from batch_engine import BatchEmissionEngine
+            return BatchEmissionEngine(self.calculator).evaluate(activities, start_index, deadline)
+
+        return self.calculator.evaluate_activities(activities, start_index, deadline)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -0,0 +1,241 @@
+import math
+import threading
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class AdaptiveRateLimiter:
+
+    def __init__(self, rate: float = 20.0, capacity: Optional[float] = None, min_rate: float = 0.5,
+                 max_rate: Optional[float] = None, increase: float = 0.5, decrease: float = 0.5):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.min_rate = min_rate
+        self.max_rate = float(max_rate if max_rate is not None else rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.ceiling = self.max_rate
+        self.throttled = 0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._backoff_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1.0
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now, 0.0)
+
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.ceiling = min(self.max_rate, self.ceiling + self.increase * 0.1)
+            if self.rate < self.ceiling:
+                self._refill(time.monotonic())
+                self.rate = min(self.ceiling, self.rate + self.increase)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.throttled += 1
+            # Concurrent callers throttled by the same window only back off once.
+            if now >= self._backoff_until:
+                self.ceiling = max(self.min_rate, self.rate * 0.9)
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._backoff_until = now + (retry_after or 1.0)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+
+    def observe_headers(self, headers: Mapping) -> None:
+        remaining = _header_number(headers, "RateLimit-Remaining", "X-RateLimit-Remaining")
+        reset = _header_number(headers, "RateLimit-Reset", "X-RateLimit-Reset")
+        if remaining is None or not reset or reset <= 0:
+            return
+
+        # Reset may be an absolute epoch timestamp rather than a delay in seconds.
+        if reset > 10 ** 9:
+            reset = max(reset - time.time(), 1.0)
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if remaining <= 0:
+                self._blocked_until = max(self._blocked_until, now + reset)
+                return
+
+            observed = max(self.min_rate, remaining / reset)
+            if observed < self.rate:
+                self.rate = observed
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate": round(self.rate, 3),
+                "ceiling": round(self.ceiling, 3),
+                "max_rate": self.max_rate,
+                "tokens": round(self._tokens, 3),
+                "blocked_for": round(max(self._blocked_until - time.monotonic(), 0.0), 3),
+                "throttled": self.throttled
+            }
+
+
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.failures = 0
+        self.rejected = 0
+        self.opened = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return True
+
+            if state == HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._state = CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            self.failures += 1
+            if state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if state != OPEN:
+                    self.opened += 1
+                self._state = OPEN
+                self._opened_at = now
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            return {
+                "state": state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.opened,
+                "rejected": self.rejected,
+                "retry_in": round(max(self.reset_timeout - (now - self._opened_at), 0.0), 3) if state == OPEN else 0.0
+            }
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    """A point in time a request must finish by, checked between units of work."""
+
+    __slots__ = ("seconds", "expires_at")
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def from_wall_clock(cls, expires_at: float, seconds: float) -> "Deadline":
+        # Monotonic clocks are not comparable between processes, so a deadline handed to
+        # another process travels as a time.time() expiry and is rebuilt on arrival.
+        deadline = cls(seconds)
+        deadline.expires_at = time.monotonic() + (expires_at - time.time())
+        return deadline
+
+    def wall_clock_expiry(self) -> float:
+        return time.time() + (self.expires_at - time.monotonic())
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self) -> None:
+        if time.monotonic() >= self.expires_at:
+            raise DeadlineExceeded(f"Request deadline of {self.seconds:g}s exceeded")
+
+
+def retry_after_seconds(headers: Mapping, default: float) -> float:
+    """The wait a Retry-After header asks for, given as seconds or as an HTTP-date.
+
+    A missing or unparseable header yields ``default``; a date in the past yields 0.
+    """
+    value = headers.get("Retry-After")
+    if value is None:
+        return default
+
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError, IndexError):
+            return default
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = when.timestamp() - time.time()
+
+    if not math.isfinite(seconds):
+        return default
+    return max(seconds, 0.0)
+
+
+def _header_number(headers: Mapping, *names: str) -> Optional[float]:
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    return None
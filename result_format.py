@@ -0,0 +1,158 @@
+import json
+import math
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+FORMAT_ROWS = "rows"
+FORMAT_COLUMNS = "columns"
+RESULT_FORMATS = (FORMAT_ROWS, FORMAT_COLUMNS)
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPE = "application/msgpack"
+CONTENT_TYPES = (JSON_MIMETYPE, MSGPACK_MIMETYPE)
+
+
+class ResultFormatError(ValueError):
+    pass
+
+
+class ResultColumns:
+    """Per-activity results held as parallel columns instead of one dict per activity.
+
+    Emission values are packed into float arrays; an error row keeps NaN there and
+    its message in ``error``. ``rows()`` rebuilds the dicts process_activity returns.
+    """
+
+    __slots__ = ("name", "activity_id", "region", "api_emissions", "algorithm_emissions", "unit",
+                 "difference", "percent_difference", "algorithm_is_higher", "note", "error", "_error_rows")
+
+    def __init__(self):
+        self.name = []
+        self.activity_id = []
+        self.region = []
+        self.api_emissions = array("d")
+        self.algorithm_emissions = array("d")
+        self.unit = []
+        self.difference = array("d")
+        self.percent_difference = array("d")
+        self.algorithm_is_higher = []
+        self.note = []
+        self.error = []
+        self._error_rows = []
+
+    def __len__(self) -> int:
+        return len(self.name)
+
+    def append(self, activity_result: Dict) -> None:
+        self.name.append(activity_result.get("name"))
+
+        if "error" in activity_result:
+            self._error_rows.append(len(self.error))
+            self.error.append(activity_result["error"])
+            self.activity_id.append(None)
+            self.region.append(None)
+            self.api_emissions.append(math.nan)
+            self.algorithm_emissions.append(math.nan)
+            self.unit.append(None)
+            self.difference.append(math.nan)
+            self.percent_difference.append(math.nan)
+            self.algorithm_is_higher.append(None)
+            self.note.append(None)
+            return
+
+        comparison = activity_result["comparison"]
+        self.error.append(None)
+        self.activity_id.append(activity_result["activity_id"])
+        self.region.append(activity_result["region"])
+        self.api_emissions.append(activity_result["api_emissions"])
+        self.algorithm_emissions.append(activity_result["algorithm_emissions"])
+        self.unit.append(activity_result["unit"])
+        self.difference.append(comparison["difference"])
+        self.percent_difference.append(comparison["percent_difference"])
+        self.algorithm_is_higher.append(comparison["algorithm_is_higher"])
+        self.note.append(activity_result.get("note"))
+
+    def extend(self, results: Iterable[Dict]) -> "ResultColumns":
+        for activity_result in results:
+            self.append(activity_result)
+        return self
+
+    @classmethod
+    def from_results(cls, results: Iterable[Dict]) -> "ResultColumns":
+        return cls().extend(results)
+
+    def rows(self) -> Iterator[Dict]:
+        for idx in range(len(self)):
+            if self.error[idx] is not None:
+                yield {"error": self.error[idx], "name": self.name[idx]}
+                continue
+
+            activity_result = {
+                "name": self.name[idx],
+                "activity_id": self.activity_id[idx],
+                "region": self.region[idx],
+                "api_emissions": self.api_emissions[idx],
+                "algorithm_emissions": self.algorithm_emissions[idx],
+                "unit": self.unit[idx],
+                "comparison": {
+                    "difference": self.difference[idx],
+                    "percent_difference": self.percent_difference[idx],
+                    "algorithm_is_higher": self.algorithm_is_higher[idx]
+                }
+            }
+            if self.note[idx] is not None:
+                activity_result["note"] = self.note[idx]
+            yield activity_result
+
+    def to_dict(self) -> Dict[str, List]:
+        columns = {}
+        for field in self.__slots__[:-1]:
+            values = getattr(self, field)
+            columns[field] = values.tolist() if isinstance(values, array) else values
+
+        if self._error_rows:
+            # NaN is not valid JSON, so error rows carry null in the numeric columns.
+            for field in ("api_emissions", "algorithm_emissions", "difference", "percent_difference"):
+                column = columns[field]
+                for idx in self._error_rows:
+                    column[idx] = None
+        return columns
+
+
+def to_serializable(result: Dict, result_format: str = FORMAT_ROWS) -> Dict:
+    activities = result.get("activities")
+    if result_format == FORMAT_COLUMNS:
+        if not isinstance(activities, ResultColumns):
+            activities = ResultColumns.from_results(activities or [])
+        return dict(result, activities=activities.to_dict(), format=FORMAT_COLUMNS)
+
+    if isinstance(activities, ResultColumns):
+        return dict(result, activities=list(activities.rows()))
+    return result
+
+
+def encode_result(result: Dict, result_format: str = FORMAT_ROWS, content_type: str = JSON_MIMETYPE) -> bytes:
+    """Serialize a calculation result once, straight to the bytes of the response body."""
+    if result_format not in RESULT_FORMATS:
+        raise ResultFormatError(f"Unknown result format: {result_format}")
+    if content_type not in CONTENT_TYPES:
+        raise ResultFormatError(f"Unsupported content type: {content_type}")
+
+    payload = to_serializable(result, result_format)
+    if content_type == MSGPACK_MIMETYPE:
+        if msgpack is None:
+            raise ResultFormatError("msgpack is required for MessagePack responses")
+        return msgpack.packb(payload, use_bin_type=True)
+
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def negotiate_content_type(accept: Optional[str]) -> str:
+    if accept and MSGPACK_MIMETYPE in accept:
+        return MSGPACK_MIMETYPE
+    return JSON_MIMETYPE
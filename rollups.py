@@ -0,0 +1,300 @@
+import functools
+import os
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from check_api import DEFAULT_REGION, EmissionTotals, logger
+from emission_core import activity_period
+from resilience import Deadline
+
+MONTH = "month"
+REGION = "region"
+ACTIVITY_TYPE = "activity_type"
+DIMENSIONS = (MONTH, REGION, ACTIVITY_TYPE)
+
+ROLLUP_CHUNK_SIZE = int(os.getenv("ROLLUP_CHUNK_SIZE", 10000))
+ROLLUP_MAX_STORED = int(os.getenv("ROLLUP_MAX_STORED", 100))
+ROLLUP_TTL = float(os.getenv("ROLLUP_TTL", 24 * 60 * 60))
+
+
+class RollupError(ValueError):
+    pass
+
+
+def rollup_key(activity: Dict) -> Tuple[Optional[str], str, Optional[str]]:
+    """The (month, region, activity type) cell an activity is counted in.
+
+    The month is "YYYY-MM" from the activity's date, or None when it is undated or
+    the date is invalid (the activity's result is an error then).
+    """
+    try:
+        period = activity_period(activity)
+    except ValueError:
+        period = None
+
+    month = f"{period[0]:04d}-{period[1]:02d}" if period is not None else None
+    activity_type = activity.get("activity_type") or activity.get("activity_id")
+    return month, str(activity.get("region", DEFAULT_REGION)), str(activity_type) if activity_type else None
+
+
+def rollup_capacity(factor_table, months: int = 12) -> int:
+    # One year of every known type and region, plus the unknown ones, fits without growing.
+    return (len(factor_table.type_names) + 1) * (len(factor_table.region_names) + 1) * months
+
+
+def parse_group_by(value) -> Tuple[str, ...]:
+    if value is None or value == "":
+        return ()
+    names = value.split(",") if isinstance(value, str) else value
+    if not isinstance(names, (list, tuple)):
+        raise RollupError("group_by must be a list of dimensions")
+
+    group_by = tuple(dict.fromkeys(str(name).strip() for name in names))
+    unknown = [name for name in group_by if name not in DIMENSIONS]
+    if unknown:
+        raise RollupError(f"Unknown dimension: {unknown[0]} (expected {', '.join(DIMENSIONS)})")
+    return group_by
+
+
+def _sort_key(group: Tuple) -> Tuple:
+    return tuple((label is None, label or "") for label in group)
+
+
+class RollupCube:
+    """Emission totals for every (month, region, activity type) cell of a ledger.
+
+    Each cell is an index into parallel accumulator arrays, pre-sized so a ledger
+    over the known types and regions never reallocates. Any grouping is derived
+    from the cells, so queries never rescan the activities; groupings named in
+    ``materialize`` are precomputed and answered by lookup.
+    """
+
+    __slots__ = ("cells", "keys", "api_emissions", "algorithm_emissions", "counts", "errors", "_materialized")
+
+    def __init__(self, capacity: int = 0):
+        self.cells = {}
+        self.keys = []
+        self.api_emissions = array("d", bytes(8 * capacity))
+        self.algorithm_emissions = array("d", bytes(8 * capacity))
+        self.counts = array("q", bytes(8 * capacity))
+        self.errors = array("q", bytes(8 * capacity))
+        self._materialized = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _new_cell(self, key: Tuple) -> int:
+        cell = len(self.keys)
+        if cell == len(self.counts):
+            grow = max(cell, 64)
+            for accumulator in (self.api_emissions, self.algorithm_emissions, self.counts, self.errors):
+                accumulator.frombytes(bytes(8 * grow))
+
+        self.cells[key] = cell
+        self.keys.append(key)
+        return cell
+
+    def add(self, key: Tuple, activity_result: Dict) -> None:
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self._new_cell(key)
+
+        self.counts[cell] += 1
+        if "error" in activity_result:
+            self.errors[cell] += 1
+            return
+
+        self.api_emissions[cell] += activity_result["api_emissions"]
+        self.algorithm_emissions[cell] += activity_result["algorithm_emissions"]
+
+    def add_all(self, activities: Iterable[Dict], results: Iterable[Dict]) -> "RollupCube":
+        for activity, activity_result in zip(activities, results):
+            self.add(rollup_key(activity), activity_result)
+        self._materialized.clear()
+        return self
+
+    def totals(self) -> EmissionTotals:
+        totals = EmissionTotals()
+        size = len(self.keys)
+        totals.api_emissions = sum(self.api_emissions[:size])
+        totals.algorithm_emissions = sum(self.algorithm_emissions[:size])
+        totals.count = sum(self.counts[:size])
+        totals.errors = sum(self.errors[:size])
+        return totals
+
+    def _group(self, group_by: Tuple[str, ...]) -> Dict[Tuple, List]:
+        positions = [DIMENSIONS.index(name) for name in group_by]
+        api_emissions, algorithm_emissions = self.api_emissions, self.algorithm_emissions
+        counts, errors = self.counts, self.errors
+
+        groups = {}
+        for cell, key in enumerate(self.keys):
+            group = tuple(key[position] for position in positions)
+            accumulator = groups.get(group)
+            if accumulator is None:
+                groups[group] = [api_emissions[cell], algorithm_emissions[cell], counts[cell], errors[cell]]
+            else:
+                accumulator[0] += api_emissions[cell]
+                accumulator[1] += algorithm_emissions[cell]
+                accumulator[2] += counts[cell]
+                accumulator[3] += errors[cell]
+
+        return groups
+
+    def materialize(self, group_by: Iterable[str]) -> None:
+        group_by = parse_group_by(group_by)
+        self._materialized[group_by] = self._group(group_by)
+
+    @property
+    def materialized(self) -> List[Tuple[str, ...]]:
+        return list(self._materialized)
+
+    def query(self, group_by: Iterable[str] = DIMENSIONS, filters: Optional[Dict[str, str]] = None) -> List[Dict]:
+        group_by = parse_group_by(group_by)
+        filters = {name: value for name, value in (filters or {}).items() if value is not None}
+        unknown = [name for name in filters if name not in DIMENSIONS]
+        if unknown:
+            raise RollupError(f"Unknown dimension: {unknown[0]} (expected {', '.join(DIMENSIONS)})")
+
+        if set(filters) <= set(group_by) and group_by in self._materialized:
+            groups = self._materialized[group_by]
+            positions = {name: group_by.index(name) for name in filters}
+        else:
+            # Filtering on a dimension outside the grouping needs it in the key until the filter is applied.
+            extended = group_by + tuple(name for name in filters if name not in group_by)
+            groups = self._group(extended)
+            positions = {name: extended.index(name) for name in filters}
+
+        rows = []
+        merged = {}
+        for group, (api_emissions, algorithm_emissions, count, errors) in groups.items():
+            if any(group[position] != filters[name] for name, position in positions.items()):
+                continue
+
+            group = group[:len(group_by)]
+            if group in merged:
+                row = merged[group]
+                row["api_emissions"] += api_emissions
+                row["algorithm_emissions"] += algorithm_emissions
+                row["count"] += count
+                row["errors"] += errors
+                continue
+
+            row = dict(zip(group_by, group))
+            row.update(api_emissions=api_emissions, algorithm_emissions=algorithm_emissions,
+                       count=count, errors=errors)
+            merged[group] = row
+            rows.append(row)
+
+        rows.sort(key=lambda row: _sort_key(tuple(row[name] for name in group_by)))
+        for row in rows:
+            row["api_emissions"] = round(row["api_emissions"], 2)
+            row["algorithm_emissions"] = round(row["algorithm_emissions"], 2)
+        return rows
+
+
+class RollupEngine:
+    """Builds a RollupCube in one streaming pass over a ledger of activities.
+
+    Activities are evaluated a chunk at a time and folded into the cube straight
+    away, so memory is bounded by the chunk and the number of cells, not the ledger.
+    """
+
+    def __init__(self, evaluate: Callable[[List[Dict], int], List[Dict]], capacity: int = 0,
+                 chunk_size: int = ROLLUP_CHUNK_SIZE):
+        self.evaluate = evaluate
+        self.capacity = capacity
+        self.chunk_size = chunk_size
+
+    def process(self, activities: Iterable[Dict]) -> RollupCube:
+        cube = RollupCube(self.capacity)
+        iterator = iter(activities)
+        start = 0
+        while True:
+            chunk = list(islice(iterator, self.chunk_size))
+            if not chunk:
+                break
+
+            cube.add_all(chunk, self.evaluate(chunk, start))
+            start += len(chunk)
+
+        logger.info("Rolled up %d activities into %d cells", start, len(cube))
+        return cube
+
+
+class RollupManager:
+    """Materialized rollups held in memory, bounded in count and evicted least-recently-used first."""
+
+    def __init__(self, service, max_stored: int = ROLLUP_MAX_STORED, ttl: float = ROLLUP_TTL,
+                 chunk_size: int = ROLLUP_CHUNK_SIZE):
+        self.service = service
+        self.max_stored = max_stored
+        self.ttl = ttl
+        self.chunk_size = chunk_size
+        self._rollups = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        while self._rollups:
+            rollup_id, (cube, last_used) = next(iter(self._rollups.items()))
+            if len(self._rollups) <= self.max_stored and now - last_used < self.ttl:
+                break
+            del self._rollups[rollup_id]
+            logger.info("Evicted rollup %s", rollup_id)
+
+    def create(self, activities: Iterable[Dict], materialize: Iterable = (),
+               deadline: Optional[Deadline] = None) -> Dict:
+        groupings = [parse_group_by(group_by) for group_by in materialize or ()]
+
+        capacity = rollup_capacity(self.service.calculator.factor_table)
+        evaluate = functools.partial(self.service.evaluate, deadline=deadline)
+        cube = RollupEngine(evaluate, capacity, self.chunk_size).process(activities)
+        for group_by in groupings:
+            cube.materialize(group_by)
+
+        rollup_id = uuid.uuid4().hex
+        now = time.monotonic()
+        with self._lock:
+            self._rollups[rollup_id] = (cube, now)
+            self._evict(now)
+
+        return self.describe(rollup_id, cube)
+
+    def get(self, rollup_id: str) -> Optional[RollupCube]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._rollups.get(rollup_id)
+            if entry is None:
+                return None
+            self._rollups[rollup_id] = (entry[0], now)
+            self._rollups.move_to_end(rollup_id)
+        return entry[0]
+
+    def query(self, rollup_id: str, group_by: Iterable[str] = DIMENSIONS,
+              filters: Optional[Dict[str, str]] = None) -> Optional[Dict]:
+        cube = self.get(rollup_id)
+        if cube is None:
+            return None
+
+        return dict(self.describe(rollup_id, cube), group_by=list(parse_group_by(group_by)),
+                    rows=cube.query(group_by, filters))
+
+    def delete(self, rollup_id: str) -> bool:
+        with self._lock:
+            return self._rollups.pop(rollup_id, None) is not None
+
+    def describe(self, rollup_id: str, cube: RollupCube) -> Dict:
+        totals = cube.totals()
+        return {
+            "rollup_id": rollup_id,
+            "activity_count": totals.count,
+            "cells": len(cube),
+            "materialized": [list(group_by) for group_by in cube.materialized],
+            "summary": self.service.calculator.summarize_totals(totals)
+        }
@@ -1,8 +1,20 @@
 import sys
 import json
-from check_api import calculate_carbon_footprint
+
+from dotenv import load_dotenv
+
+# Load .env before check_api reads its settings from the environment.
+load_dotenv()
+
+from check_api import calculate_carbon_footprint  # noqa: E402
+from logging_config import configure_logging  # noqa: E402
 
 if __name__ == "__main__":
+    configure_logging()
+    if "--ndjson" in sys.argv[1:]:
+        from streaming import main as stream_main
+        sys.exit(stream_main(sys.argv[1:]))
+
     input_data = json.loads(sys.stdin.read())
 
     result = calculate_carbon_footprint(
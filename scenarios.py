@@ -0,0 +1,362 @@
+import itertools
+import os
+from typing import Dict, List, Optional
+
+from check_api import DEFAULT_REGION, DIRECT_FALLBACK_EMISSIONS, logger
+from metrics import CALCULATION_SECONDS
+from resilience import Deadline
+
+BASE_SCENARIO = "base"
+MATRIX_COLUMNS = ("api_emissions", "algorithm_emissions", "api_change", "algorithm_change")
+PERTURBATIONS = ("substitutions", "region_swaps", "region_factors", "algorithm_factors")
+
+SCENARIO_MAX = int(os.getenv("SCENARIO_MAX", 10000))
+SCENARIO_CHUNK_ELEMENTS = int(os.getenv("SCENARIO_CHUNK_ELEMENTS", 2000000))
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class ScenarioError(ValueError):
+    pass
+
+
+def _mapping(value, field: str, name: str, numeric: bool) -> Dict:
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ScenarioError(f"{name}: {field} must be an object")
+
+    for key, item in value.items():
+        if numeric and (isinstance(item, bool) or not isinstance(item, (int, float))):
+            raise ScenarioError(f"{name}: {field}[{key}] must be a number")
+        if not numeric and not isinstance(item, str):
+            raise ScenarioError(f"{name}: {field}[{key}] must be a region")
+    return dict(value)
+
+
+def normalize_scenario(spec: Dict, position: int) -> Dict:
+    if not isinstance(spec, dict):
+        raise ScenarioError(f"Scenario {position + 1} must be an object")
+
+    name = str(spec.get("name") or f"Scenario {position + 1}")
+    unknown = [key for key in spec if key != "name" and key not in PERTURBATIONS]
+    if unknown:
+        raise ScenarioError(f"{name}: unknown perturbation {unknown[0]} (expected {', '.join(PERTURBATIONS)})")
+
+    substitutions = spec.get("substitutions") or []
+    if not isinstance(substitutions, list):
+        raise ScenarioError(f"{name}: substitutions must be a list")
+
+    normalized = []
+    for substitution in substitutions:
+        if not isinstance(substitution, dict) or not substitution.get("from") or not substitution.get("to"):
+            raise ScenarioError(f"{name}: a substitution needs from and to activity types")
+
+        share = substitution.get("share", 1.0)
+        if isinstance(share, bool) or not isinstance(share, (int, float)) or not 0 <= share <= 1:
+            raise ScenarioError(f"{name}: substitution share must be between 0 and 1")
+
+        normalized.append((str(substitution["from"]), str(substitution["to"]), float(share),
+                           substitution.get("region")))
+
+    return {
+        "name": name,
+        "substitutions": normalized,
+        "region_swaps": _mapping(spec.get("region_swaps"), "region_swaps", name, numeric=False),
+        "region_factors": _mapping(spec.get("region_factors"), "region_factors", name, numeric=True),
+        "algorithm_factors": _mapping(spec.get("algorithm_factors"), "algorithm_factors", name, numeric=True)
+    }
+
+
+def expand_grid(grid: Dict[str, List[Dict]]) -> List[Dict]:
+    """Every combination of one perturbation per axis, merged into a single scenario.
+
+    Substitutions from each axis are applied together; for the factor and swap
+    mappings a later axis wins on the same key.
+    """
+    if not isinstance(grid, dict) or not all(isinstance(options, list) and options for options in grid.values()):
+        raise ScenarioError("grid must map each axis to a non-empty list of perturbations")
+
+    axes = list(grid)
+    scenarios = []
+    for combination in itertools.product(*(enumerate(grid[axis]) for axis in axes)):
+        merged = {"substitutions": [], "region_swaps": {}, "region_factors": {}, "algorithm_factors": {}}
+        labels = []
+        for axis, (option_index, option) in zip(axes, combination):
+            if not isinstance(option, dict):
+                raise ScenarioError(f"grid[{axis}] entries must be objects")
+
+            labels.append(f"{axis}={option.get('name', option_index)}")
+            for key, value in option.items():
+                if key == "name":
+                    continue
+                if key == "substitutions":
+                    merged[key] = merged[key] + list(value or [])
+                elif key in merged and isinstance(value, dict):
+                    merged[key] = dict(merged[key], **value)
+                else:
+                    merged[key] = value
+
+        merged["name"] = ", ".join(labels)
+        scenarios.append(merged)
+
+    return scenarios
+
+
+class ScenarioSweep:
+    """Evaluates many what-if variants of one activity set as a single array computation.
+
+    The activities are parsed once into lanes: one per activity, plus one for every
+    activity a substitution could move emissions to. Each scenario is then only a row
+    of lane shares, region codes and factors, and a block of scenarios is evaluated
+    as one (scenarios x lanes) computation with the same arithmetic as the batch engine.
+    """
+
+    def __init__(self, calculator, chunk_elements: int = SCENARIO_CHUNK_ELEMENTS):
+        self.np = _numpy()
+        if self.np is None:
+            raise ImportError("numpy is required for scenario sweeps")
+
+        self.calculator = calculator
+        self.chunk_elements = chunk_elements
+
+        table = calculator.factor_table
+        np = self.np
+        self.region_count = len(table.region_names) + 1
+        self.direct = np.array([entry.direct_factor for entry in table.entries], dtype=np.float64)
+        self.seasonal = np.array([entry.seasonal_factor for entry in table.entries], dtype=np.float64)
+        self.adjustment = np.array([entry.activity_adjustment for entry in table.entries], dtype=np.float64)
+        self.alignment = np.array([entry.alignment for entry in table.entries], dtype=np.float64)
+        self.region_factors = np.array([table.entries[table.index(0, code, 0)].region_factor
+                                        for code in range(self.region_count)], dtype=np.float64)
+
+    def _type_key(self, activity_type: str) -> str:
+        # Substitutions and factor overrides match on the resolved mapping, so aliases count too.
+        return self.calculator.get_activity_info(activity_type).get("id")
+
+    def _parse(self, activities: List[Dict]) -> tuple:
+        calculator = self.calculator
+        table = calculator.factor_table
+        units = calculator.units
+
+        rows = []
+        errors = 0
+        for activity in activities:
+            if not activity.get("activity_type") and not activity.get("activity_id"):
+                errors += 1
+                continue
+
+            parameters = activity.get("parameters")
+            if not parameters:
+                errors += 1
+                continue
+
+            try:
+                activity_type = activity.get("activity_type")
+                region = activity.get("region", DEFAULT_REGION)
+                month_code = table.month_code(calculator.activity_month(activity))
+                type_code = table.type_code(activity_type)
+                kind = table.entries[table.index(type_code, 0, 0)].unit_kind
+                activity_info = calculator.get_activity_info(activity_type)
+
+                if kind is not None and kind in parameters:
+                    unit = parameters.get(f"{kind}_unit", units.base_units[kind])
+                    amount = float(parameters[kind]) * units.factor(kind, unit)
+                    fallback = False
+                else:
+                    amount = 0.0
+                    fallback = True
+
+            except Exception:
+                errors += 1
+                continue
+
+            rows.append((type_code, kind, activity_info.get("id"), activity_info.get("algorithm_factor", 1.0),
+                         region, month_code, amount, fallback))
+
+        return rows, errors
+
+    def run(self, activities: List[Dict], scenarios: List[Dict], deadline: Optional[Deadline] = None) -> Dict:
+        np = self.np
+        calculator = self.calculator
+        table = calculator.factor_table
+
+        scenarios = [normalize_scenario({"name": BASE_SCENARIO}, 0)] + \
+            [normalize_scenario(spec, position) for position, spec in enumerate(scenarios)]
+        if len(scenarios) - 1 > SCENARIO_MAX:
+            raise ScenarioError(f"A sweep evaluates at most {SCENARIO_MAX} scenarios")
+
+        rows, errors = self._parse(activities)
+        if deadline is not None:
+            deadline.check()
+
+        region_labels = {}
+        type_keys = {}
+        lane_type, lane_key, lane_factor, lane_region, lane_month, lane_amount, lane_fallback = \
+            [], [], [], [], [], [], []
+
+        def add_lane(type_code, type_key, algorithm_factor, row):
+            lane_type.append(type_code)
+            lane_key.append(type_keys.setdefault(type_key, len(type_keys)))
+            lane_factor.append(algorithm_factor)
+            lane_region.append(region_labels.setdefault(row[4], len(region_labels)))
+            lane_month.append(row[5])
+            lane_amount.append(row[6])
+            lane_fallback.append(row[7])
+
+        for row in rows:
+            add_lane(row[0], row[2], row[3], row)
+
+        # One extra lane per activity a substitution can apply to; its share is zero unless a scenario moves some.
+        substitution_lanes = {}
+        for scenario in scenarios:
+            for source, target, _, _ in scenario["substitutions"]:
+                key = (self._type_key(source), target)
+                if key in substitution_lanes:
+                    continue
+
+                target_code = table.type_code(target)
+                target_kind = table.entries[table.index(target_code, 0, 0)].unit_kind
+                target_info = calculator.get_activity_info(target)
+                lanes = []
+                for position, row in enumerate(rows):
+                    if row[2] != key[0] or row[7]:
+                        continue
+                    if row[1] != target_kind:
+                        raise ScenarioError(f"{scenario['name']}: cannot substitute {source} ({row[1]}) "
+                                            f"with {target} ({target_kind})")
+                    lanes.append((len(lane_type), position))
+                    add_lane(target_code, target_info.get("id"), target_info.get("algorithm_factor", 1.0), row)
+                substitution_lanes[key] = (np.array([lane for lane, _ in lanes], dtype=np.intp),
+                                           np.array([position for _, position in lanes], dtype=np.intp))
+
+        lane_count = len(lane_type)
+        lane_type = np.array(lane_type, dtype=np.intp)
+        lane_key = np.array(lane_key, dtype=np.intp)
+        lane_factor = np.array(lane_factor, dtype=np.float64)
+        lane_region = np.array(lane_region, dtype=np.intp)
+        lane_month = np.array(lane_month, dtype=np.intp)
+        lane_amount = np.array(lane_amount, dtype=np.float64)
+        lane_fallback = np.array(lane_fallback, dtype=bool)
+        row_region = lane_region[:len(rows)]
+
+        # Per-scenario lookup tables: label -> table region, table region -> factor, mapping -> algorithm factor.
+        base_regions = np.array([table.region_code(label) for label in region_labels], dtype=np.intp)
+        region_maps = np.tile(base_regions, (len(scenarios), 1))
+        region_factors = np.tile(self.region_factors, (len(scenarios), 1))
+        algorithm_overrides = np.full((len(scenarios), max(len(type_keys), 1)), np.nan)
+
+        for index, scenario in enumerate(scenarios):
+            for source, target in scenario["region_swaps"].items():
+                code = table.region_code(target)
+                if code == table.unknown_region_code:
+                    raise ScenarioError(f"{scenario['name']}: unknown region {target}")
+                if source in region_labels:
+                    region_maps[index, region_labels[source]] = code
+            for region, factor in scenario["region_factors"].items():
+                code = table.region_code(region)
+                if code == table.unknown_region_code:
+                    raise ScenarioError(f"{scenario['name']}: unknown region {region}")
+                region_factors[index, code] = factor
+            for activity_type, factor in scenario["algorithm_factors"].items():
+                type_key = self._type_key(activity_type)
+                if calculator.activity_resolver.type_for_id(type_key) is None:
+                    raise ScenarioError(f"{scenario['name']}: unknown activity type {activity_type}")
+                # A known type absent from these activities has nothing to override.
+                code = type_keys.get(type_key)
+                if code is not None:
+                    algorithm_overrides[index, code] = factor
+
+        base_shares = np.zeros(lane_count, dtype=np.float64)
+        base_shares[:len(rows)] = 1.0
+
+        totals = np.empty((len(scenarios), 2), dtype=np.float64)
+        chunk = max(1, self.chunk_elements // max(lane_count, 1))
+        with CALCULATION_SECONDS.time(path="scenarios"):
+            for start in range(0, len(scenarios), chunk):
+                if deadline is not None:
+                    deadline.check()
+                end = min(start + chunk, len(scenarios))
+                shares = np.tile(base_shares, (end - start, 1))
+                for offset, scenario in enumerate(scenarios[start:end]):
+                    self._apply_substitutions(shares[offset], scenario, substitution_lanes, row_region,
+                                              region_labels)
+
+                totals[start:end] = self._compute(
+                    shares, region_maps[start:end], region_factors[start:end], algorithm_overrides[start:end],
+                    lane_type, lane_key, lane_factor, lane_region, lane_month, lane_amount, lane_fallback
+                )
+
+        logger.info("Evaluated %d scenarios over %d activities (%d lanes, %d errors)",
+                    len(scenarios), len(activities), lane_count, errors)
+
+        base_api, base_algorithm = totals[0].tolist()
+        matrix = [
+            [round(api, 2), round(algorithm, 2), round(api - base_api, 2), round(algorithm - base_algorithm, 2)]
+            for api, algorithm in totals.tolist()
+        ]
+        return {
+            "scenarios": [scenario["name"] for scenario in scenarios],
+            "columns": list(MATRIX_COLUMNS),
+            "matrix": matrix,
+            "unit": "kg CO2e",
+            "activity_count": len(activities),
+            "errors": errors
+        }
+
+    def _apply_substitutions(self, shares, scenario: Dict, substitution_lanes: Dict, row_region,
+                             region_labels: Dict) -> None:
+        for source, target, share, region in scenario["substitutions"]:
+            lanes, positions = substitution_lanes[(self._type_key(source), target)]
+            if region is not None:
+                selected = row_region[positions] == region_labels.get(region, -1)
+                lanes, positions = lanes[selected], positions[selected]
+
+            shares[lanes] += share
+            shares[positions] -= share
+
+        if (shares < -1e-9).any():
+            raise ScenarioError(f"{scenario['name']}: substitutions move more than all of an activity")
+
+    def _compute(self, shares, region_maps, region_factors, algorithm_overrides, lane_type, lane_key,
+                 lane_factor, lane_region, lane_month, lane_amount, lane_fallback):
+        from batch_engine import round_half_even
+
+        np = self.np
+        regions = region_maps[:, lane_region]
+        flat = lane_type * self.region_count + regions
+        flat *= 13
+        flat += lane_month
+
+        # Same order of multiplication as the batch engine, done in place to keep the (scenarios x lanes)
+        # temporaries few. The damping uses np.log, so a damped row may differ from it in the last bit.
+        raw = lane_amount * shares
+        raw *= self.direct[flat]
+        raw[:, lane_fallback] = DIRECT_FALLBACK_EMISSIONS
+
+        overrides = algorithm_overrides[:, lane_key]
+        adjusted = np.where(np.isnan(overrides), lane_factor, overrides)
+        adjusted *= raw
+        adjusted *= np.take_along_axis(region_factors, regions, axis=1)
+        adjusted *= self.seasonal[flat]
+        adjusted *= self.adjustment[flat]
+
+        damped = adjusted > 100
+        logs = np.divide(adjusted, 100, where=damped, out=np.ones_like(adjusted))
+        np.log(logs, out=logs)
+        logs *= 5
+        # Rows at or below 100 get + 0.0, which leaves them unchanged.
+        np.multiply(adjusted, 0.95, out=adjusted, where=damped)
+        adjusted += logs
+
+        adjusted *= self.alignment[flat]
+        algorithm = round_half_even(adjusted.ravel(), 2).reshape(adjusted.shape)
+        algorithm[raw <= 0] = 0.0
+
+        return np.stack((raw.sum(axis=1), algorithm.sum(axis=1)), axis=1)
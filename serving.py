@@ -0,0 +1,166 @@
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from check_api import logger
+from metrics import ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS
+from resilience import Deadline
+
+SERVER_THREADS = int(os.getenv("SERVER_THREADS", 16))
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", 64))
+MAX_CONCURRENT_CALCULATIONS = int(os.getenv("MAX_CONCURRENT_CALCULATIONS", 0)) or os.cpu_count() or 4
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", 32))
+ADMISSION_TIMEOUT = float(os.getenv("ADMISSION_TIMEOUT", 5))
+KEEP_ALIVE_TIMEOUT = float(os.getenv("SERVER_KEEP_ALIVE_TIMEOUT", 5))
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", 30))
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+class Overloaded(Exception):
+
+    def __init__(self, status: int, message: str, retry_after: int):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounds the calculations running at once and the requests queued for a slot.
+
+    A request that finds the queue full is refused with 429 straight away; one that
+    waits longer than ``timeout`` (or past its deadline) is refused with 503. Both
+    carry a Retry-After estimated from the recent service time and the queue length.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_CALCULATIONS, queue_size: int = ADMISSION_QUEUE_SIZE,
+                 timeout: float = ADMISSION_TIMEOUT):
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.service_time = 1.0
+        self._condition = threading.Condition()
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil((self.waiting + 1) * self.service_time / self.max_concurrent))
+
+    def _reject(self, status: int, reason: str, message: str) -> Overloaded:
+        ADMISSION_REJECTED.inc(reason=reason)
+        return Overloaded(status, message, self.retry_after())
+
+    @contextmanager
+    def admit(self, deadline: Optional[Deadline] = None):
+        queued = time.monotonic()
+        with self._condition:
+            if self.active >= self.max_concurrent:
+                if self.waiting >= self.queue_size:
+                    raise self._reject(429, "queue_full", "Too many requests queued, retry later")
+
+                limit = self.timeout if deadline is None else min(self.timeout, deadline.remaining())
+                give_up_at = queued + limit
+                self.waiting += 1
+                try:
+                    while self.active >= self.max_concurrent:
+                        remaining = give_up_at - time.monotonic()
+                        if remaining <= 0:
+                            raise self._reject(503, "queue_timeout", "Server busy, retry later")
+                        self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+
+            self.active += 1
+
+        started = time.monotonic()
+        ADMISSION_WAIT_SECONDS.observe(started - queued)
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self._condition:
+                self.active -= 1
+                self.service_time += SERVICE_TIME_SMOOTHING * (elapsed - self.service_time)
+                self._condition.notify()
+
+    def snapshot(self) -> Dict:
+        with self._condition:
+            return {
+                "active": self.active,
+                "waiting": self.waiting,
+                "max_concurrent": self.max_concurrent,
+                "queue_size": self.queue_size,
+                "service_time": round(self.service_time, 3)
+            }
+
+
+class PooledRequestHandler(WSGIRequestHandler):
+    # An idle keep-alive connection holds a pool thread, so it is dropped after this long.
+    timeout = KEEP_ALIVE_TIMEOUT
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug's WSGI server with a fixed pool of handler threads and a bounded backlog.
+
+    Connections beyond the pool and ``backlog`` are answered with 503 on the accepting
+    thread instead of piling up, so a spike cannot grow memory or latency without bound.
+    """
+
+    multithread = True
+
+    def __init__(self, host: str, port: int, app, threads: int = SERVER_THREADS, backlog: int = SERVER_BACKLOG,
+                 **kwargs):
+        kwargs.setdefault("handler", PooledRequestHandler)
+        super().__init__(host, port, app, **kwargs)
+        self.threads = threads
+        self._slots = threading.BoundedSemaphore(threads + backlog)
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="http")
+
+    def process_request(self, request, client_address) -> None:
+        if not self._slots.acquire(blocking=False):
+            ADMISSION_REJECTED.inc(reason="backlog_full")
+            self._refuse(request)
+            return
+
+        self._executor.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def _refuse(self, request) -> None:
+        body = json.dumps({"error": "Server busy, retry later"}).encode("utf-8")
+        head = ("HTTP/1.1 503 Service Unavailable\r\nRetry-After: 1\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode("ascii")
+        try:
+            request.sendall(head + body)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._executor.shutdown(wait=False)
+
+
+def serve(app, host: str = "0.0.0.0", port: int = 5000, threads: int = SERVER_THREADS,
+          backlog: int = SERVER_BACKLOG) -> None:
+    server = PooledWSGIServer(host, port, app, threads=threads, backlog=backlog)
+    logger.info("Serving on %s:%d with %d threads (backlog %d)", host, server.port, threads, backlog)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
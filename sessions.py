@@ -0,0 +1,286 @@
+import functools
+import math
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from check_api import logger
+from resilience import Deadline
+
+ADD = "add"
+UPDATE = "update"
+REMOVE = "remove"
+OPERATIONS = (ADD, UPDATE, REMOVE)
+
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", 1000))
+SESSION_MAX_ACTIVITIES = int(os.getenv("SESSION_MAX_ACTIVITIES", 10000))
+SESSION_TTL = float(os.getenv("SESSION_TTL", 60 * 60))
+
+
+class SessionError(ValueError):
+    pass
+
+
+class ExactSum:
+    """A running float sum that supports removal without drift.
+
+    The value is always the correctly rounded sum of the values currently held, as
+    math.fsum would give, whatever order they were added and removed in. The
+    partials are kept with Shewchuk's algorithm; non-finite values are counted
+    separately so removing them restores a finite total.
+    """
+
+    __slots__ = ("_partials", "_special")
+
+    def __init__(self):
+        self._partials = []
+        self._special = {}
+
+    def add(self, value: float) -> None:
+        if not math.isfinite(value):
+            key = "nan" if math.isnan(value) else value
+            self._special[key] = self._special.get(key, 0) + 1
+            return
+
+        partials = self._partials
+        i = 0
+        for partial in partials:
+            if abs(value) < abs(partial):
+                value, partial = partial, value
+            high = value + partial
+            low = partial - (high - value)
+            if low:
+                partials[i] = low
+                i += 1
+            value = high
+        partials[i:] = [value]
+
+    def remove(self, value: float) -> None:
+        if not math.isfinite(value):
+            key = "nan" if math.isnan(value) else value
+            count = self._special.get(key, 0) - 1
+            if count > 0:
+                self._special[key] = count
+            else:
+                self._special.pop(key, None)
+            return
+
+        self.add(-value)
+
+    @property
+    def value(self) -> float:
+        special = self._special
+        if special:
+            if "nan" in special or (math.inf in special and -math.inf in special):
+                return math.nan
+            return math.inf if math.inf in special else -math.inf
+        return math.fsum(self._partials)
+
+
+class SessionTotals:
+    """EmissionTotals for a set of results that changes in place."""
+
+    __slots__ = ("_api_emissions", "_algorithm_emissions", "errors", "count")
+
+    def __init__(self):
+        self._api_emissions = ExactSum()
+        self._algorithm_emissions = ExactSum()
+        self.errors = 0
+        self.count = 0
+
+    @property
+    def api_emissions(self) -> float:
+        return self._api_emissions.value
+
+    @property
+    def algorithm_emissions(self) -> float:
+        return self._algorithm_emissions.value
+
+    def add(self, activity_result: Dict) -> None:
+        self.count += 1
+        if "error" in activity_result:
+            self.errors += 1
+            return
+
+        self._api_emissions.add(activity_result["api_emissions"])
+        self._algorithm_emissions.add(activity_result["algorithm_emissions"])
+
+    def remove(self, activity_result: Dict) -> None:
+        self.count -= 1
+        if "error" in activity_result:
+            self.errors -= 1
+            return
+
+        self._api_emissions.remove(activity_result["api_emissions"])
+        self._algorithm_emissions.remove(activity_result["algorithm_emissions"])
+
+
+class CalculationSession:
+
+    def __init__(self, session_id: str, max_activities: int = SESSION_MAX_ACTIVITIES):
+        self.session_id = session_id
+        self.max_activities = max_activities
+        self.activities = {}
+        self.results = {}
+        self.totals = SessionTotals()
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+        self._next_id = 1
+
+    def _new_id(self, taken) -> str:
+        while str(self._next_id) in taken:
+            self._next_id += 1
+        activity_id = str(self._next_id)
+        self._next_id += 1
+        return activity_id
+
+    def plan(self, changes: List[Dict]) -> Tuple[Dict[str, Optional[Dict]], List[str]]:
+        """Validate a list of changes and return the final activity for every id they touch.
+
+        Nothing is applied, so a bad change rejects the whole request.
+        """
+        if not isinstance(changes, list):
+            raise SessionError("changes must be a list")
+
+        present = set(self.activities)
+        touched = {}
+        order = []
+        for position, change in enumerate(changes):
+            op = change.get("op") if isinstance(change, dict) else None
+            if op not in OPERATIONS:
+                raise SessionError(f"Change {position}: op must be one of {', '.join(OPERATIONS)}")
+
+            activity_id = change.get("id")
+            activity_id = str(activity_id) if activity_id is not None else None
+            if op == ADD:
+                if activity_id is None:
+                    activity_id = self._new_id(present)
+                elif activity_id in present:
+                    raise SessionError(f"Change {position}: activity {activity_id} already exists")
+            elif activity_id not in present:
+                raise SessionError(f"Change {position}: activity {activity_id} not found")
+
+            if op == REMOVE:
+                present.discard(activity_id)
+                activity = None
+            else:
+                activity = change.get("activity")
+                if not isinstance(activity, dict):
+                    raise SessionError(f"Change {position}: activity must be an object")
+                activity = dict(activity, name=activity.get("name") or f"Activity {activity_id}")
+                activity.pop("id", None)
+                present.add(activity_id)
+
+            if activity_id not in touched:
+                order.append(activity_id)
+            touched[activity_id] = activity
+
+        if len(present) > self.max_activities:
+            raise SessionError(f"A session holds at most {self.max_activities} activities")
+
+        return touched, order
+
+    def apply(self, changes: List[Dict],
+              evaluate: Callable[[List[Dict]], List[Dict]]) -> Dict[str, Optional[Dict]]:
+        touched, order = self.plan(changes)
+
+        pending = [activity_id for activity_id in order if touched[activity_id] is not None]
+        evaluated = evaluate([touched[activity_id] for activity_id in pending]) if pending else []
+        new_results = dict(zip(pending, evaluated))
+
+        # Only the rows that changed move the totals, so each request costs O(changes).
+        changed = {}
+        for activity_id in order:
+            previous = self.results.get(activity_id)
+            if previous is not None:
+                self.totals.remove(previous)
+
+            activity_result = new_results.get(activity_id)
+            if activity_result is None:
+                self.activities.pop(activity_id, None)
+                self.results.pop(activity_id, None)
+            else:
+                self.activities[activity_id] = touched[activity_id]
+                self.results[activity_id] = activity_result
+                self.totals.add(activity_result)
+            changed[activity_id] = activity_result
+
+        return changed
+
+
+class SessionManager:
+    """Sessions held in memory, bounded in count and evicted least-recently-used first."""
+
+    def __init__(self, service, max_sessions: int = SESSION_MAX_SESSIONS,
+                 max_activities: int = SESSION_MAX_ACTIVITIES, ttl: float = SESSION_TTL):
+        self.service = service
+        self.max_sessions = max_sessions
+        self.max_activities = max_activities
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - session.last_used < self.ttl:
+                break
+            del self._sessions[session_id]
+            logger.info("Evicted calculation session %s", session_id)
+
+    def create(self, activities: Optional[List[Dict]] = None, deadline: Optional[Deadline] = None) -> Dict:
+        session = CalculationSession(uuid.uuid4().hex, self.max_activities)
+        changes = [{"op": ADD, "id": activity.get("id") if isinstance(activity, dict) else None,
+                    "activity": activity}
+                   for activity in activities or []]
+        with session.lock:
+            changed = session.apply(changes, functools.partial(self.service.evaluate, deadline=deadline))
+
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._evict(time.monotonic())
+
+        return self.snapshot(session, changed)
+
+    def _get(self, session_id: str) -> Optional[CalculationSession]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = now
+                self._sessions.move_to_end(session_id)
+        return session
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        session = self._get(session_id)
+        if session is None:
+            return None
+
+        with session.lock:
+            return self.snapshot(session, session.results)
+
+    def apply(self, session_id: str, changes: List[Dict], deadline: Optional[Deadline] = None) -> Optional[Dict]:
+        session = self._get(session_id)
+        if session is None:
+            return None
+
+        # Results are evaluated before any state changes, so a missed deadline leaves the session as it was.
+        with session.lock:
+            changed = session.apply(changes, functools.partial(self.service.evaluate, deadline=deadline))
+            return self.snapshot(session, changed)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def snapshot(self, session: CalculationSession, results: Dict[str, Optional[Dict]]) -> Dict:
+        return {
+            "session_id": session.session_id,
+            "activity_count": len(session.results),
+            "summary": self.service.calculator.summarize_totals(session.totals),
+            "results": dict(results)
+        }
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import './App.css';
 
 const App = () => {
@@ -10,6 +10,10 @@ const App = () => {
   const [results, setResults] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const [sessionId, setSessionId] = useState(null);
+  const [pendingChanges, setPendingChanges] = useState([]);
+  const [resultsById, setResultsById] = useState({});
+  const nextActivityId = useRef(1);
 
   const activityOptions = [
     { id: 'electricity', label: 'Electricity Usage', units: ['kWh', 'MWh', 'GWh'] },
@@ -31,6 +35,7 @@ const App = () => {
     const paramType = isEnergy ? 'energy' : 'distance';
 
     const newActivity = {
+      id: String(nextActivityId.current++),
       name: selectedOption.label,
       activity_type: selectedActivity,
       parameters: {
@@ -41,6 +46,7 @@ const App = () => {
     };
 
     setActivities([...activities, newActivity]);
+    setPendingChanges(current => [...current, { op: 'add', id: newActivity.id, activity: newActivity }]);
     setSelectedActivity('');
     setAmount('');
     setUnit(activityOptions[0].units[0]);
@@ -48,25 +54,24 @@ const App = () => {
 
   const removeActivity = (index) => {
     const updatedActivities = [...activities];
-    updatedActivities.splice(index, 1);
+    const [removed] = updatedActivities.splice(index, 1);
     setActivities(updatedActivities);
+    setPendingChanges(current => [...current, { op: 'remove', id: removed.id }]);
   };
 
   const calculateEmissions = async () => {
     setLoading(true);
     setError(null);
 
-    try {
-      console.log("Sending activities to backend:", JSON.stringify(activities));
-
-      const response = await fetch('http://localhost:5000/calculate', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ activities })
-      });
+    const send = (path, method, body) => fetch(`http://localhost:5000${path}`, {
+      method,
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(body)
+    });
 
+    const readResults = async (response) => {
       const responseText = await response.text();
       console.log("Raw response:", responseText);
 
@@ -83,6 +88,57 @@ const App = () => {
 
       const data = JSON.parse(responseText);
       console.log("Parsed results:", data);
+      return data;
+    };
+
+    // Changes queued while a request is in flight stay pending for the next calculation.
+    const sentChanges = pendingChanges;
+    const sentActivities = activities;
+
+    try {
+      // Only the changes since the last calculation are sent; the server keeps the
+      // session's results and totals and recomputes just the changed activities.
+      let data = null;
+      try {
+        if (sessionId) {
+          console.log("Sending changes to backend:", JSON.stringify(sentChanges));
+          data = await readResults(await send(`/sessions/${sessionId}`, 'PATCH', { changes: sentChanges }));
+        } else {
+          console.log("Sending activities to backend:", JSON.stringify(sentActivities));
+          data = await readResults(await send('/sessions', 'POST', { activities: sentActivities }));
+        }
+      } catch (sessionError) {
+        // Any failed session request falls back to a full calculation, so the totals
+        // shown never drift from the activities on screen.
+        console.warn('Session update failed, recalculating all activities:', sessionError);
+      }
+
+      let merged = {};
+      if (data) {
+        if (sessionId) {
+          merged = { ...resultsById };
+        }
+        Object.entries(data.results).forEach(([id, result]) => {
+          if (result === null) {
+            delete merged[id];
+          } else {
+            merged[id] = result;
+          }
+        });
+        setSessionId(data.session_id);
+        data = { ...data.summary, activities: sentActivities.map(activity => merged[activity.id]).filter(Boolean) };
+      } else {
+        console.log("Sending activities to backend:", JSON.stringify(sentActivities));
+        data = await readResults(await send('/calculate', 'POST', { activities: sentActivities }));
+        sentActivities.forEach((activity, index) => {
+          merged[activity.id] = data.activities[index];
+        });
+        // The next calculation starts a fresh session from the full list.
+        setSessionId(null);
+      }
+
+      setPendingChanges(current => current.slice(sentChanges.length));
+      setResultsById(merged);
       setResults(data);
     } catch (error) {
       console.error('Error:', error);
@@ -176,7 +232,7 @@ const App = () => {
               const valueKey = Object.keys(activity.parameters)[1];
               
               return (
-                <div key={index} className="activity-item">
+                <div key={activity.id} className="activity-item">
                   <span>{activityType?.label || activity.activity_type}</span>
                   <span>{activity.parameters[paramKey]} {activity.parameters[valueKey]}</span>
                   <span>{activity.region}</span>
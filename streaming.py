@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import sys
+from typing import IO, Dict, Iterable, Iterator, List, Optional
+
+from check_api import CarbonEmissionCalculator, EmissionTotals, logger
+from logging_config import configure_logging
+from rollups import RollupCube, parse_group_by, rollup_capacity
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def iter_ndjson(lines: Iterable[str]) -> Iterator[Dict]:
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            activity = json.loads(line)
+        except ValueError as e:
+            activity = {"__error__": f"Invalid JSON on line {line_number}: {str(e)}"}
+
+        if not isinstance(activity, dict):
+            activity = {"__error__": f"Expected a JSON object on line {line_number}"}
+
+        yield activity
+
+
+class NDJSONStreamProcessor:
+
+    def __init__(self, calculator: CarbonEmissionCalculator, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 batch: bool = False, rollup: Optional[tuple] = None):
+        self.calculator = calculator
+        self.chunk_size = chunk_size
+        self.totals = EmissionTotals()
+        self.rollup = rollup
+        self.cube = RollupCube(rollup_capacity(calculator.factor_table)) if rollup is not None else None
+        self._evaluate = calculator.evaluate_activities
+
+        if batch:
+            from batch_engine import BatchEmissionEngine
+            self._evaluate = BatchEmissionEngine(calculator).evaluate
+
+    def _process_chunk(self, chunk: List[Dict], start_index: int) -> List[Dict]:
+        invalid = {position: activity["__error__"] for position, activity in enumerate(chunk)
+                   if "__error__" in activity}
+        if invalid:
+            chunk = [{} if position in invalid else activity for position, activity in enumerate(chunk)]
+
+        results = self._evaluate(chunk, start_index)
+
+        for position, error in invalid.items():
+            results[position] = {"error": error, "name": f"Activity {start_index + position + 1}"}
+
+        return results
+
+    def process(self, lines: Iterable[str], out: IO[str]) -> Dict:
+        chunk = []
+        start_index = 0
+
+        for activity in iter_ndjson(lines):
+            chunk.append(activity)
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk, start_index, out)
+                start_index += len(chunk)
+                chunk = []
+
+        if chunk:
+            self._flush(chunk, start_index, out)
+
+        summary = self.calculator.summarize_totals(self.totals)
+        summary["activity_count"] = self.totals.count
+        if self.cube is not None:
+            summary["rollup"] = self.cube.query(self.rollup)
+        out.write(json.dumps({"summary": summary}) + "\n")
+        out.flush()
+
+        logger.info("Streamed %d activities (%d errors)", self.totals.count, self.totals.errors)
+        return summary
+
+    def _flush(self, chunk: List[Dict], start_index: int, out: IO[str]) -> None:
+        results = self._process_chunk(chunk, start_index)
+        self.totals.add_all(results)
+        if self.cube is not None:
+            self.cube.add_all(chunk, results)
+        out.write("".join(json.dumps(activity_result) + "\n" for activity_result in results))
+        out.flush()
+
+
+def stream_carbon_footprint(lines: Iterable[str], out: IO[str], api_key: Optional[str] = None,
+                            use_api: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            batch: bool = False, rollup: Optional[tuple] = None) -> Dict:
+    calculator = CarbonEmissionCalculator(api_key, use_api=use_api)
+    return NDJSONStreamProcessor(calculator, chunk_size=chunk_size, batch=batch,
+                                 rollup=rollup).process(lines, out)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Stream NDJSON activities from stdin and write NDJSON results")
+    parser.add_argument("--ndjson", action="store_true", help="read one activity per line (required)")
+    parser.add_argument("--api-key", default=os.getenv("CLIMATIQ_API_KEY"))
+    parser.add_argument("--use-api", action="store_true")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--batch", action="store_true", help="use the vectorized batch engine (requires numpy)")
+    parser.add_argument("--rollup", type=parse_group_by, metavar="DIMENSIONS",
+                        help="add totals grouped by these comma-separated dimensions (month, region, "
+                             "activity_type) to the summary")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if not args.api_key:
+        print(json.dumps({"error": "API key required"}))
+        return 1
+
+    stream_carbon_footprint(sys.stdin, sys.stdout, api_key=args.api_key, use_api=args.use_api,
+                            chunk_size=args.chunk_size, batch=args.batch, rollup=args.rollup)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
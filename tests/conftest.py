@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Importing app configures logging; keep the test run from writing carbon_calc.log.
+os.environ["LOG_FILE"] = ""
+
+from benchmarks.climatiq_stub import start_stub_server  # noqa: E402
+from benchmarks.common import generate_mixed_activities  # noqa: E402
+from check_api import CarbonEmissionCalculator  # noqa: E402
+
+API_KEY = "test-key"
+# The stub answers at once, so Climatiq's real rate limit would only slow the tests down.
+UNLIMITED_RATE = 1e6
+
+
+@pytest.fixture
+def calculator():
+    return CarbonEmissionCalculator(API_KEY, memo=None)
+
+
+@pytest.fixture
+def activities():
+    return generate_mixed_activities(2000)
+
+
+@pytest.fixture
+def stub():
+    """A local Climatiq stub; tests read ``stub.state.requests`` and set ``stub.state.faults``."""
+    server, url = start_stub_server()
+    server.url = url
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def app_module(monkeypatch):
+    import app
+
+    monkeypatch.setattr(app.calculator_service, "api_key", API_KEY)
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
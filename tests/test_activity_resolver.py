@@ -0,0 +1,78 @@
+import random
+import string
+
+import pytest
+
+from activity_resolver import DEFAULT_ACTIVITY_INFO, ActivityResolver
+from emission_core import ACTIVITY_MAPPINGS
+
+
+def linear_resolve(mappings, activity_type):
+    # The scan the resolver replaced: exact match, then the first key in mapping order
+    # that is contained in the type or contains it.
+    if not activity_type:
+        return DEFAULT_ACTIVITY_INFO
+    normalized_type = activity_type.lower().strip()
+    if normalized_type in mappings:
+        return mappings[normalized_type]
+    for key, info in mappings.items():
+        if key in normalized_type or normalized_type in key:
+            return info
+    return {"id": normalized_type, "unit_type": "energy", "default_unit": "kWh", "algorithm_factor": 1.0}
+
+
+def random_catalog(rng, size):
+    mappings = {}
+    while len(mappings) < size:
+        key = "".join(rng.choice("abc ") for _ in range(rng.randint(1, 6))).strip()
+        if key:
+            mappings.setdefault(key, {"id": f"factor-{len(mappings)}", "unit_type": "energy"})
+    return mappings
+
+
+QUERIES = ["Car", " ELECTRIC CAR ", "Electric Car", "car rental", "train", "rail", "flight", "short flight",
+           "natural gas boiler", "gas", "bus", "unknown widget", "", "  ", "e"]
+
+
+@pytest.mark.parametrize("activity_type", QUERIES)
+def test_matches_the_linear_scan_on_the_shipped_mappings(activity_type):
+    resolver = ActivityResolver(ACTIVITY_MAPPINGS)
+    assert resolver.resolve(activity_type) == linear_resolve(ACTIVITY_MAPPINGS, activity_type)
+
+
+def test_matches_the_linear_scan_on_random_catalogs():
+    rng = random.Random(7)
+    for size in (1, 5, 40):
+        mappings = random_catalog(rng, size)
+        resolver = ActivityResolver(mappings)
+        for _ in range(300):
+            query = "".join(rng.choice("abc " + string.ascii_uppercase[:3]) for _ in range(rng.randint(0, 8)))
+            assert resolver.resolve(query) == linear_resolve(mappings, query), (mappings, query)
+
+
+def test_earlier_keys_win_partial_matches():
+    mappings = {"car": {"id": "car"}, "electric car": {"id": "electric"}, "electric": {"id": "grid"}}
+    resolver = ActivityResolver(mappings)
+
+    assert resolver.resolve("Electric Car")["id"] == "electric"
+    assert resolver.resolve("electric car hire")["id"] == "car"
+    assert resolver.resolve("elec")["id"] == "electric"
+
+
+def test_partial_matches_are_logged_once():
+    logged = []
+    resolver = ActivityResolver({"car": {"id": "car"}}, log=lambda *args: logged.append(args))
+
+    resolver.resolve("Rental Car")
+    resolver.resolve("Rental Car")
+
+    assert logged == [("Partial match: %s -> %s", "rental car", "car")]
+
+
+def test_type_for_id_returns_the_first_mapping_of_an_id():
+    mappings = {"car": {"id": "vehicle"}, "van": {"id": "vehicle"}, "bus": {"id": "bus"}}
+    resolver = ActivityResolver(mappings)
+
+    assert resolver.type_for_id("vehicle") == ("car", mappings["car"])
+    assert resolver.type_for_id("bus") == ("bus", mappings["bus"])
+    assert resolver.type_for_id("missing") is None
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+import time
+
+from async_climatiq import AsyncCarbonEmissionCalculator, AsyncClimatiqAPI
+from benchmarks import climatiq_stub
+from check_api import CarbonEmissionCalculator, ClimatiqAPI, EmissionTotals
+from conftest import API_KEY, UNLIMITED_RATE
+from resilience import AdaptiveRateLimiter
+
+EDGE_CASES = [
+    {"activity_type": "car", "parameters": {"distance": "far"}},
+    {"activity_type": "car", "parameters": {"distance": 5, "distance_unit": "parsec"}},
+    {"activity_type": "car", "parameters": {"weight": 3}},
+    {"activity_type": "teleport", "parameters": {"energy": 3}},
+    {"activity_type": "   ", "parameters": {"energy": 3}},
+    {"activity_type": "car"},
+    {"parameters": {"distance": 3}},
+]
+
+
+def run_async(stub, activities, max_concurrency=8):
+    calculator = AsyncCarbonEmissionCalculator(API_KEY, async_api=AsyncClimatiqAPI(
+        API_KEY, base_url=stub.url, data_version="v1", max_concurrency=max_concurrency,
+        rate_limiter=AdaptiveRateLimiter(rate=UNLIMITED_RATE)))
+
+    # Every estimate must go through the async client, never a blocking sync request.
+    def blocking_request(*args, **kwargs):
+        raise AssertionError("sync request made from the event loop")
+    calculator.api.make_request = blocking_request
+
+    async def run():
+        try:
+            return await calculator.process_activities_async(activities)
+        finally:
+            await calculator.close()
+
+    return asyncio.run(run())
+
+
+def test_async_matches_sync_rows(stub, activities):
+    activities = activities[:300] + EDGE_CASES
+    sync = CarbonEmissionCalculator(API_KEY, use_api=True, memo=None,
+                                    api=ClimatiqAPI(API_KEY, base_url=stub.url, data_version="v1",
+                                                    rate_limiter=AdaptiveRateLimiter(rate=UNLIMITED_RATE)))
+    expected = [sync.process_activity(idx, activity) for idx, activity in enumerate(activities)]
+
+    result = run_async(stub, activities)
+
+    assert result["activities"] == expected
+    assert result == sync.summarize_results(expected, EmissionTotals().add_all(expected))
+
+
+def test_concurrency_is_bounded(stub, activities, monkeypatch):
+    lock = threading.Lock()
+    in_flight = [0]
+    peak = [0]
+    estimate = climatiq_stub.estimate
+
+    def slow_estimate(body):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return estimate(body)
+
+    monkeypatch.setattr(climatiq_stub, "estimate", slow_estimate)
+    run_async(stub, activities[:60], max_concurrency=4)
+
+    assert 1 < peak[0] <= 4
@@ -0,0 +1,45 @@
+import random
+
+import numpy as np
+import pytest
+
+from batch_engine import BatchEmissionEngine, round_half_even
+
+EDGE_CASES = [
+    {"name": "No parameters", "activity_type": "car"},
+    {"name": "No type", "parameters": {"distance": 5}},
+    {"name": "Bad unit", "activity_type": "car", "parameters": {"distance": 5, "distance_unit": "parsec"}},
+    {"name": "Bad amount", "activity_type": "car", "parameters": {"distance": "far"}},
+    {"name": "Unknown type", "activity_type": "teleport", "parameters": {"energy": 12}},
+    {"name": "Wrong parameter", "activity_type": "car", "parameters": {"energy": 12}},
+    {"name": "Dated", "activity_type": "electricity", "date": "2024-01-15", "parameters": {"energy": 140}},
+    {"name": "Bad date", "activity_type": "electricity", "date": "January", "parameters": {"energy": 140}},
+    {"name": "Zero", "activity_type": "bus", "region": "EU", "parameters": {"distance": 0}},
+    {"name": "Large", "activity_type": "natural_gas", "region": "CN",
+     "parameters": {"energy": 3, "energy_unit": "GWh"}},
+]
+
+
+def test_batch_matches_scalar(calculator, activities):
+    activities = activities + EDGE_CASES
+
+    assert BatchEmissionEngine(calculator).process(activities) == calculator.process_activities(activities)
+
+
+def test_evaluate_keeps_start_index(calculator, activities):
+    rows = BatchEmissionEngine(calculator).evaluate(activities[:10], start_index=100)
+    assert rows == calculator.evaluate_activities(activities[:10], 100)
+
+
+def test_empty_input(calculator):
+    assert BatchEmissionEngine(calculator).process([]) == calculator.process_activities([])
+
+
+@pytest.mark.parametrize("digits", [0, 2])
+def test_round_half_even_matches_round(digits):
+    rng = random.Random(7)
+    values = [rng.uniform(0, 5000) for _ in range(5000)] + [0.125, 0.375, 2.675, 1.005, 0.5, 1.5, 2.5]
+
+    rounded = round_half_even(np.array(values), digits)
+
+    assert rounded.tolist() == [round(value, digits) for value in values]
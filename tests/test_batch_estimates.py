@@ -0,0 +1,83 @@
+import pytest
+
+from benchmarks import climatiq_stub
+from benchmarks.common import generate_activities
+from check_api import CarbonEmissionCalculator, ClimatiqAPI
+from conftest import API_KEY, UNLIMITED_RATE
+from emission_cache import MemoryCache
+from resilience import AdaptiveRateLimiter
+
+BATCH = "/data/v1/estimate/batch"
+
+
+@pytest.fixture
+def api_calculator(stub):
+    api = ClimatiqAPI(API_KEY, base_url=stub.url, data_version="v1", batch_size=25, cache=MemoryCache(),
+                      rate_limiter=AdaptiveRateLimiter(rate=UNLIMITED_RATE))
+    return CarbonEmissionCalculator(API_KEY, use_api=True, api=api, memo=None)
+
+
+@pytest.fixture
+def estimated(monkeypatch):
+    # Every payload the stub estimates, in arrival order.
+    payloads = []
+    estimate = climatiq_stub.estimate
+
+    def recording(body):
+        payloads.append(body)
+        return estimate(body)
+
+    monkeypatch.setattr(climatiq_stub, "estimate", recording)
+    return payloads
+
+
+def test_batched_rows_match_per_row_requests(api_calculator, activities):
+    activities = activities[:300]
+    expected = [api_calculator.process_activity(idx, activity) for idx, activity in enumerate(activities)]
+    api_calculator.api.cache.clear()
+
+    assert api_calculator.process_activities(activities)["activities"] == expected
+
+
+def test_identical_payloads_are_sent_once(api_calculator, stub, estimated):
+    activity = {"activity_type": "car", "region": "US", "parameters": {"distance": 12}}
+    same_in_miles = {"activity_type": "Car", "region": "US",
+                     "parameters": {"distance": 12 / 1.60934, "distance_unit": "mi"}}
+    activities = [dict(activity, name=f"Trip {idx}") for idx in range(60)] + [same_in_miles]
+
+    results = api_calculator.process_activities(activities)["activities"]
+
+    assert len({result["api_emissions"] for result in results[:60]}) == 1
+    assert stub.state.requests[BATCH] == 1
+    assert len(estimated) <= 2
+
+
+def test_payloads_are_chunked_by_batch_size(api_calculator, stub, estimated):
+    activities = [{"activity_type": "electricity", "parameters": {"energy": idx + 1}} for idx in range(60)]
+
+    api_calculator.process_activities(activities)
+
+    assert stub.state.requests[BATCH] == 3
+    assert len(estimated) == 60
+
+
+def test_cached_estimates_are_not_requested_again(api_calculator, stub):
+    # Only known types, since failed estimates are not cached.
+    activities = generate_activities(100)
+    api_calculator.process_activities(activities)
+    requests = stub.state.requests[BATCH]
+
+    api_calculator.process_activities(activities)
+
+    assert stub.state.requests[BATCH] == requests
+
+
+def test_only_failed_items_are_retried_simplified(api_calculator, estimated):
+    unknown = {"activity_id": "teleport", "activity_type": "car", "parameters": {"distance": 5}}
+    known = {"activity_type": "bus", "parameters": {"distance": 5}}
+
+    results = api_calculator.process_activities([unknown, known])["activities"]
+
+    assert [payload["emission_factor"]["activity_id"] for payload in estimated] == \
+        ["teleport", "passenger_vehicle-bus", "teleport"]
+    assert "note" in results[0] and "note" not in results[1]
@@ -0,0 +1,92 @@
+import json
+import os
+
+import pytest
+
+from benchmarks.common import generate_activities, generate_mixed_activities, percentile, summarize
+from conftest import ROOT
+
+
+@pytest.fixture
+def suite(monkeypatch):
+    # The suite runs as a script from benchmarks/, so it imports its helpers as top-level modules.
+    monkeypatch.syspath_prepend(os.path.join(ROOT, "benchmarks"))
+    monkeypatch.setenv("CLIMATIQ_MEMO_SIZE", "0")
+    monkeypatch.setenv("CLIMATIQ_API_KEY", "benchmark-key")
+    import suite
+
+    monkeypatch.setattr(suite, "TIME_BUDGET", 0)
+    monkeypatch.setattr(suite, "run_isolated", suite.run_case)
+    return suite
+
+
+def test_generators_are_deterministic():
+    assert generate_activities(50) == generate_activities(50)
+    assert generate_mixed_activities(50, seed=3) == generate_mixed_activities(50, seed=3)
+    assert generate_mixed_activities(50, seed=3) != generate_mixed_activities(50, seed=4)
+
+
+def test_mixed_activities_include_invalid_rows():
+    activities = generate_mixed_activities(2000, invalid_rate=0.05)
+    invalid = [activity for activity in activities if "parameters" not in activity]
+
+    assert len(activities) == 2000
+    assert 50 < len(invalid) < 150
+    assert not any("parameters" not in activity for activity in generate_mixed_activities(500, invalid_rate=0))
+
+
+def test_summary_statistics():
+    samples = [0.001 * value for value in range(1, 101)]
+    stats = summarize(samples)
+
+    assert percentile(samples, 50) == pytest.approx(0.051)
+    assert percentile([], 99) == 0.0
+    assert (stats["iterations"], stats["p50_ms"], stats["p99_ms"]) == (100, 51.0, 99.0)
+    assert stats["ops_per_sec"] == pytest.approx(100 / sum(samples), rel=1e-3)
+
+
+def test_compare_flags_only_slowdowns_past_the_threshold(suite):
+    baseline = {"results": [
+        {"case": "a", "size": 10, "p50_ms": 1.0},
+        {"case": "b", "size": 10, "p50_ms": 1.0},
+        {"case": "c", "size": 10, "p50_ms": 0.0},
+    ]}
+    results = [
+        {"case": "a", "size": 10, "p50_ms": 1.1},
+        {"case": "b", "size": 10, "p50_ms": 1.5},
+        {"case": "c", "size": 10, "p50_ms": 1.0},
+        {"case": "a", "size": 1000, "p50_ms": 9.0},
+    ]
+
+    rows, regressions = suite.compare(results, baseline, 0.2)
+
+    assert [(row["case"], row["change"], row["status"]) for row in rows] == [
+        ("a", "+10.0%", "ok"), ("b", "+50.0%", "REGRESSION")
+    ]
+    assert regressions == rows[1:]
+
+
+@pytest.mark.parametrize("case", ["process_activities", "process_activities_batch", "calculate_direct_emissions",
+                                  "calculate_algorithmic_emissions", "format_parameters", "flask_calculate"])
+def test_cases_run(suite, case):
+    result = suite.run_case(case, 10)
+
+    assert (result["case"], result["size"]) == (case, 10)
+    assert result["iterations"] >= suite.MIN_ITERATIONS
+    assert result["peak_rss_mb"] > 0
+
+
+def test_main_fails_against_a_faster_baseline(suite, tmp_path, capsys):
+    output = tmp_path / "results.json"
+    arguments = ["--cases", "format_parameters", "--sizes", "10", "--output", str(output)]
+
+    assert suite.main(arguments) == 0
+    report = json.loads(output.read_text())
+    assert [row["case"] for row in report["results"]] == ["format_parameters"]
+
+    report["results"][0]["p50_ms"] /= 100
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(report))
+
+    assert suite.main(arguments + ["--baseline", str(baseline)]) == 1
+    assert "slowed down by more than 20%" in capsys.readouterr().out
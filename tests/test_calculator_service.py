@@ -0,0 +1,38 @@
+import pytest
+
+from calculator_service import MODE_INPROCESS, MODE_SUBPROCESS, CalculatorService, create_service
+from conftest import API_KEY
+
+
+def test_inprocess_reuses_one_calculator():
+    service = CalculatorService(API_KEY)
+    assert service.calculator is service.calculator
+
+
+def test_subprocess_matches_inprocess(activities):
+    activities = activities[:200]
+    inprocess = CalculatorService(API_KEY, mode=MODE_INPROCESS).calculate(activities)
+    subprocess = CalculatorService(API_KEY, mode=MODE_SUBPROCESS).calculate(activities)
+
+    assert subprocess == inprocess
+
+
+def test_missing_api_key_is_reported():
+    assert CalculatorService(None).calculate([]) == {"error": "API key required"}
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        CalculatorService(API_KEY, mode="threads")
+
+
+def test_create_service_reads_mode(monkeypatch):
+    monkeypatch.setenv("CALCULATION_MODE", "SUBPROCESS")
+    assert create_service(API_KEY).mode == MODE_SUBPROCESS
+
+
+def test_calculate_route(client, activities):
+    response = client.post("/calculate", json={"activities": activities[:50]})
+
+    assert response.status_code == 200
+    assert len(response.json["activities"]) == 50
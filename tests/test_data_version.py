@@ -0,0 +1,35 @@
+from check_api import FALLBACK_DATA_VERSION, CarbonEmissionCalculator, ClimatiqAPI
+from conftest import API_KEY
+
+
+def test_construction_does_no_network_io(stub, activities):
+    api = ClimatiqAPI(API_KEY, base_url=stub.url)
+    calculator = CarbonEmissionCalculator(API_KEY, api=api, memo=None)
+    calculator.process_activities(activities[:20])
+
+    assert stub.state.requests == {}
+
+
+def test_data_version_is_fetched_once(stub):
+    api = ClimatiqAPI(API_KEY, base_url=stub.url)
+
+    assert api.data_version == stub.state.data_version
+    assert api.data_version == stub.state.data_version
+    assert stub.state.requests == {"/data/v1/data-versions": 1}
+
+
+def test_pinned_data_version_is_never_fetched(stub):
+    api = ClimatiqAPI(API_KEY, base_url=stub.url, data_version="2024-01-01")
+
+    assert api.data_version == "2024-01-01"
+    assert stub.state.requests == {}
+
+
+def test_failed_lookup_falls_back_and_is_not_retried_at_once(stub, monkeypatch):
+    api = ClimatiqAPI(API_KEY, base_url=stub.url)
+    calls = []
+    monkeypatch.setattr(api, "_get_data_version", lambda: calls.append(1))
+
+    assert api.data_version == FALLBACK_DATA_VERSION
+    assert api.data_version == FALLBACK_DATA_VERSION
+    assert len(calls) == 1
@@ -0,0 +1,86 @@
+import sqlite3
+import time
+
+import pytest
+
+from emission_cache import TRIM_INTERVAL, CacheBackend, MemoryCache, SQLiteCache, TieredCache
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1, "v1")
+    cache.set("b", 2, "v1")
+    cache.get("a", "v1")
+    cache.set("c", 3, "v1")
+
+    assert cache.get("b", "v1") is None
+    assert cache.get("a", "v1") == 1
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_entries_are_namespaced_by_data_version():
+    cache = MemoryCache()
+    cache.set("a", 1, "v1")
+    assert cache.get("a", "v2") is None
+
+
+def test_version_ttl_overrides_default():
+    cache = MemoryCache(ttl=60, version_ttls={"old": 0})
+    cache.set("a", 1, "old")
+    cache.set("a", 1, "new")
+
+    assert cache.get("a", "old") is None
+    assert cache.get("a", "new") == 1
+    assert cache.get_stats()["expirations"] == 1
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    SQLiteCache(path).set("a", {"co2e": 1.5}, "v1")
+
+    assert SQLiteCache(path).get("a", "v1") == {"co2e": 1.5}
+
+
+def test_sqlite_cache_expires_entries(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), ttl=0)
+    cache.set("a", 1, "v1")
+
+    assert cache.get("a", "v1") is None
+    assert len(cache) == 0
+
+
+def test_sqlite_limit_holds_across_processes_sharing_a_file(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first, second = SQLiteCache(path, max_entries=TRIM_INTERVAL), SQLiteCache(path, max_entries=TRIM_INTERVAL)
+    for index in range(TRIM_INTERVAL * 3):
+        first.set(f"first-{index}", index, "v1")
+        second.set(f"second-{index}", index, "v1")
+
+    rows = sqlite3.connect(path).execute("SELECT COUNT(*) FROM emission_cache").fetchone()[0]
+    assert rows == TRIM_INTERVAL
+
+
+def test_sqlite_eviction_keeps_recently_read_entries(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), max_entries=10)
+    cache.set("hot", 1, "v1")
+    for index in range(TRIM_INTERVAL * 3):
+        time.sleep(0.0001)
+        assert cache.get("hot", "v1") == 1
+        cache.set(f"cold-{index}", index, "v1")
+
+    assert cache.get("hot", "v1") == 1
+    assert cache.get("cold-0", "v1") is None
+
+
+def test_tiered_cache_fills_memory_from_sqlite(tmp_path):
+    path = str(tmp_path / "cache.db")
+    SQLiteCache(path).set("a", 1, "v1")
+    cache = TieredCache(MemoryCache(), SQLiteCache(path))
+
+    assert cache.get("a", "v1") == 1
+    assert cache.memory.get("a", "v1") == 1
@@ -0,0 +1,118 @@
+import json
+
+import pytest
+
+from check_api import CarbonEmissionCalculator, ClimatiqAPI
+from conftest import API_KEY
+from factor_store import FactorStore, conflicting_factors, main, read_snapshot
+
+
+def factor(activity_id, region, value, data_version="v1"):
+    return {"activity_id": activity_id, "region": region, "factor": value, "data_version": data_version}
+
+
+FACTORS = [
+    factor("passenger_vehicle-car", "GB", 0.17),
+    factor("passenger_vehicle-car", "US", 0.25),
+    factor("car-generic", "EU", 0.2),
+    factor("car-generic", "US", 0.3),
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FactorStore(str(tmp_path / "factors.db"))
+    store.load_factors("v1", FACTORS)
+    return store
+
+
+def test_primary_id_prefers_the_region(store):
+    assert store.find(["passenger_vehicle-car", "car-generic"], "US")["factor"] == 0.25
+    assert store.find(["passenger_vehicle-car", "car-generic"], "FR")["factor"] == 0.17
+    assert store.find(["passenger_vehicle-car"], None)["factor"] == 0.17
+
+
+def test_fallbacks_take_their_first_factor(store):
+    assert store.find(["missing", "car-generic"], "US")["factor"] == 0.2
+    assert store.find(["missing", "also-missing"], "US") is None
+
+
+def test_search_lists_the_region_first(store):
+    assert [f["region"] for f in store.search("car-generic", "US")] == ["US", "EU"]
+    assert [f["region"] for f in store.search("car-generic")] == ["EU", "US"]
+
+
+def test_first_conflicting_duplicate_is_kept(store, caplog):
+    duplicates = FACTORS + [factor("car-generic", "EU", 0.9), factor("car-generic", "US", 0.3)]
+
+    assert conflicting_factors(duplicates) == [
+        {"activity_id": "car-generic", "region": "EU", "kept": 0.2, "dropped": 0.9}
+    ]
+    store.load_factors("v2", duplicates)
+    assert store.lookup("car-generic", "EU")["factor"] == 0.2
+    assert len(store.factors("v2")) == len(FACTORS)
+    assert "1 conflicting duplicate factors" in caplog.text
+
+
+def test_reloading_a_version_replaces_it(store):
+    store.load_factors("v1", FACTORS[:1])
+    assert store.factors("v1") == FACTORS[:1]
+    assert store.find(["car-generic"], "US") is None
+
+
+def test_latest_version_is_active_after_reopening(store):
+    store.load_factors("v2", [factor("car-generic", "US", 0.4, "v2")])
+    store.load_factors("v3", [factor("car-generic", "US", 0.5, "v3")], activate=False)
+    assert store.data_version == "v2"
+
+    reopened = FactorStore(store.path)
+    assert [version["data_version"] for version in reopened.versions()] == ["v1", "v2", "v3"]
+    assert reopened.data_version == "v3"
+    assert reopened.lookup("car-generic", "US")["factor"] == 0.5
+
+
+def test_diff_reports_added_removed_and_changed(store):
+    store.load_factors("v2", [
+        factor("passenger_vehicle-car", "GB", 0.17, "v2"),
+        factor("passenger_vehicle-car", "US", 0.26, "v2"),
+        factor("car-generic", "EU", 0.2, "v2"),
+        factor("car-generic", "CN", 0.5, "v2"),
+    ])
+
+    assert store.diff("v1", "v2") == {
+        "old_version": "v1",
+        "new_version": "v2",
+        "added": [{"activity_id": "car-generic", "region": "CN"}],
+        "removed": [{"activity_id": "car-generic", "region": "US"}],
+        "changed": [{"activity_id": "passenger_vehicle-car", "region": "US", "old": 0.25, "new": 0.26}],
+    }
+
+
+def test_snapshots_name_their_data_version(tmp_path):
+    listed = tmp_path / "listed.json"
+    listed.write_text(json.dumps(FACTORS))
+    unnamed = tmp_path / "unnamed.json"
+    unnamed.write_text(json.dumps({"results": [{"activity_id": "car-generic", "region": "US"}]}))
+
+    assert read_snapshot(str(listed)) == ("v1", FACTORS)
+    with pytest.raises(ValueError, match="does not name a data_version"):
+        read_snapshot(str(unnamed))
+
+
+def test_load_command_reports_the_diff(store, tmp_path, capsys):
+    snapshot = tmp_path / "snapshot.json"
+    snapshot.write_text(json.dumps({"data_version": "v2", "results": FACTORS[:3]}))
+
+    assert main(["--store", store.path, "load", str(snapshot)]) == 0
+    report = json.loads(capsys.readouterr().out)
+
+    assert (report["data_version"], report["factors"], report["conflicts"]) == ("v2", 3, [])
+    assert report["diff"]["removed"] == [{"activity_id": "car-generic", "region": "US"}]
+
+
+def test_calculator_uses_the_store_without_the_network(store):
+    api = ClimatiqAPI(API_KEY, base_url="http://127.0.0.1:9", data_version="v1", factor_store=store)
+    calculator = CarbonEmissionCalculator(API_KEY, api=api, memo=None)
+
+    assert calculator.find_emission_factor("car", "US")["factor"] == 0.25
+    assert calculator.find_emission_factor("car", "FR")["factor"] == 0.17
@@ -0,0 +1,80 @@
+import math
+
+import pytest
+
+from emission_core import (ACTIVITY_TYPE_ADJUSTMENTS, ALGORITHM_REGIONAL_FACTORS, ALGORITHM_SEASONAL_FACTORS,
+                           DIRECT_EMISSION_FACTORS, FACTOR_TABLE, EmissionCore)
+
+TYPES = ["bus", "car", "rail", "electricity", "natural_gas", "Car", "ELECTRICITY", "heating", "teleport"]
+REGIONS = ["US", "EU", "UK", "CA", "CN", "AU", "IN", "GLOBAL", "BR", "Atlantis"]
+AMOUNTS = [0.0, 0.37, 12.5, 140.0, 999.99, 48213.7]
+
+
+def reference_direct(activity_type, parameters, region):
+    # The per-call dict lookups the factor table replaced.
+    factors = DIRECT_EMISSION_FACTORS.get(activity_type.lower(), {})
+    factor = factors.get(region, factors.get("GLOBAL", 0.1))
+
+    if activity_type.lower() in ["bus", "car", "rail"] and "distance" in parameters:
+        distance = float(parameters["distance"])
+        if parameters.get("distance_unit", "km").lower() in ["mi", "mile", "miles"]:
+            distance *= 1.60934
+        return distance * factor
+
+    if activity_type.lower() in ["electricity", "natural_gas"] and "energy" in parameters:
+        energy = float(parameters["energy"])
+        unit = parameters.get("energy_unit", "kWh").lower()
+        if unit == "mwh":
+            energy *= 1000
+        elif unit == "gwh":
+            energy *= 1000000
+        return energy * factor
+
+    return 10.0
+
+
+def reference_algorithmic(raw, region, activity_type, algorithm_factor, month):
+    if raw <= 0:
+        return 0.0
+
+    region_factor = ALGORITHM_REGIONAL_FACTORS.get(region, ALGORITHM_REGIONAL_FACTORS.get("GLOBAL", 1.0))
+    seasonal_factor = ALGORITHM_SEASONAL_FACTORS.get(month, 1.0)
+    adjustment = ACTIVITY_TYPE_ADJUSTMENTS.get(activity_type.lower(), 1.0)
+
+    adjusted = raw * algorithm_factor * region_factor * seasonal_factor * adjustment
+    final = adjusted * 0.95 + (5 * math.log(adjusted / 100)) if adjusted > 100 else adjusted
+    alignment = 0.93 if activity_type.lower() == "electricity" else 0.98
+    return round(final * alignment, 2)
+
+
+@pytest.mark.parametrize("activity_type", TYPES)
+def test_direct_emissions_match_reference(activity_type):
+    core = EmissionCore()
+    for region in REGIONS:
+        for amount in AMOUNTS:
+            for parameters in ({"distance": amount}, {"distance": amount, "distance_unit": "miles"},
+                               {"energy": amount}, {"energy": amount, "energy_unit": "MWh"}):
+                expected = reference_direct(activity_type, parameters, region)
+                assert core.calculate_direct_emissions(activity_type, parameters, region) == expected
+
+
+@pytest.mark.parametrize("month", range(1, 13))
+def test_algorithmic_emissions_match_reference(month):
+    core = EmissionCore(current_month=month)
+    for activity_type in TYPES:
+        for region in REGIONS:
+            for raw in AMOUNTS:
+                expected = reference_algorithmic(raw, region, activity_type, 1.2, month)
+                assert core.calculate_algorithmic_emissions(raw, region, activity_type, 1.2) == expected
+
+
+def test_type_codes_are_case_insensitive():
+    assert FACTOR_TABLE.type_code("Car") == FACTOR_TABLE.type_code("car")
+    assert FACTOR_TABLE.type_code("teleport") == FACTOR_TABLE.unknown_type_code
+
+
+def test_unknown_region_uses_global_factors():
+    unknown = FACTOR_TABLE.lookup("car", "Atlantis", 1)
+    known = FACTOR_TABLE.lookup("car", "GLOBAL", 1)
+    assert unknown.direct_factor == known.direct_factor
+    assert unknown.region_factor == ALGORITHM_REGIONAL_FACTORS["GLOBAL"]
@@ -0,0 +1,40 @@
+from check_api import ClimatiqAPI, create_session
+from conftest import API_KEY
+
+
+def test_session_is_created_once_with_pool_options():
+    api = ClimatiqAPI(API_KEY, pool_connections=2, pool_maxsize=7)
+    session = api.session
+    adapter = session.get_adapter("https://api.climatiq.io")
+
+    assert api.session is session
+    assert session.headers["Authorization"] == f"Bearer {API_KEY}"
+    assert (adapter._pool_connections, adapter._pool_maxsize) == (2, 7)
+
+
+def test_requests_reuse_the_callers_session(stub):
+    session = create_session({"Authorization": f"Bearer {API_KEY}"})
+    sent = []
+    session.hooks["response"].append(lambda response, *args, **kwargs: sent.append(response.url))
+    api = ClimatiqAPI(API_KEY, base_url=stub.url, session=session, data_version="v1")
+
+    for _ in range(3):
+        result = api.make_request("data/v1/estimate", method="POST", data={
+            "emission_factor": {"activity_id": "passenger_vehicle-car"},
+            "parameters": {"distance": 10, "distance_unit": "km"}
+        })
+        assert "co2e" in result
+
+    assert len(sent) == 3
+    api.close()
+
+
+def test_close_releases_the_pool(stub):
+    api = ClimatiqAPI(API_KEY, base_url=stub.url)
+    assert api.data_version == stub.state.data_version
+    pools = api.session.get_adapter(stub.url).poolmanager.pools
+    assert len(pools) == 1
+
+    api.close()
+
+    assert len(pools) == 0
@@ -0,0 +1,49 @@
+import json
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from conftest import ROOT
+
+HEAVY_MODULES = ["requests", "urllib3", "dotenv", "numpy", "flask"]
+
+
+def loaded_after(code, cwd):
+    # A fresh interpreter, so nothing this test process already imported counts.
+    probe = textwrap.dedent(code) + textwrap.dedent(f"""
+        import os, sys
+        print(json.dumps({{"modules": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+                           "dotenv_value": os.environ.get("IMPORT_PROBE")}}))
+    """)
+    result = subprocess.run([sys.executable, "-c", "import json\n" + probe], cwd=cwd, capture_output=True,
+                            text=True, timeout=60, check=True, env={"PYTHONPATH": ROOT})
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+@pytest.fixture
+def workdir(tmp_path):
+    (tmp_path / ".env").write_text("IMPORT_PROBE=loaded\n")
+    return tmp_path
+
+
+@pytest.mark.parametrize("module", ["emission_core", "check_api", "calculator_service"])
+def test_import_has_no_heavy_dependencies_or_side_effects(module, workdir):
+    loaded = loaded_after(f"import {module}", workdir)
+
+    assert loaded == {"modules": [], "dotenv_value": None}
+    assert sorted(path.name for path in workdir.iterdir()) == [".env"]
+
+
+def test_local_calculation_does_not_load_the_http_client(workdir):
+    loaded = loaded_after("""
+        from check_api import calculate_carbon_footprint
+        calculate_carbon_footprint([{"activity_type": "car", "parameters": {"distance": 1}}], "key")
+    """, workdir)
+
+    assert loaded["modules"] == []
+
+
+def test_entry_points_still_load_dotenv(workdir):
+    assert loaded_after("import run_calculation", workdir)["modules"] == ["dotenv"]
@@ -0,0 +1,143 @@
+import sqlite3
+import subprocess
+import threading
+import time
+
+import pytest
+
+from calculator_service import CalculatorService
+from conftest import API_KEY
+from jobs import (COMPLETED, FAILED, INTERRUPTED_ERROR, RUNNING, JobManager, JobQueueFull, JobStore, MemoryJobStore,
+                  SQLiteJobStore, process_owner)
+
+STORES = ["memory", "sqlite"]
+
+
+@pytest.fixture(params=STORES)
+def make_store(request, tmp_path):
+    def make(**options):
+        if request.param == "memory":
+            return MemoryJobStore(**options)
+        return SQLiteJobStore(str(tmp_path / "jobs.db"), **options)
+
+    return make
+
+
+def finish(manager, job):
+    manager.shutdown()
+    return manager.get(job["job_id"])
+
+
+def test_store_is_abstract():
+    with pytest.raises(TypeError):
+        JobStore()
+
+
+def test_job_results_match_a_direct_calculation(make_store, activities):
+    service = CalculatorService(API_KEY)
+    manager = JobManager(service, make_store(), chunk_size=150)
+    job = finish(manager, manager.submit(activities))
+
+    expected = service.calculator.process_activities(activities)
+    results = []
+    while len(results) < len(activities):
+        results.extend(manager.results(job["job_id"], len(results), 400))
+
+    assert job["status"] == COMPLETED
+    assert (job["done"], job["errors"]) == (len(activities), expected["errors"])
+    assert results == expected.pop("activities")
+    assert job["summary"] == expected
+
+
+def test_finished_jobs_beyond_max_stored_are_evicted(make_store):
+    store = make_store(max_stored=2)
+    for index in range(4):
+        store.create(f"job-{index}", 1)
+        store.append_results(f"job-{index}", 0, [{"index": index}])
+        store.update(f"job-{index}", status=COMPLETED)
+        time.sleep(0.01)
+    store.create("running", 1)
+
+    assert [store.get(f"job-{index}") is not None for index in range(4)] == [False, False, True, True]
+    assert store.results("job-0") == []
+    assert store.results("job-3") == [{"index": 3}]
+    assert store.get("running") is not None
+
+
+def test_finished_jobs_expire_after_ttl(make_store):
+    store = make_store(ttl=0.05)
+    store.create("done", 1)
+    store.update("done", status=FAILED, error="boom")
+    store.create("running", 1)
+    time.sleep(0.06)
+
+    assert store.get("done") is None
+    assert store.get("running") is not None
+
+
+def test_only_jobs_of_exited_processes_are_marked_interrupted(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = SQLiteJobStore(path)
+    store.create("mine", 1)
+    store.update("mine", status=RUNNING)
+
+    exited = subprocess.Popen(["true"])
+    exited.wait()
+    host = process_owner().rsplit(":", 1)[0]
+    connection = sqlite3.connect(path)
+    for job_id, owner in (("exited", f"{host}:{exited.pid}"), ("other-host", "elsewhere:1"), ("legacy", None)):
+        connection.execute("INSERT INTO jobs VALUES (?, 'running', 1, 0, 0, NULL, NULL, 0, 0, ?)", (job_id, owner))
+    connection.commit()
+
+    restarted = SQLiteJobStore(path)
+    statuses = {job_id: restarted.get(job_id)["status"] for job_id in ("mine", "exited", "other-host", "legacy")}
+
+    assert statuses == {"mine": RUNNING, "exited": FAILED, "other-host": RUNNING, "legacy": FAILED}
+    assert restarted.get("exited")["error"] == INTERRUPTED_ERROR
+
+
+class BlockedService:
+    """Holds every job in its first chunk until released."""
+
+    def __init__(self):
+        self.calculator = CalculatorService(API_KEY).calculator
+        self.release = threading.Event()
+
+    def evaluate(self, activities, start_index=0):
+        self.release.wait(5)
+        return self.calculator.evaluate_activities(activities, start_index)
+
+
+def test_submissions_beyond_max_pending_are_refused():
+    service = BlockedService()
+    manager = JobManager(service, MemoryJobStore(), workers=1, max_pending=2)
+    jobs = [manager.submit([{"activity_type": "car", "parameters": {"distance": 1}}]) for _ in range(2)]
+
+    with pytest.raises(JobQueueFull) as refused:
+        manager.submit([])
+    assert refused.value.retry_after >= 1
+
+    service.release.set()
+    assert [finish(manager, job)["status"] for job in jobs] == [COMPLETED, COMPLETED]
+    assert manager.pending == 0
+
+
+def test_submit_route_returns_429_when_full(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module.job_manager, "max_pending", 0)
+    response = client.post("/jobs", json={"activities": []})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_stream_ends_with_an_error_when_the_job_is_evicted(client, app_module, monkeypatch):
+    store = MemoryJobStore()
+    monkeypatch.setattr(app_module.job_manager, "store", store)
+    monkeypatch.setattr(app_module, "JOB_STREAM_POLL_INTERVAL", 0.01)
+    store.create("evicted", 3)
+    store.update("evicted", status=RUNNING)
+    threading.Timer(0.1, lambda: store._jobs.pop("evicted")).start()
+
+    lines = client.get("/jobs/evicted/stream").data.decode().splitlines()
+
+    assert lines == ['{"summary": null, "status": null, "error": "%s"}' % app_module.JOB_EVICTED_ERROR]
@@ -0,0 +1,84 @@
+import logging
+import logging.handlers
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from conftest import ROOT
+from logging_config import DeferredQueueHandler, build_handlers, parse_level
+
+
+def run_python(code, tmp_path, **env):
+    # Logging is configured once per process, so each scenario gets a fresh interpreter.
+    return subprocess.run([sys.executable, "-c", textwrap.dedent(code)], cwd=tmp_path, capture_output=True,
+                          text=True, timeout=60, env=dict(PYTHONPATH=ROOT, **env))
+
+
+@pytest.mark.parametrize("level, expected", [("debug", logging.DEBUG), (" Warning ", logging.WARNING),
+                                             (logging.ERROR, logging.ERROR), ("verbose", None), ("", None)])
+def test_parse_level(level, expected):
+    assert parse_level(level) == expected
+
+
+def test_handlers_write_one_rotating_file(tmp_path):
+    handlers = build_handlers(str(tmp_path / "calc.log"), 1024, 2, stream=False)
+
+    assert [type(handler) for handler in handlers] == [logging.handlers.RotatingFileHandler]
+    assert (handlers[0].maxBytes, handlers[0].backupCount) == (1024, 2)
+    assert not (tmp_path / "calc.log").exists()
+    assert build_handlers("", 1024, 2, stream=False) == []
+
+
+def test_records_are_queued_unformatted():
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "%d rows", (5,), None)
+
+    assert DeferredQueueHandler(None).prepare(record).args == (5,)
+
+
+def test_importing_the_calculator_configures_nothing(tmp_path):
+    result = run_python("""
+        import logging, check_api
+        check_api.calculate_carbon_footprint([{"activity_type": "car", "parameters": {"distance": 1}}], "key")
+        print(logging.getLogger().handlers)
+    """, tmp_path)
+
+    assert result.stdout.strip() == "[]"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_unknown_level_warns_and_uses_info(tmp_path):
+    run_python("""
+        import logging
+        from logging_config import configure_logging, shutdown_logging
+        configure_logging(stream=False)
+        logging.getLogger("calc").debug("hidden")
+        logging.getLogger("calc").info("shown %d", 1)
+        shutdown_logging()
+    """, tmp_path, LOG_LEVEL="chatty", LOG_FILE="calc.log")
+
+    lines = (tmp_path / "calc.log").read_text().splitlines()
+    assert [line.split(" - ", 1)[1] for line in lines] == [
+        "WARNING - Unknown log level 'chatty', using INFO", "INFO - shown 1"
+    ]
+
+
+def test_forked_children_do_not_write_the_file(tmp_path):
+    result = run_python("""
+        import logging, os, time
+        from logging_config import configure_logging, shutdown_logging
+        configure_logging()
+        pid = os.fork()
+        if pid == 0:
+            logging.getLogger("calc").info("from child")
+            time.sleep(0.2)
+            os._exit(0)
+        os.waitpid(pid, 0)
+        logging.getLogger("calc").info("from parent")
+        shutdown_logging()
+    """, tmp_path, LOG_FILE="calc.log")
+
+    assert "from child" in result.stderr and "from parent" in result.stderr
+    assert "from child" not in (tmp_path / "calc.log").read_text()
+    assert "from parent" in (tmp_path / "calc.log").read_text()
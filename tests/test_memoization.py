@@ -0,0 +1,81 @@
+import pytest
+
+from check_api import CarbonEmissionCalculator, ClimatiqAPI
+from conftest import API_KEY, UNLIMITED_RATE
+from emission_cache import MemoryCache
+from memoization import MEMO_SIZE_VARIABLE, create_memo
+from resilience import AdaptiveRateLimiter, CircuitBreaker
+
+CAR_MILES = {"activity_type": "Car", "parameters": {"distance": 1, "distance_unit": "mi"}}
+CAR_KILOMETRES = {"activity_type": "car", "parameters": {"distance": 1.60934, "distance_unit": "km"}}
+
+
+@pytest.fixture
+def memoized():
+    return CarbonEmissionCalculator(API_KEY, memo=create_memo(size=100))
+
+
+def activity_stats(calculator):
+    return calculator.memo.activities.get_stats()
+
+
+def test_memo_is_off_locally_unless_requested(monkeypatch):
+    monkeypatch.delenv(MEMO_SIZE_VARIABLE, raising=False)
+    assert CarbonEmissionCalculator(API_KEY).memo is None
+    assert CarbonEmissionCalculator(API_KEY, use_api=True).memo is not None
+    assert CarbonEmissionCalculator(API_KEY, use_api=True, memo=None).memo is None
+
+    monkeypatch.setenv(MEMO_SIZE_VARIABLE, "10")
+    assert CarbonEmissionCalculator(API_KEY).memo is not None
+
+
+def test_memoized_results_match_fresh_ones(memoized, calculator, activities):
+    expected = calculator.process_activities(activities)
+
+    assert memoized.process_activities(activities) == expected
+    assert memoized.evaluate_activities(activities[::-1]) == calculator.evaluate_activities(activities[::-1])
+    assert activity_stats(memoized)["hits"] > 0
+
+
+def test_equivalent_activities_share_an_entry(memoized, calculator):
+    assert memoized.memo_key(CAR_MILES) == memoized.memo_key(CAR_KILOMETRES)
+
+    memoized.evaluate_activities([CAR_MILES])
+    hit = memoized.evaluate_activities([CAR_KILOMETRES])
+
+    assert activity_stats(memoized)["hits"] == 1
+    assert hit == calculator.evaluate_activities([CAR_KILOMETRES])
+
+
+def test_returned_results_are_copies(memoized):
+    first = memoized.process_activities([CAR_MILES])
+    first["activities"][0]["comparison"]["difference"] = None
+    first["activities"][0]["algorithm_emissions"] = None
+
+    again = memoized.process_activities([CAR_MILES])
+    row = memoized.evaluate_activities([CAR_MILES])[0]
+
+    assert again["activities"][0]["comparison"]["difference"] is not None
+    assert row["algorithm_emissions"] is not None and row["comparison"]["difference"] is not None
+
+
+def test_error_rows_are_not_memoized(memoized):
+    invalid = {"activity_type": "car", "parameters": {"distance": "far"}}
+    results = memoized.evaluate_activities([invalid, {"activity_type": "car", "parameters": {}}])
+
+    assert all("error" in result for result in results)
+    assert activity_stats(memoized)["entries"] == 0
+
+
+def test_api_fallbacks_are_not_memoized(stub):
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.record_failure()
+    api = ClimatiqAPI(API_KEY, base_url=stub.url, data_version="v1", cache=MemoryCache(),
+                      rate_limiter=AdaptiveRateLimiter(rate=UNLIMITED_RATE), circuit_breaker=breaker)
+    calculator = CarbonEmissionCalculator(API_KEY, use_api=True, api=api, memo=create_memo(size=100))
+
+    summary = calculator.process_activities([CAR_MILES])
+
+    assert "note" in summary["activities"][0]
+    assert activity_stats(calculator)["entries"] == 0
+    assert calculator.memo.submissions.get_stats()["entries"] == 0
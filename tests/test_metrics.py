@@ -0,0 +1,95 @@
+import pytest
+
+from metrics import Counter, Gauge, Histogram, Metric, MetricsRegistry
+
+ACTIVITIES = [{"activity_type": "car", "parameters": {"distance": 10}}, {"activity_type": "car"}]
+
+
+def test_metric_is_abstract():
+    with pytest.raises(TypeError):
+        Metric("name", "help")
+
+
+def test_counter_renders_sorted_labelled_samples():
+    counter = Counter("requests_total", "Requests", ["route", "status"])
+    counter.inc(route="/b", status=200)
+    counter.inc(2, route="/a", status=500)
+    counter.inc(route="/b", status=200)
+
+    assert counter.value(route="/b", status=200) == 2
+    assert counter.render() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a",status="500"} 2',
+        'requests_total{route="/b",status="200"} 2',
+    ]
+
+
+def test_label_values_are_escaped():
+    gauge = Gauge("info", "Info", ["text"])
+    gauge.set(1.5, text='a "b"\\c\nd')
+
+    assert gauge.samples() == ['info{text="a \\"b\\"\\\\c\\nd"} 1.5']
+
+
+def test_callbacks_supply_values_at_render_time():
+    values = {("hits",): 3}
+    gauge = Gauge("cache_entries", "Entries", ["kind"], callback=lambda: values)
+    values[("misses",)] = 1
+
+    assert gauge.samples() == ['cache_entries{kind="hits"} 3', 'cache_entries{kind="misses"} 1']
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    assert histogram.samples() == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_histogram_times_a_block_even_when_it_raises():
+    histogram = Histogram("stage_seconds", "Stages", ["stage"])
+    with pytest.raises(RuntimeError):
+        with histogram.time(stage="evaluate"):
+            raise RuntimeError
+
+    assert histogram.samples()[-1] == 'stage_seconds_count{stage="evaluate"} 1'
+
+
+def test_registry_returns_the_existing_metric_for_a_name():
+    registry = MetricsRegistry()
+    first = registry.counter("events_total", "Events")
+    first.inc()
+
+    assert registry.counter("events_total", "Events") is first
+    assert registry.render() == "# HELP events_total Events\n# TYPE events_total counter\nevents_total 1\n"
+
+
+def test_metrics_route_reports_requests_and_outcomes(client):
+    client.post("/calculate", json={"activities": ACTIVITIES})
+    body = client.get("/metrics").data.decode()
+
+    assert 'http_requests_total{method="POST",route="/calculate",status="200"}' in body
+    assert 'carbon_activities_total{outcome="error"}' in body
+    assert 'carbon_stage_seconds_count{stage="evaluate"}' in body
+
+
+def test_profiles_only_when_enabled_and_requested(client, app_module, monkeypatch):
+    assert "X-Profile-Id" not in client.post("/calculate", json={"activities": ACTIVITIES},
+                                             headers={"X-Profile": "1"}).headers
+
+    monkeypatch.setattr(app_module, "PROFILING_ENABLED", True)
+    assert "X-Profile-Id" not in client.post("/calculate", json={"activities": ACTIVITIES}).headers
+    response = client.post("/calculate", json={"activities": ACTIVITIES}, headers={"X-Profile": "1"})
+
+    report = client.get(f"/profiles/{response.headers['X-Profile-Id']}")
+    assert report.status_code == 200
+    assert "function calls" in report.data.decode()
+    assert client.get("/profiles/missing").status_code == 404
@@ -0,0 +1,53 @@
+import time
+
+import pytest
+
+import parallel
+from conftest import API_KEY
+from parallel import ParallelEmissionEngine
+from resilience import Deadline, DeadlineExceeded
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["scalar", "batch"])
+def engine(request):
+    from check_api import CarbonEmissionCalculator
+
+    engine = ParallelEmissionEngine(CarbonEmissionCalculator(API_KEY, memo=None), workers=2, shard_size=300,
+                                    batch=request.param)
+    yield engine
+    engine.close()
+
+
+def test_parallel_matches_serial(engine, activities):
+    dated = [dict(activity, date=f"2024-{idx % 12 + 1:02d}-01") for idx, activity in enumerate(activities[:500])]
+    activities = activities + dated
+
+    assert engine.process(activities) == engine.calculator.process_activities(activities)
+
+
+def test_evaluate_keeps_start_index(engine, activities):
+    rows = engine.evaluate(activities[:1000], start_index=5000)
+    assert rows == engine.calculator.evaluate_activities(activities[:1000], 5000)
+
+
+def test_expired_deadline_stops_the_request(engine, activities):
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        engine.evaluate(activities * 20, deadline=Deadline(0.05))
+    assert time.monotonic() - started < 2
+
+
+def test_shard_queued_past_its_deadline_is_not_started():
+    parallel._init_worker(API_KEY, False, False, 1)
+    expired = Deadline(0.01)
+    time.sleep(0.02)
+
+    with pytest.raises(DeadlineExceeded):
+        parallel._evaluate_shard([{"activity_type": "car", "parameters": {"distance": 1}}], 0, 1,
+                                 expired.wall_clock_expiry(), expired.seconds)
+
+
+def test_wall_clock_expiry_round_trips():
+    deadline = Deadline(5)
+    rebuilt = Deadline.from_wall_clock(deadline.wall_clock_expiry(), deadline.seconds)
+    assert abs(rebuilt.remaining() - deadline.remaining()) < 0.01
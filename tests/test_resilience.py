@@ -0,0 +1,125 @@
+import time
+from email.utils import formatdate
+
+import pytest
+
+import check_api
+from check_api import CIRCUIT_OPEN_ERROR, CarbonEmissionCalculator, ClimatiqAPI
+from conftest import API_KEY, UNLIMITED_RATE
+from resilience import CLOSED, HALF_OPEN, OPEN, AdaptiveRateLimiter, CircuitBreaker, retry_after_seconds
+
+ESTIMATE = "/data/v1/estimate"
+CAR_ESTIMATE = {"emission_factor": {"activity_id": "passenger_vehicle-car"}, "parameters": {"distance": 10}}
+
+
+@pytest.fixture
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(check_api, "RETRY_DELAY", 0)
+
+
+def stub_api(stub, **options):
+    options.setdefault("rate_limiter", AdaptiveRateLimiter(rate=UNLIMITED_RATE))
+    return ClimatiqAPI(API_KEY, base_url=stub.url, data_version="v1", **options)
+
+
+def test_throttle_halves_the_rate_once_per_episode():
+    limiter = AdaptiveRateLimiter(rate=20)
+    limiter.on_throttle(0.5)
+    limiter.on_throttle(0.5)
+
+    assert limiter.rate == 10
+    assert limiter.throttled == 2
+    assert limiter.reserve() >= 0.4
+
+
+def test_success_probes_back_towards_the_ceiling():
+    limiter = AdaptiveRateLimiter(rate=20)
+    limiter.on_throttle()
+    for _ in range(100):
+        limiter.on_success()
+
+    assert 10 < limiter.rate <= limiter.ceiling <= 20
+
+
+def test_exhausted_quota_pauses_until_reset():
+    limiter = AdaptiveRateLimiter(rate=20)
+    limiter.observe_headers({"RateLimit-Remaining": "0", "RateLimit-Reset": "3"})
+
+    assert limiter.reserve() > 2.5
+
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow_request()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+
+
+def test_client_errors_are_not_retried(stub):
+    api = stub_api(stub)
+    result = api.make_request("data/v1/estimate", method="POST",
+                              data={"emission_factor": {"activity_id": "teleport"}, "parameters": {}})
+
+    assert "400 Client Error" in result["error"]
+    assert stub.state.requests[ESTIMATE] == 1
+
+
+def test_open_breaker_falls_back_to_direct_without_requests(stub, no_retry_delay):
+    api = stub_api(stub, circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    stub.state.set_faults(outage=True)
+
+    assert api.make_request("data/v1/estimate", method="POST", data=CAR_ESTIMATE) == {"error": CIRCUIT_OPEN_ERROR}
+    sent = stub.state.requests[ESTIMATE]
+
+    calculator = CarbonEmissionCalculator(API_KEY, use_api=True, api=api, memo=None)
+    result = calculator.process_activity(0, {"activity_type": "car", "parameters": {"distance": 10}})
+
+    assert result["note"] == "Calculated using default emission factors"
+    assert stub.state.requests[ESTIMATE] == sent
+
+
+def test_fractional_retry_after_is_honoured(stub):
+    api = stub_api(stub, rate_limiter=AdaptiveRateLimiter(rate=UNLIMITED_RATE, min_rate=UNLIMITED_RATE))
+    stub.state.set_faults(rate_limit=1, retry_after="0.05")
+
+    results = [api.make_request("data/v1/estimate", method="POST", data=CAR_ESTIMATE) for _ in range(2)]
+
+    assert "co2e" in results[0]
+    assert api.rate_limiter.throttled >= 1
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("3", 3.0),
+    ("0.25", 0.25),
+    ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+    ("soon", 2.0),
+    ("nan", 2.0),
+    (None, 2.0),
+])
+def test_retry_after_forms(value, expected):
+    headers = {} if value is None else {"Retry-After": value}
+    assert retry_after_seconds(headers, 2.0) == expected
+
+
+def test_retry_after_future_http_date():
+    headers = {"Retry-After": formatdate(time.time() + 30, usegmt=True)}
+    assert 25 < retry_after_seconds(headers, 2.0) <= 30
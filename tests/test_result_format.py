@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+import result_format
+from result_format import (FORMAT_COLUMNS, JSON_MIMETYPE, MSGPACK_MIMETYPE, ResultColumns, ResultFormatError,
+                           encode_result, negotiate_content_type)
+
+
+@pytest.fixture
+def summary(calculator, activities):
+    return calculator.process_activities(activities)
+
+
+def test_columns_rebuild_the_rows(summary):
+    rows = summary["activities"]
+    columns = ResultColumns.from_results(rows)
+
+    assert any("error" in row for row in rows) and any("note" in row for row in rows)
+    assert len(columns) == len(rows)
+    assert list(columns.rows()) == rows
+
+
+def test_columnar_calculation_matches_rows(calculator, activities, summary):
+    columnar = calculator.process_activities_columnar(activities, chunk_size=300)
+
+    assert isinstance(columnar["activities"], ResultColumns)
+    assert list(columnar["activities"].rows()) == summary["activities"]
+    assert dict(columnar, activities=None) == dict(summary, activities=None)
+
+
+def test_error_rows_have_null_numbers(summary):
+    columns = ResultColumns.from_results(summary["activities"]).to_dict()
+    errors = [idx for idx, error in enumerate(columns["error"]) if error is not None]
+
+    assert errors
+    assert all(columns["api_emissions"][idx] is None and columns["difference"][idx] is None for idx in errors)
+    json.dumps(columns, allow_nan=False)
+
+
+def test_encoded_rows_and_columns(summary):
+    rows = json.loads(encode_result(summary))
+    columns = json.loads(encode_result(summary, FORMAT_COLUMNS))
+
+    assert rows == json.loads(json.dumps(summary))
+    assert columns["format"] == FORMAT_COLUMNS
+    assert columns["api_emissions"] == summary["api_emissions"]
+    assert columns["activities"]["name"] == [row["name"] for row in summary["activities"]]
+
+
+def test_encoding_rejects_unknown_formats(summary, monkeypatch):
+    with pytest.raises(ResultFormatError, match="Unknown result format"):
+        encode_result(summary, "tables")
+    with pytest.raises(ResultFormatError, match="Unsupported content type"):
+        encode_result(summary, content_type="text/csv")
+
+    monkeypatch.setattr(result_format, "msgpack", None)
+    with pytest.raises(ResultFormatError, match="msgpack is required"):
+        encode_result(summary, content_type=MSGPACK_MIMETYPE)
+
+
+def test_msgpack_round_trip(summary):
+    msgpack = pytest.importorskip("msgpack")
+
+    assert msgpack.unpackb(encode_result(summary, FORMAT_COLUMNS, MSGPACK_MIMETYPE)) == \
+        json.loads(encode_result(summary, FORMAT_COLUMNS))
+
+
+def test_content_negotiation():
+    assert negotiate_content_type(None) == JSON_MIMETYPE
+    assert negotiate_content_type("text/html, application/msgpack;q=0.9") == MSGPACK_MIMETYPE
+
+
+def test_calculate_route_formats(client, app_module, activities, monkeypatch):
+    activities = activities[:200]
+    rows = client.post("/calculate", json={"activities": activities}).get_json()
+    columns = client.post("/calculate?format=columns", json={"activities": activities}).get_json()
+
+    assert columns["activities"] == ResultColumns.from_results(rows["activities"]).to_dict()
+    assert dict(columns, activities=None) == dict(rows, activities=None, format="columns")
+    assert client.post("/calculate?format=tables", json={"activities": activities}).status_code == 400
+
+    monkeypatch.setattr(app_module, "msgpack", None)
+    response = client.post("/calculate", json={"activities": activities}, headers={"Accept": MSGPACK_MIMETYPE})
+    assert response.status_code == 406
@@ -0,0 +1,136 @@
+import random
+from collections import defaultdict
+
+import pytest
+
+from batch_engine import BatchEmissionEngine
+from calculator_service import CalculatorService
+from check_api import CarbonEmissionCalculator
+from conftest import API_KEY
+from rollups import DIMENSIONS, RollupCube, RollupEngine, RollupError, RollupManager, rollup_key
+
+ELECTRICITY = {"activity_type": "electricity", "region": "US", "parameters": {"energy": 400}}
+
+
+@pytest.fixture
+def ledger(activities):
+    # A year of dated activities, with undated and invalid dates mixed in.
+    rng = random.Random(3)
+    dated = []
+    for activity in activities:
+        month = rng.randint(0, 13)
+        if month == 13:
+            activity = dict(activity, date="2024-13-01")
+        elif month:
+            activity = dict(activity, date=f"2024-{month:02d}-{rng.randint(1, 28):02d}")
+        dated.append(activity)
+    return dated
+
+
+@pytest.mark.parametrize("month", range(1, 13))
+def test_seasonality_follows_the_activity_date(month):
+    undated = CarbonEmissionCalculator(API_KEY, memo=None)
+    undated.current_month = month
+    other_month = CarbonEmissionCalculator(API_KEY, memo=None)
+    other_month.current_month = month % 12 + 1
+
+    dated = dict(ELECTRICITY, date=f"2023-{month:02d}-15")
+
+    assert other_month.process_activity(0, dated) == undated.process_activity(0, ELECTRICITY)
+    assert other_month.process_activity(0, dict(ELECTRICITY, date=f"2023-{month:02d}")) == \
+        undated.process_activity(0, ELECTRICITY)
+
+
+def test_invalid_dates_are_error_rows(calculator):
+    results = calculator.evaluate_activities([dict(ELECTRICITY, date=date) for date in ("2024-02-30", "soon", 2024)])
+
+    assert [result["error"] for result in results] == ["Invalid date: 2024-02-30", "Invalid date: soon",
+                                                       "Invalid date: 2024"]
+
+
+def test_batch_engine_uses_each_activity_month(calculator, ledger):
+    assert BatchEmissionEngine(calculator).process(ledger) == calculator.process_activities(ledger)
+
+
+def grouped_reference(ledger, results, group_by):
+    groups = defaultdict(lambda: [0.0, 0.0, 0, 0])
+    for activity, result in zip(ledger, results):
+        key = dict(zip(DIMENSIONS, rollup_key(activity)))
+        group = groups[tuple(key[name] for name in group_by)]
+        group[2] += 1
+        if "error" in result:
+            group[3] += 1
+        else:
+            group[0] += result["api_emissions"]
+            group[1] += result["algorithm_emissions"]
+    return groups
+
+
+@pytest.mark.parametrize("group_by", [(), ("month",), ("region", "activity_type"), DIMENSIONS])
+def test_queries_match_grouping_the_results(calculator, ledger, group_by):
+    results = calculator.evaluate_activities(ledger)
+    cube = RollupEngine(calculator.evaluate_activities, chunk_size=300).process(ledger)
+    expected = grouped_reference(ledger, results, group_by)
+
+    rows = cube.query(group_by)
+
+    assert len(rows) == len(expected)
+    for row in rows:
+        api_emissions, algorithm_emissions, count, errors = expected[tuple(row[name] for name in group_by)]
+        assert (row["count"], row["errors"]) == (count, errors)
+        assert row["api_emissions"] == pytest.approx(api_emissions, abs=0.01)
+        assert row["algorithm_emissions"] == pytest.approx(algorithm_emissions, abs=0.01)
+
+
+def test_materialized_queries_match_scanned_ones(calculator, ledger):
+    cube = RollupEngine(calculator.evaluate_activities).process(ledger)
+    queries = [(("activity_type",), {"region": "US", "month": "2024-03"}), (("region",), None),
+               (("region",), {"region": "EU"}), (DIMENSIONS, {"month": None})]
+    scanned = [cube.query(group_by, filters) for group_by, filters in queries]
+
+    cube.materialize(("month", "region", "activity_type"))
+    cube.materialize(["region"])
+
+    assert cube.materialized == [DIMENSIONS, ("region",)]
+    assert [cube.query(group_by, filters) for group_by, filters in queries] == scanned
+
+
+def test_accumulators_grow_past_their_capacity():
+    cube = RollupCube(capacity=2)
+    for index in range(100):
+        cube.add(("2024-01", f"R{index}", "car"), {"api_emissions": 1.0, "algorithm_emissions": 2.0})
+
+    totals = cube.totals()
+    assert (len(cube), totals.count, totals.api_emissions, totals.algorithm_emissions) == (100, 100, 100.0, 200.0)
+
+
+@pytest.mark.parametrize("group_by, filters, message", [
+    ("week", None, "Unknown dimension: week"),
+    (42, None, "group_by must be a list"),
+    (("region",), {"country": "US"}, "Unknown dimension: country"),
+])
+def test_invalid_queries(group_by, filters, message):
+    with pytest.raises(RollupError, match=message):
+        RollupCube().query(group_by, filters)
+
+
+def test_rollup_routes(client, ledger):
+    created = client.post("/rollups", json={"activities": ledger[:300], "materialize": [["month"]]})
+    location = created.headers["Location"]
+    rollup = created.get_json()
+
+    assert created.status_code == 201
+    assert (rollup["activity_count"], rollup["materialized"]) == (300, [["month"]])
+    months = client.get(f"{location}?group_by=month").get_json()["rows"]
+    assert sum(row["count"] for row in months) == 300
+    assert client.get(f"{location}?group_by=week").status_code == 400
+    assert client.delete(location).status_code == 204
+    assert client.get(location).status_code == 404
+
+
+def test_least_recently_used_rollups_are_evicted():
+    manager = RollupManager(CalculatorService(API_KEY), max_stored=1)
+    first = manager.create([ELECTRICITY])
+    manager.create([ELECTRICITY])
+
+    assert manager.get(first["rollup_id"]) is None
@@ -0,0 +1,144 @@
+import copy
+import random
+
+import pytest
+
+from activity_resolver import ActivityResolver
+from check_api import CarbonEmissionCalculator
+from conftest import API_KEY
+from emission_core import (ACTIVITY_MAPPINGS, ACTIVITY_TYPE_ADJUSTMENTS, ALGORITHM_REGIONAL_FACTORS,
+                           ALGORITHM_SEASONAL_FACTORS, DIRECT_EMISSION_FACTORS, DISTANCE_ACTIVITY_TYPES,
+                           ENERGY_ACTIVITY_TYPES)
+from factor_tables import FactorTable
+from scenarios import BASE_SCENARIO, MATRIX_COLUMNS, ScenarioError, ScenarioSweep, expand_grid
+
+REGIONS = ["US", "EU", "UK", "CA", "CN", "AU", "IN"]
+
+
+def recomputing_calculator(scenario):
+    # A calculator whose tables carry the scenario's factor overrides.
+    calculator = CarbonEmissionCalculator(API_KEY, memo=None)
+    calculator.factor_table = FactorTable.compile(
+        DIRECT_EMISSION_FACTORS, DISTANCE_ACTIVITY_TYPES, ENERGY_ACTIVITY_TYPES,
+        dict(ALGORITHM_REGIONAL_FACTORS, **scenario.get("region_factors", {})),
+        ALGORITHM_SEASONAL_FACTORS, ACTIVITY_TYPE_ADJUSTMENTS, ACTIVITY_MAPPINGS
+    )
+
+    overrides = {ACTIVITY_MAPPINGS[activity_type]["id"]: factor
+                 for activity_type, factor in scenario.get("algorithm_factors", {}).items()}
+    mappings = {key: dict(info, algorithm_factor=overrides.get(info["id"], info["algorithm_factor"]))
+                for key, info in ACTIVITY_MAPPINGS.items()}
+    calculator.activity_resolver = ActivityResolver(mappings)
+    return calculator
+
+
+def mutated(calculator, activities, scenario):
+    # The activity list a sweep script used to build for the scenario.
+    result = []
+    for activity in activities:
+        parameters = activity.get("parameters") or {}
+        info = calculator.get_activity_info(activity.get("activity_type"))
+        kind = calculator.factor_table.lookup(activity.get("activity_type"), "US", 1).unit_kind \
+            if activity.get("activity_type") else None
+        moved = []
+        for substitution in scenario.get("substitutions", []):
+            if info["id"] != ACTIVITY_MAPPINGS[substitution["from"]]["id"] or kind not in parameters:
+                continue
+            if substitution.get("region") not in (None, activity.get("region", "US")):
+                continue
+            share = substitution["share"]
+            moved.append(dict(activity, activity_type=substitution["to"],
+                              parameters=dict(parameters, **{kind: float(parameters[kind]) * share})))
+            activity = dict(activity, parameters=dict(parameters, **{kind: float(parameters[kind]) * (1 - share)}))
+
+        for row in [activity] + moved:
+            region = row.get("region", "US")
+            result.append(dict(row, region=scenario.get("region_swaps", {}).get(region, region)))
+    return result
+
+
+def random_scenario(rng, index):
+    scenario = {"name": f"s{index}"}
+    if rng.random() < 0.6:
+        source, target = rng.choice([("car", "rail"), ("car", "bus"), ("bus", "rail"), ("electricity", "natural_gas")])
+        substitution = {"from": source, "to": target, "share": rng.choice([0.0, 0.25, 0.5, 1.0])}
+        if rng.random() < 0.5:
+            substitution["region"] = rng.choice(REGIONS)
+        scenario["substitutions"] = [substitution]
+    if rng.random() < 0.4:
+        scenario["region_swaps"] = {rng.choice(REGIONS): rng.choice(REGIONS)}
+    if rng.random() < 0.4:
+        scenario["region_factors"] = {rng.choice(REGIONS): round(rng.uniform(0.5, 1.5), 2)}
+    if rng.random() < 0.4:
+        scenario["algorithm_factors"] = {rng.choice(list(ACTIVITY_MAPPINGS)): round(rng.uniform(0.5, 1.5), 2)}
+    return scenario
+
+
+def test_sweep_matches_recomputing_each_scenario(calculator, activities):
+    activities = activities[:400]
+    rng = random.Random(17)
+    scenarios = [random_scenario(rng, index) for index in range(40)]
+
+    sweep = ScenarioSweep(calculator).run(copy.deepcopy(activities), scenarios)
+
+    assert sweep["scenarios"] == [BASE_SCENARIO] + [scenario["name"] for scenario in scenarios]
+    assert sweep["columns"] == list(MATRIX_COLUMNS)
+    base = calculator.process_activities(activities)
+    assert sweep["matrix"][0][:2] == pytest.approx([base["api_emissions"], base["algorithm_emissions"]], abs=0.02)
+    assert sweep["errors"] == base["errors"]
+
+    for scenario, row in zip(scenarios, sweep["matrix"][1:]):
+        reference = recomputing_calculator(scenario)
+        expected = reference.process_activities(mutated(reference, activities, scenario))
+        assert row[:2] == pytest.approx([expected["api_emissions"], expected["algorithm_emissions"]],
+                                        abs=0.02), scenario
+        assert row[2:] == pytest.approx([row[0] - sweep["matrix"][0][0], row[1] - sweep["matrix"][0][1]],
+                                        abs=0.011)
+
+
+def test_small_chunks_give_the_same_matrix(calculator, activities):
+    scenarios = [random_scenario(random.Random(index), index) for index in range(12)]
+
+    assert ScenarioSweep(calculator, chunk_elements=1).run(activities, scenarios) == \
+        ScenarioSweep(calculator).run(activities, scenarios)
+
+
+def test_grid_expands_to_every_combination():
+    grid = {
+        "shift": [{"name": "none"}, {"name": "half", "substitutions": [{"from": "car", "to": "rail", "share": 0.5}]}],
+        "grid": [{"region_factors": {"US": 0.9}}, {"region_factors": {"US": 0.8}, "region_swaps": {"CN": "EU"}}],
+    }
+    scenarios = expand_grid(grid)
+
+    assert [scenario["name"] for scenario in scenarios] == [
+        "shift=none, grid=0", "shift=none, grid=1", "shift=half, grid=0", "shift=half, grid=1"
+    ]
+    assert scenarios[3]["substitutions"] == [{"from": "car", "to": "rail", "share": 0.5}]
+    assert (scenarios[3]["region_factors"], scenarios[3]["region_swaps"]) == ({"US": 0.8}, {"CN": "EU"})
+
+
+@pytest.mark.parametrize("scenario, message", [
+    ({"name": "x", "carbon_tax": 1}, "x: unknown perturbation carbon_tax"),
+    ({"name": "x", "substitutions": [{"from": "car"}]}, "needs from and to"),
+    ({"name": "x", "substitutions": [{"from": "car", "to": "rail", "share": 1.5}]}, "between 0 and 1"),
+    ({"name": "x", "substitutions": [{"from": "car", "to": "electricity"}]}, "cannot substitute car"),
+    ({"name": "x", "substitutions": [{"from": "car", "to": "rail", "share": 0.6}] * 2}, "more than all"),
+    ({"name": "x", "region_swaps": {"US": "Atlantis"}}, "x: unknown region Atlantis"),
+    ({"name": "x", "region_swaps": {"US": 3}}, "must be a region"),
+    ({"name": "x", "region_factors": {"Atlantis": 1.0}}, "x: unknown region Atlantis"),
+    ({"name": "x", "algorithm_factors": {"car": "high"}}, "must be a number"),
+    ({"name": "x", "algorithm_factors": {"teleport": 1.0}}, "x: unknown activity type teleport"),
+])
+def test_invalid_scenarios_are_rejected(calculator, activities, scenario, message):
+    with pytest.raises(ScenarioError, match=message):
+        ScenarioSweep(calculator).run(activities[:50], [scenario])
+
+
+def test_scenarios_route(client, activities):
+    body = {"activities": activities[:100], "scenarios": [{"name": "rail", "substitutions": [
+        {"from": "car", "to": "rail"}]}], "grid": {"factor": [{"algorithm_factors": {"car": 1.1}}]}}
+    response = client.post("/scenarios", json=body)
+
+    assert response.status_code == 200
+    assert response.get_json()["scenarios"] == [BASE_SCENARIO, "rail", "factor=0"]
+    assert client.post("/scenarios", json={"activities": [], "grid": {"axis": []}}).status_code == 400
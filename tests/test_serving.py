@@ -0,0 +1,151 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from resilience import Deadline
+from serving import AdmissionController, Overloaded, PooledWSGIServer
+
+ACTIVITIES = [{"activity_type": "car", "parameters": {"distance": 10}}]
+
+
+def occupy(controller, count):
+    """Hold ``count`` slots from other threads until the returned event is set."""
+    release = threading.Event()
+    entered = threading.Barrier(count + 1)
+
+    def hold():
+        with controller.admit():
+            entered.wait()
+            release.wait(5)
+
+    threads = [threading.Thread(target=hold) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    entered.wait()
+    return release, threads
+
+
+def test_full_queue_is_refused_with_429():
+    controller = AdmissionController(max_concurrent=1, queue_size=0, timeout=5)
+    release, threads = occupy(controller, 1)
+
+    with pytest.raises(Overloaded) as refused:
+        with controller.admit():
+            pass
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert (refused.value.status, refused.value.retry_after) == (429, 1)
+    assert controller.snapshot()["active"] == 0
+
+
+def test_queued_request_times_out_with_503():
+    controller = AdmissionController(max_concurrent=1, queue_size=4, timeout=0.05)
+    release, threads = occupy(controller, 1)
+
+    started = time.monotonic()
+    with pytest.raises(Overloaded) as refused:
+        with controller.admit(Deadline(0.01)):
+            pass
+    waited = time.monotonic() - started
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert refused.value.status == 503
+    assert waited < 0.05
+    assert controller.waiting == 0
+
+
+def test_queued_request_runs_when_a_slot_frees():
+    controller = AdmissionController(max_concurrent=1, queue_size=4, timeout=5)
+    release, threads = occupy(controller, 1)
+    threading.Timer(0.05, release.set).start()
+
+    with controller.admit():
+        assert controller.active == 1
+    for thread in threads:
+        thread.join()
+
+
+def test_retry_after_scales_with_the_queue():
+    controller = AdmissionController(max_concurrent=2, queue_size=10)
+    controller.service_time = 3.0
+    controller.waiting = 5
+
+    assert controller.retry_after() == 9
+
+
+@pytest.fixture
+def admission(app_module, monkeypatch):
+    def replace(**options):
+        controller = AdmissionController(**options)
+        monkeypatch.setattr(app_module, "admission", controller)
+        return controller
+
+    return replace
+
+
+def test_saturated_routes_return_retry_after(client, admission):
+    controller = admission(max_concurrent=1, queue_size=0)
+    release, threads = occupy(controller, 1)
+
+    responses = [client.post(route, json={"activities": ACTIVITIES}) for route in ("/calculate", "/scenarios")]
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert [response.status_code for response in responses] == [429, 429]
+    assert all(int(response.headers["Retry-After"]) >= 1 for response in responses)
+    assert client.post("/calculate", json={"activities": ACTIVITIES}).status_code == 200
+
+
+def test_missed_request_deadline_returns_503(client, admission):
+    admission(max_concurrent=4)
+    response = client.post("/calculate", json={"activities": ACTIVITIES * 10},
+                           headers={"X-Request-Deadline": "0.000001"})
+
+    assert response.status_code == 503
+    assert "deadline" in response.get_json()["error"]
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_clients_cannot_extend_the_deadline(app_module):
+    with app_module.app.test_request_context(headers={"X-Request-Deadline": "1e9"}):
+        assert app_module.request_deadline().seconds == app_module.REQUEST_DEADLINE
+    with app_module.app.test_request_context(headers={"X-Request-Deadline": "2.5"}):
+        assert app_module.request_deadline().seconds == 2.5
+
+
+def test_connections_beyond_the_pool_get_503():
+    release = threading.Event()
+
+    def slow_app(environ, start_response):
+        release.wait(5)
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"done"]
+
+    server = PooledWSGIServer("127.0.0.1", 0, slow_app, threads=1, backlog=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    request = b"GET / HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n"
+    try:
+        busy = socket.create_connection(("127.0.0.1", server.port), timeout=5)
+        busy.sendall(request)
+        time.sleep(0.1)
+        with socket.create_connection(("127.0.0.1", server.port), timeout=5) as refused:
+            refused.sendall(request)
+            answer = refused.recv(4096).decode()
+
+        release.set()
+        served = busy.recv(4096).decode()
+        busy.close()
+    finally:
+        release.set()
+        server.shutdown()
+        server.server_close()
+
+    assert answer.startswith("HTTP/1.1 503") and "Retry-After: 1" in answer
+    assert served.startswith("HTTP/1.1 200")
@@ -0,0 +1,129 @@
+import math
+import random
+
+import pytest
+
+from calculator_service import CalculatorService
+from conftest import API_KEY
+from sessions import ADD, REMOVE, UPDATE, ExactSum, SessionError, SessionManager
+
+
+@pytest.fixture
+def manager():
+    return SessionManager(CalculatorService(API_KEY), max_sessions=2, max_activities=50)
+
+
+def test_exact_sum_matches_fsum_after_removals():
+    rng = random.Random(5)
+    held = []
+    total = ExactSum()
+    for _ in range(5000):
+        if held and rng.random() < 0.4:
+            total.remove(held.pop(rng.randrange(len(held))))
+        else:
+            value = rng.choice([1e16, -1e16, 1.0, 0.1]) * rng.random() * 10 ** rng.randint(-5, 5)
+            held.append(value)
+            total.add(value)
+        assert total.value == math.fsum(held)
+
+
+def test_exact_sum_recovers_from_non_finite_values():
+    total = ExactSum()
+    for value in (1.5, math.inf, math.nan, 2.25):
+        total.add(value)
+    assert math.isnan(total.value)
+
+    total.remove(math.nan)
+    assert total.value == math.inf
+    total.add(-math.inf)
+    assert math.isnan(total.value)
+
+    total.remove(math.inf)
+    total.remove(-math.inf)
+    assert total.value == 3.75
+
+
+def recomputed_summary(manager, session_id):
+    # What a full recalculation of the session's current activities reports, summed exactly.
+    calculator = manager.service.calculator
+    session = manager._sessions[session_id]
+    results = calculator.evaluate_activities(list(session.activities.values()))
+
+    class Totals:
+        errors = sum("error" in result for result in results)
+        api_emissions = math.fsum(result["api_emissions"] for result in results if "error" not in result)
+        algorithm_emissions = math.fsum(result["algorithm_emissions"] for result in results if "error" not in result)
+
+    return calculator.summarize_totals(Totals)
+
+
+def test_incremental_totals_match_a_full_recompute(manager, activities):
+    rng = random.Random(11)
+    session = manager.create(activities[:30])
+    ids = list(session["results"])
+
+    for _ in range(20):
+        changes = []
+        for activity_id in rng.sample(ids, min(3, len(ids))):
+            if rng.random() < 0.5:
+                changes.append({"op": UPDATE, "id": activity_id, "activity": rng.choice(activities)})
+            else:
+                changes.append({"op": REMOVE, "id": activity_id})
+                ids.remove(activity_id)
+        added = manager.apply(session["session_id"], changes + [{"op": ADD, "activity": rng.choice(activities)}])
+        ids.extend(activity_id for activity_id, result in added["results"].items() if result is not None
+                   and activity_id not in ids)
+
+        assert added["activity_count"] == len(ids)
+        assert added["summary"] == recomputed_summary(manager, session["session_id"])
+
+
+def test_only_changed_rows_are_returned(manager):
+    session = manager.create([{"id": "a", "activity_type": "car", "parameters": {"distance": 10}},
+                              {"id": "b", "activity_type": "bus", "parameters": {"distance": 10}}])
+    changed = manager.apply(session["session_id"], [{"op": REMOVE, "id": "a"},
+                                                    {"op": ADD, "id": "a", "activity": {"activity_type": "rail"}}])
+
+    assert list(changed["results"]) == ["a"]
+    assert "error" in changed["results"]["a"]
+    assert changed["summary"]["errors"] == 1
+
+
+REMOVE_A = {"op": REMOVE, "id": "a"}
+
+
+@pytest.mark.parametrize("changes, message", [
+    ({"op": ADD}, "changes must be a list"),
+    ([REMOVE_A, {"op": "replace", "id": "a"}], "op must be one of"),
+    ([{"op": ADD, "id": "a", "activity": {}}], "activity a already exists"),
+    ([REMOVE_A, {"op": REMOVE, "id": "z"}], "activity z not found"),
+    ([REMOVE_A, {"op": ADD, "activity": "car"}], "activity must be an object"),
+    ([REMOVE_A] + [{"op": ADD, "activity": {}}] * 51, "at most 50 activities"),
+])
+def test_invalid_changes_reject_the_whole_request(manager, changes, message):
+    session = manager.create([{"id": "a", "activity_type": "car", "parameters": {"distance": 10}}])
+
+    with pytest.raises(SessionError, match=message):
+        manager.apply(session["session_id"], changes)
+    assert manager.get(session["session_id"]) == session
+
+
+def test_least_recently_used_sessions_are_evicted(manager):
+    first, second = manager.create(), manager.create()
+    manager.get(first["session_id"])
+    manager.create()
+
+    assert manager.get(first["session_id"]) is not None
+    assert manager.get(second["session_id"]) is None
+
+
+def test_session_routes(client):
+    created = client.post("/sessions", json={"activities": [{"id": "a", "activity_type": "car",
+                                                             "parameters": {"distance": 10}}]})
+    location = created.headers["Location"]
+
+    assert created.status_code == 201
+    assert client.patch(location, json={"changes": [{"op": REMOVE, "id": "z"}]}).status_code == 400
+    assert client.patch(location, json={"changes": [REMOVE_A]}).get_json()["activity_count"] == 0
+    assert client.delete(location).status_code == 204
+    assert client.get(location).status_code == 404
@@ -0,0 +1,54 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import API_KEY, ROOT
+from streaming import NDJSONStreamProcessor
+
+
+def ndjson(activities):
+    return [json.dumps(activity) + "\n" for activity in activities]
+
+
+def read_output(out):
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    return lines[:-1], lines[-1]["summary"]
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_stream_matches_process_activities(calculator, activities, batch):
+    out = io.StringIO()
+    NDJSONStreamProcessor(calculator, chunk_size=97, batch=batch).process(ndjson(activities), out)
+    rows, summary = read_output(out)
+
+    expected = calculator.process_activities(activities)
+    assert rows == expected.pop("activities")
+    assert summary == dict(expected, activity_count=len(activities))
+
+
+def test_invalid_lines_become_error_rows(calculator):
+    lines = ["not json\n", "\n", "[1, 2]\n", json.dumps({"activity_type": "car", "parameters": {"distance": 5}})]
+    out = io.StringIO()
+    NDJSONStreamProcessor(calculator, chunk_size=2).process(lines, out)
+    rows, summary = read_output(out)
+
+    assert rows[0]["error"].startswith("Invalid JSON on line 1")
+    assert rows[1] == {"error": "Expected a JSON object on line 3", "name": "Activity 2"}
+    assert rows[2]["name"] == "Activity 3" and "error" not in rows[2]
+    assert (summary["activity_count"], summary["errors"]) == (3, 2)
+
+
+def test_command_line_streams_results(activities):
+    env = dict(os.environ, CLIMATIQ_API_KEY=API_KEY, LOG_FILE="")
+    completed = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "run_calculation.py"), "--ndjson", "--chunk-size", "50"],
+        input="".join(ndjson(activities[:120])), capture_output=True, text=True, env=env, check=True
+    )
+    lines = completed.stdout.splitlines()
+
+    assert len(lines) == 121
+    assert json.loads(lines[-1])["summary"]["activity_count"] == 120
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from emission_core import UNIT_CONVERSIONS, UNIT_CONVERTER
+from unit_conversion import UnitConversionError, UnitConverter
+
+
+def test_base_units_come_from_the_table():
+    assert UNIT_CONVERTER.base_units == {"energy": "kWh", "distance": "km", "weight": "kg", "volume": "L"}
+
+
+def test_units_are_case_folded():
+    assert UNIT_CONVERTER.to_base(2.0, "energy", "mwh") == UNIT_CONVERTER.to_base(2.0, "energy", "MWh") == 2000.0
+    assert UNIT_CONVERTER.factor("distance", "MI") == 1.60934
+
+
+def test_joules_are_converted_rather_than_read_as_kwh():
+    assert UNIT_CONVERTER.factor("energy", "J") == 2.78e-7
+    assert UNIT_CONVERTER.to_base(3.6e6, "energy", "J") == pytest.approx(1.0008)
+    assert UNIT_CONVERTER.to_base(1.0, "energy", "MJ") == 0.278
+
+
+@pytest.mark.parametrize("value", [0.0, 1.0, 12.5, 3.3333333, 1e9])
+def test_previously_supported_units_are_bit_identical(value):
+    # The hard-coded branches the table replaced.
+    assert UNIT_CONVERTER.to_base(value, "distance", "mi") == value * 1.60934
+    assert UNIT_CONVERTER.to_base(value, "energy", "MWh") == value * 1000
+    assert UNIT_CONVERTER.to_base(value, "energy", "GWh") == value * 1000000
+    assert UNIT_CONVERTER.to_base(value, "energy", "kWh") == value
+
+
+@pytest.mark.parametrize("kind, unit", [("distance", "furlong"), ("energy", "kwh2"), ("weight", None),
+                                        ("volume", "kg")])
+def test_unknown_units_are_rejected(kind, unit):
+    with pytest.raises(UnitConversionError, match=f"Unsupported {kind} unit"):
+        UNIT_CONVERTER.to_base(1.0, kind, unit)
+
+
+def test_unknown_unit_types_are_rejected():
+    with pytest.raises(UnitConversionError, match="Unknown unit type: time"):
+        UNIT_CONVERTER.factor("time", "h")
+
+
+def test_unknown_units_become_error_rows(calculator):
+    row = calculator.evaluate_activities([
+        {"activity_type": "car", "parameters": {"distance": 1, "distance_unit": "furlong"}}
+    ])[0]
+
+    assert row["error"].startswith("Unsupported distance unit 'furlong'")
+
+
+def test_array_conversion_matches_scalar():
+    values = [1.0, 2.5, 7.0, 0.1, 1e6]
+    units = ["kWh", "J", "mwh", "GWh", "MJ"]
+
+    converted = UNIT_CONVERTER.to_base_array(values, "energy", units)
+    single = UNIT_CONVERTER.to_base_array(values, "energy", "MWh")
+
+    assert isinstance(converted, np.ndarray)
+    assert converted.tolist() == [UNIT_CONVERTER.to_base(v, "energy", u) for v, u in zip(values, units)]
+    assert single.tolist() == [UNIT_CONVERTER.to_base(v, "energy", "MWh") for v in values]
+
+
+def test_array_conversion_rejects_unknown_units():
+    with pytest.raises(UnitConversionError):
+        UNIT_CONVERTER.to_base_array([1.0, 2.0], "weight", ["kg", "stone"])
+
+
+def test_array_conversion_without_numpy(monkeypatch):
+    import unit_conversion
+
+    monkeypatch.setattr(unit_conversion, "_numpy", lambda: None)
+    converter = UnitConverter(UNIT_CONVERSIONS)
+
+    assert converter.to_base_array([1, 2], "distance", ["mi", "km"]) == [1.60934, 2.0]
+    assert converter.to_base_array([1, 2], "weight", "t") == [1000.0, 2000.0]
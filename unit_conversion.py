@@ -0,0 +1,76 @@
+from typing import TYPE_CHECKING, Dict, Iterable, List, Union
+
+if TYPE_CHECKING:
+    import numpy as np
+
+UNIT_CACHE_SIZE = 4096
+
+
+def _numpy():
+    # numpy costs tens of milliseconds to import, and only the column conversions use it.
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class UnitConversionError(ValueError):
+    pass
+
+
+class UnitConverter:
+    __slots__ = ("conversions", "base_units", "_factors", "_raw_factors")
+
+    def __init__(self, conversions: Dict[str, Dict[str, float]]):
+        self.conversions = conversions
+        self.base_units = {
+            kind: next((unit for unit, factor in units.items() if factor == 1.0), None)
+            for kind, units in conversions.items()
+        }
+        self._factors = {
+            kind: {unit.lower(): factor for unit, factor in units.items()}
+            for kind, units in conversions.items()
+        }
+        self._raw_factors = {kind: {} for kind in conversions}
+
+    def factor(self, kind: str, unit: str) -> float:
+        raw_factors = self._raw_factors.get(kind)
+        if raw_factors is not None:
+            factor = raw_factors.get(unit)
+            if factor is not None:
+                return factor
+
+        units = self._factors.get(kind)
+        if units is None:
+            raise UnitConversionError(f"Unknown unit type: {kind}")
+
+        factor = units.get(unit.lower()) if isinstance(unit, str) else None
+        if factor is None:
+            supported = ", ".join(self.conversions[kind])
+            raise UnitConversionError(f"Unsupported {kind} unit {unit!r} (expected one of: {supported})")
+
+        if len(raw_factors) < UNIT_CACHE_SIZE:
+            raw_factors[unit] = factor
+        return factor
+
+    def to_base(self, value: float, kind: str, unit: str) -> float:
+        return value * self.factor(kind, unit)
+
+    def to_base_array(self, values: Iterable[float], kind: str,
+                      units: Union[str, Iterable[str]]) -> Union["np.ndarray", List[float]]:
+        np = _numpy()
+        if isinstance(units, str):
+            factor = self.factor(kind, units)
+            if np is None:
+                return [float(value) * factor for value in values]
+            return np.asarray(values, dtype=np.float64) * factor
+
+        if np is None:
+            return [float(value) * self.factor(kind, unit) for value, unit in zip(values, units)]
+
+        # Look each distinct unit up once, then scale the whole column in one multiply.
+        codes = {}
+        inverse = [codes.setdefault(unit, len(codes)) for unit in units]
+        factors = np.array([self.factor(kind, unit) for unit in codes], dtype=np.float64)
+        return np.asarray(values, dtype=np.float64) * factors[np.asarray(inverse, dtype=np.intp)]